@@ -0,0 +1,111 @@
+# animation.py
+import time
+import tkinter as tk
+
+from instrumentation import metrics
+
+FRAME_MS = 16   # ~60 fps: un solo "after" para todas las animaciones
+
+
+# ---------------------------
+# Máquina de escribir centralizada
+# ---------------------------
+class _Typing:
+    __slots__ = ("label", "text", "delay", "start", "shown", "callback")
+
+    def __init__(self, label, text, delay, start, callback):
+        self.label = label
+        self.text = text
+        self.delay = delay / 1000.0   # segundos por carácter
+        self.start = start
+        self.shown = 0
+        self.callback = callback
+
+
+class Typewriter:
+    # Todas las animaciones activas avanzan desde un único tick. En cada tick se
+    # muestran de golpe todos los caracteres que "tocan" según el tiempo
+    # transcurrido, así el número de re-layouts de Tk depende de los frames y no
+    # del largo del texto. clear() llama a cancel_all() para que nada siga
+    # escribiendo sobre widgets destruidos.
+    def __init__(self, root, frame_ms=FRAME_MS, clock=time.perf_counter):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.clock = clock   # reemplazable en benchmarks
+        self.instant = False   # True: el texto aparece completo sin animación
+        self._anims = []
+        self._after_id = None
+
+    def add(self, label, text, delay=30, after_callback=None):
+        self.cancel(label)
+        anim = _Typing(label, text, delay, self.clock(), after_callback)
+        if self.instant or delay <= 0 or not text:
+            self._finish(anim)
+            return
+        label.config(text="")
+        self._anims.append(anim)
+        self._ensure_tick()
+
+    def _ensure_tick(self):
+        if self._after_id is None and self._anims:
+            self._after_id = self.root.after(self.frame_ms, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        t0 = time.perf_counter()
+        try:
+            self._advance(self.clock())
+        finally:
+            metrics.record("typewriter.tick", (time.perf_counter() - t0) * 1000)
+        self._ensure_tick()
+
+    def _advance(self, now):
+        done = []
+        alive = []
+        for anim in self._anims:
+            n = min(len(anim.text), int((now - anim.start) / anim.delay) + 1)
+            if n != anim.shown:
+                try:
+                    anim.label.config(text=anim.text[:n])
+                except tk.TclError:
+                    # el widget ya no existe
+                    continue
+                anim.shown = n
+            if n >= len(anim.text):
+                done.append(anim)
+            else:
+                alive.append(anim)
+        self._anims = alive
+        for anim in done:
+            if anim.callback:
+                anim.callback()
+
+    def _finish(self, anim):
+        try:
+            anim.label.config(text=anim.text)
+        except tk.TclError:
+            return
+        if anim.callback:
+            anim.callback()
+
+    def skip(self):
+        # modo "instantáneo" puntual: termina ya todas las animaciones activas
+        anims, self._anims = self._anims, []
+        for anim in anims:
+            self._finish(anim)
+
+    def cancel(self, label):
+        self._anims = [a for a in self._anims if a.label is not label]
+
+    def cancel_all(self):
+        self._anims = []
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+    @property
+    def active(self):
+        return len(self._anims)
@@ -0,0 +1,117 @@
+# async_bridge.py
+# asyncio dentro del bucle de Tk. El event loop de asyncio no corre en otro hilo:
+# Tk lo avanza una iteración cada interval_ms mientras haya tareas, así que las
+# corutinas pueden tocar widgets sin candados. Lo lento (disco, decodificar,
+# solver) va al pool de hilos con to_thread()/run_in_thread() y su resultado
+# vuelve al hilo de Tk por el mismo loop. Cada tarea pertenece a un "scope"
+# (p.ej. la pantalla actual) y cancel_scope() la cancela al salir de ella.
+#
+#   async def cuenta_atras():
+#       await asyncio.sleep(5)
+#       app.show_welcome_screen()
+#   app.tasks.spawn(cuenta_atras(), scope=screen)
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import metrics
+
+
+class AsyncBridge:
+    def __init__(self, root, interval_ms=8, workers=2):
+        self.root = root
+        self.interval_ms = interval_ms   # resolución de asyncio.sleep y de los resultados
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tlc-bg")
+        self.loop.set_default_executor(self.executor)
+        self._scopes = {}      # scope -> set de tareas (None = toda la app)
+        self._after_id = None
+        self.closed = False
+
+    # --- tareas ---
+    def spawn(self, coro, scope=None):
+        # programa la corutina; corre en el hilo de Tk, entre eventos
+        if self.closed:
+            coro.close()
+            return None
+        task = self.loop.create_task(coro)
+        self._scopes.setdefault(scope, set()).add(task)
+        task.add_done_callback(functools.partial(self._done, scope))
+        self._wake()
+        return task
+
+    def to_thread(self, fn, *args, **kwargs):
+        # awaitable: fn corre en el pool, el resultado llega al hilo de Tk
+        return self.loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    def run_in_thread(self, fn, *args, scope=None, on_done=None):
+        # atajo sin corutina: fn en el pool y on_done(resultado) en el hilo de Tk
+        async def job():
+            result = await self.to_thread(fn, *args)
+            if on_done is not None:
+                on_done(result)
+            return result
+        return self.spawn(job(), scope)
+
+    def cancel_scope(self, scope):
+        tasks = self._scopes.pop(scope, None)
+        if not tasks:
+            return 0
+        for task in tasks:
+            task.cancel()
+        metrics.count("async.cancelled", len(tasks))
+        self._wake()   # los finally de las corutinas corren en el próximo paso
+        return len(tasks)
+
+    def pending(self, scope=None):
+        if scope is not None:
+            return len(self._scopes.get(scope, ()))
+        return sum(len(tasks) for tasks in self._scopes.values())
+
+    def _done(self, scope, task):
+        tasks = self._scopes.get(scope)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._scopes[scope]
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            # mismo camino que un error en un callback de Tk
+            metrics.count("async.errors")
+            self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+
+    # --- bombeo desde Tk ---
+    def _wake(self):
+        if self._after_id is None and not self.closed:
+            self._after_id = self.root.after_idle(self._pump)
+
+    def _pump(self):
+        self._after_id = None
+        with metrics.timed("async.pump"):
+            # una iteración: lo que está listo (incluidos resultados de hilos) y vuelve
+            self.loop.call_soon(self.loop.stop)
+            self.loop.run_forever()
+        if self._after_id is None and self.pending() and not self.closed:
+            self._after_id = self.root.after(self.interval_ms, self._pump)
+
+    def close(self):
+        # al salir: cancela todo, deja correr los finally y suelta el pool
+        if self.closed:
+            return
+        for scope in list(self._scopes):
+            self.cancel_scope(scope)
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self.closed = True
+        try:
+            self.loop.call_soon(self.loop.stop)
+            self.loop.run_forever()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.loop.close()
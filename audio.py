@@ -0,0 +1,231 @@
+# audio.py
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import metrics
+
+# pygame se importa e inicializa fuera del arranque (ver AudioManager.init_async):
+# en equipos sin dispositivo de audio mixer.init() puede tardar cientos de ms.
+pygame = None
+
+# sonidos de las pantallas fijas; los de cada escenario vienen de scenarios/*.json
+SCENE_SOUNDS = {
+    "win": ["bells.wav"],
+}
+
+AMBIENCE_CHANNEL = 0   # canal reservado para el sonido ambiente (lluvia, etc.)
+
+# ---------------------------
+# Gestor de audio con caché LRU
+# ---------------------------
+class AudioManager:
+    def __init__(self, enabled=True, budget_bytes=32 * 1024 * 1024):
+        self.enabled = False          # pasa a True cuando el mezclador está listo
+        self.wanted = enabled
+        self.budget_bytes = budget_bytes
+        self._cache = OrderedDict()   # ruta -> (Sound, bytes estimados)
+        self._cache_bytes = 0
+        self._missing = set()         # rutas que no se pudieron cargar: no se reintentan
+        self._lock = threading.Lock()
+        self._ambience = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.skipped_missing = 0
+        self.init_seconds = None
+        self._init_thread = None
+        self._ready = threading.Event()      # init terminado (con o sin éxito)
+        self._pending_ambience = None        # ambiente pedido antes de estar listo
+
+    # --- inicialización diferida ---
+    def _init(self):
+        global pygame
+        t0 = time.perf_counter()
+        try:
+            import pygame as _pygame
+            _pygame.mixer.init()
+            pygame = _pygame
+            try:
+                pygame.mixer.set_reserved(1)
+                self._ambience = pygame.mixer.Channel(AMBIENCE_CHANNEL)
+            except Exception:
+                self._ambience = None
+            self.enabled = True
+        except Exception:
+            self.enabled = False
+        self.init_seconds = time.perf_counter() - t0
+        metrics.record("audio.init", self.init_seconds * 1000)
+        with self._lock:
+            pending, self._pending_ambience = self._pending_ambience, None
+            self._ready.set()
+        if pending is not None:
+            self.play_ambience(*pending)
+
+    def init_async(self):
+        # arranca el mezclador en un hilo; se llama después de pintar la primera pantalla
+        if not self.wanted or self._init_thread is not None:
+            return self._init_thread
+        self._init_thread = threading.Thread(target=self._init, name="audio-init", daemon=True)
+        self._init_thread.start()
+        return self._init_thread
+
+    def ensure_init(self):
+        # primer uso sin init_async previo: inicializa en el acto
+        if not self.wanted or self._ready.is_set():
+            return self.enabled
+        if self._init_thread is None:
+            with self._lock:
+                starting = self._init_thread is None
+                if starting:
+                    self._init_thread = threading.current_thread()
+            if starting:
+                self._init()
+        return self.enabled
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    # --- caché ---
+    def _estimate_bytes(self, sound):
+        try:
+            freq, size, channels = pygame.mixer.get_init()
+            return int(sound.get_length() * freq * channels * (abs(size) // 8))
+        except Exception:
+            return 0
+
+    def _store(self, path, sound):
+        nbytes = self._estimate_bytes(sound)
+        with self._lock:
+            if path in self._cache:
+                return self._cache[path][0]
+            self._cache[path] = (sound, nbytes)
+            self._cache_bytes += nbytes
+            # expulsar los menos usados hasta respetar el presupuesto (el recién cargado se queda)
+            while self._cache_bytes > self.budget_bytes and len(self._cache) > 1:
+                _, (_, old_bytes) = self._cache.popitem(last=False)
+                self._cache_bytes -= old_bytes
+                self.evictions += 1
+        return sound
+
+    def get(self, path):
+        if not self.ensure_init():
+            return None
+        with self._lock:
+            if path in self._missing:
+                self.skipped_missing += 1
+                return None
+            entry = self._cache.get(path)
+            if entry is not None:
+                self._cache.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return self._load(path)
+
+    def _load(self, path):
+        try:
+            with metrics.timed("audio.load"):
+                sound = pygame.mixer.Sound(path)
+        except Exception:
+            with self._lock:
+                self._missing.add(path)
+            return None
+        return self._store(path, sound)
+
+    def preload(self, paths):
+        # decodifica en segundo plano para no trabar el hilo de Tk
+        if not self.wanted:
+            return None
+        with self._lock:
+            todo = [p for p in paths if p not in self._cache and p not in self._missing]
+        if not todo:
+            return None
+
+        def run():
+            # si el mezclador todavía se está iniciando, espera a que termine
+            if self._init_thread is None:
+                self.ensure_init()
+            self._ready.wait()
+            if not self.enabled:
+                return
+            for p in todo:
+                self._load(p)
+
+        t = threading.Thread(target=run, name="audio-preload", daemon=True)
+        t.start()
+        return t
+
+    def preload_scene(self, name):
+        return self.preload(SCENE_SOUNDS.get(name, []))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "skipped_missing": self.skipped_missing,
+                "cached": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+                "budget_bytes": self.budget_bytes,
+                "missing": sorted(self._missing),
+                "init_seconds": self.init_seconds,
+            }
+
+    # --- reproducción ---
+    def play(self, path, loops=0):
+        if self._init_thread is not None and not self.ready:
+            # efecto pedido mientras el mezclador arranca: se descarta en vez de bloquear
+            return None
+        sound = self.get(path)
+        if sound is None:
+            return None
+        try:
+            return sound.play(loops=loops)
+        except Exception:
+            return None
+
+    def play_ambience(self, path, loops=-1):
+        if self._init_thread is not None and not self.ready:
+            # se reproduce en cuanto el mezclador termine de arrancar
+            with self._lock:
+                if not self.ready:
+                    self._pending_ambience = (path, loops)
+                    return
+        sound = self.get(path)
+        if sound is None:
+            return
+        try:
+            if self._ambience is not None:
+                self._ambience.play(sound, loops=loops)
+            else:
+                sound.play(loops=loops)
+        except Exception:
+            pass
+
+    def stop_ambience(self, fade_ms=0):
+        # fadeout/stop no bloquean: el mezclador termina por su cuenta
+        with self._lock:
+            self._pending_ambience = None
+        if not self.enabled or self._ambience is None:
+            return
+        try:
+            if fade_ms:
+                self._ambience.fadeout(fade_ms)
+            else:
+                self._ambience.stop()
+        except Exception:
+            pass
+
+    def stop_all(self):
+        if not self.enabled:
+            return
+        try:
+            pygame.mixer.stop()
+        except Exception:
+            pass
@@ -0,0 +1,51 @@
+# benchmarks/headless.py
+# Rendimiento del núcleo sin interfaz: partidas y comandos por segundo con un
+# jugador aleatorio (no necesita pantalla).
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_core import play_random, scenarios  # noqa: E402
+
+
+def run(scenario_id, games, max_turns, seed):
+    scenario = scenarios()[scenario_id]
+    rng = random.Random(seed)
+    commands = 0
+    outcomes = {}
+    t0 = time.perf_counter()
+    for _ in range(games):
+        session = play_random(scenario, rng, max_turns)
+        commands += session.turns
+        outcomes[session.outcome] = outcomes.get(session.outcome, 0) + 1
+    elapsed = time.perf_counter() - t0
+    return {
+        "scenario": scenario_id,
+        "games": games,
+        "commands": commands,
+        "seconds": round(elapsed, 3),
+        "games_per_s": round(games / elapsed),
+        "commands_per_s": round(commands / elapsed),
+        "outcomes": {str(k): v for k, v in sorted(outcomes.items(), key=lambda kv: str(kv[0]))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del núcleo sin interfaz")
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--max-turns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("scenarios", nargs="*")
+    args = parser.parse_args()
+    ids = args.scenarios or list(scenarios())
+    print(json.dumps([run(sid, args.games, args.max_turns, args.seed) for sid in ids], indent=2))
+
+
+if __name__ == "__main__":
+    main()
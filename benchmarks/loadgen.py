@@ -0,0 +1,165 @@
+# benchmarks/loadgen.py
+# Carga para server.py: cientos de clientes asyncio concurrentes, cada uno con su
+# jugador, jugando partidas con el jugador aleatorio de game_core (escenario al
+# azar, ejemplos del corpus como comandos). Mide la latencia de ida y vuelta de
+# cada mensaje (p50 / p99 / máx), el rendimiento y los errores. Sin --server
+# levanta su propio servidor en un puerto libre y con un directorio de
+# guardados temporal.
+#
+#   python benchmarks/loadgen.py --clients 200 --duration 10
+#   python benchmarks/loadgen.py --server 127.0.0.1:8765 --commands 50000 --json
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_core import random_command, scenarios  # noqa: E402
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []   # ms, todas las operaciones
+        self.commands = 0
+        self.games = 0
+        self.outcomes = {}
+        self.errors = 0
+
+
+async def request(reader, writer, stats, op, **fields):
+    fields["op"] = op
+    t0 = time.perf_counter()
+    writer.write(json.dumps(fields, ensure_ascii=False).encode("utf-8") + b"\n")
+    await writer.drain()
+    line = await reader.readline()
+    stats.latencies.append((time.perf_counter() - t0) * 1000)
+    if not line:
+        raise ConnectionError("el servidor cerró la conexión")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        stats.errors += 1
+    return reply
+
+
+async def open_connection(address):
+    if "/" in address or ":" not in address:
+        return await asyncio.open_unix_connection(address)
+    host, port = address.rsplit(":", 1)
+    return await asyncio.open_connection(host, int(port))
+
+
+async def player(n, address, catalog, rng, stats, budget, deadline, max_turns):
+    try:
+        reader, writer = await open_connection(address)
+    except OSError:
+        stats.errors += 1
+        return
+    try:
+        await request(reader, writer, stats, "hello", player=f"carga{n:04d}", new=True)
+        ids = sorted(catalog)
+        while budget[0] > 0 and time.perf_counter() < deadline:
+            scenario = catalog[rng.choice(ids)]
+            reply = await request(reader, writer, stats, "start", scenario=scenario.id)
+            if not reply.get("ok"):
+                continue
+            turns = 0
+            while turns < max_turns and budget[0] > 0 and time.perf_counter() < deadline:
+                budget[0] -= 1
+                reply = await request(reader, writer, stats, "cmd", text=random_command(scenario, rng))
+                stats.commands += 1
+                turns += 1
+                if reply.get("outcome"):
+                    stats.games += 1
+                    stats.outcomes[reply["outcome"]] = stats.outcomes.get(reply["outcome"], 0) + 1
+                    break
+        await request(reader, writer, stats, "bye")
+    except (OSError, ValueError):
+        stats.errors += 1
+    finally:
+        writer.close()
+
+
+async def run(address, clients, duration, commands, max_turns, seed):
+    catalog = scenarios()
+    stats = Stats()
+    budget = [commands or float("inf")]    # compartido: comandos que faltan
+    deadline = time.perf_counter() + duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        player(n, address, catalog, random.Random(seed * 100003 + n), stats, budget, deadline, max_turns)
+        for n in range(clients)
+    ))
+    elapsed = time.perf_counter() - t0
+    lat = sorted(stats.latencies)
+    pick = lambda q: round(lat[min(len(lat) - 1, int(len(lat) * q))], 3) if lat else None  # noqa: E731
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 2),
+        "requests": len(lat),
+        "commands": stats.commands,
+        "games": stats.games,
+        "outcomes": stats.outcomes,
+        "errors": stats.errors,
+        "commands_per_s": round(stats.commands / elapsed) if elapsed else 0,
+        "p50_ms": pick(0.5),
+        "p99_ms": pick(0.99),
+        "max_ms": round(lat[-1], 3) if lat else None,
+    }
+
+
+def spawn_server(saves):
+    # servidor propio en un puerto libre; su primera línea dice dónde escucha
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--port", "0", "--saves", saves],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline().split()
+    if len(line) != 2 or line[0] != "listening":
+        proc.kill()
+        raise SystemExit("el servidor no arrancó")
+    return proc, line[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para server.py")
+    parser.add_argument("--server", default=None, help="host:puerto o socket Unix (por defecto, uno propio)")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos como máximo")
+    parser.add_argument("--commands", type=int, default=0, help="comandos en total (0 = sin límite)")
+    parser.add_argument("--max-turns", type=int, default=200, help="turnos por partida antes de abandonarla")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    proc = tmp = None
+    address = args.server
+    if address is None:
+        tmp = tempfile.TemporaryDirectory()
+        proc, address = spawn_server(tmp.name)
+    try:
+        result = asyncio.run(run(address, args.clients, args.duration, args.commands, args.max_turns, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+            tmp.cleanup()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['clients']} clientes, {result['seconds']} s: {result['commands']} comandos "
+              f"({result['commands_per_s']}/s), {result['games']} partidas terminadas {result['outcomes']}")
+        print(f"latencia: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, máx {result['max_ms']} ms; "
+              f"errores: {result['errors']}")
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
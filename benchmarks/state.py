@@ -0,0 +1,120 @@
+# benchmarks/state.py
+# Estado tipado (state_model) contra el dict anidado de antes, por escenario:
+# memoria por partida, códec del guardado (encode/decode de la sección), copia
+# (deshacer / base del diario), delta por comando y lectura desde el motor (las
+# expresiones compiladas del escenario; get() es la lectura de los solvers).
+#
+#   python benchmarks/state.py --sessions 2000
+#   python benchmarks/state.py --json
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_core import GameSession, scenarios  # noqa: E402
+from persistence import _decode_section, _encode_section, diff_state  # noqa: E402
+from rng_streams import SessionRng  # noqa: E402
+from scenario_engine import compile_expr, expr_env  # noqa: E402
+
+# partidas cortas para tener estados con algo de historia
+SCRIPTS = {
+    "scenario1": ["checar debajo de la cama", "mover cortinas", "abrir cajón"],
+    "scenario2": ["bajar", "entrar R1", "subir", "entrar R3", "buscar"],
+    "scenario3": ["tomar linterna", "buscar", "ir este"],
+}
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return round(statistics.median(samples), 2)
+
+
+def played_states(scenario_id, n, seed):
+    states = []
+    for i in range(n):
+        session = GameSession(scenario_id, rng=SessionRng(seed + i))
+        for cmd in SCRIPTS[scenario_id]:
+            session.send(cmd)
+        states.append(session.state)
+    return states
+
+
+def memory_per_state(build, n):
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    kept = build()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return round((used - base) / n)
+
+
+def bench(scenario_id, n, repeat, seed):
+    typed = played_states(scenario_id, n, seed)
+    plain = [s.to_dict() for s in typed]
+    one_t, one_d = typed[0], plain[0]
+    codec_t, payload_t = _encode_section(one_t)
+    codec_d, payload_d = _encode_section(one_d)
+    # un comando típico: cambia una bandera o un entero (y una celda en el hospital)
+    before_t, before_d = one_t.copy(), copy.deepcopy(one_d)
+    key = next(k for k in one_t.model.names if one_t.model.kinds[k] != "grid")
+    one_t[key] = not one_t[key] if isinstance(one_t[key], bool) else one_t[key] + 1
+    one_d[key] = one_t[key]
+    names = list(one_t.model.names) + list(one_t.extra)
+    reads = names * 20
+    # como en las reglas: el compilado con el modelo enlaza bit o slot
+    exprs_t = [compile_expr(k, one_t.model) for k in reads]
+    exprs_d = [compile_expr(k) for k in reads]
+    env_t, env_d = expr_env(one_t), expr_env(one_d)
+    return {
+        "memory_bytes": {"dict": memory_per_state(lambda: [s.to_dict() for s in typed], n),
+                         "typed": memory_per_state(lambda: [s.copy() for s in typed], n)},
+        "save_bytes": {"dict": len(payload_d), "typed": len(payload_t)},
+        "encode_us": {"dict": timed(lambda: _encode_section(one_d), repeat),
+                      "typed": timed(lambda: _encode_section(one_t), repeat)},
+        "decode_us": {"dict": timed(lambda: _decode_section(codec_d, payload_d), repeat),
+                      "typed": timed(lambda: _decode_section(codec_t, payload_t), repeat)},
+        "copy_us": {"dict": timed(lambda: copy.deepcopy(one_d), repeat),
+                    "typed": timed(one_t.copy, repeat)},
+        "diff_us": {"dict": timed(lambda: diff_state(before_d, one_d), repeat),
+                    "typed": timed(lambda: diff_state({"s": before_t}, {"s": one_t}), repeat)},
+        "read_us": {"dict": timed(lambda: [e(env_d) for e in exprs_d], repeat),
+                    "typed": timed(lambda: [e(env_t) for e in exprs_t], repeat)},
+        "get_us": {"dict": timed(lambda: [one_d.get(k) for k in reads], repeat),
+                   "typed": timed(lambda: [one_t.get(k) for k in reads], repeat)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estado tipado contra dict anidado")
+    parser.add_argument("--sessions", type=int, default=1000, help="partidas para medir memoria")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    results = {sid: bench(sid, args.sessions, args.repeat, args.seed) for sid in scenarios()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'escenario':<12}{'medida':<15}{'dict':>10}{'tipado':>10}{'razón':>8}")
+    for sid, rows in results.items():
+        for name, pair in rows.items():
+            ratio = pair["typed"] / pair["dict"] if pair["dict"] else 0
+            print(f"{sid:<12}{name:<15}{pair['dict']:>10}{pair['typed']:>10}{ratio:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/stats.py
+# Historial de partidas (run_stats) con cientos de miles de filas: inserción por
+# lotes desde el hilo escritor, primera página y página profunda de la
+# clasificación con cursor contra OFFSET, historial de un jugador y totales por
+# desenlace. La base va a un directorio temporal salvo que se pase --db.
+#
+#   python benchmarks/stats.py --runs 300000
+#   python benchmarks/stats.py --runs 100000 --players 20000 --json
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run_stats import PAGE_SIZE, RunStats  # noqa: E402
+
+SCENARIOS = ["scenario1", "scenario2", "scenario3"]
+REASONS = ["descubierto", "atacado"]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def fake_runs(n, players, seed):
+    rng = random.Random(seed)
+    now = time.time()
+    for i in range(n):
+        win = rng.random() < 0.4
+        yield {
+            "player": f"jugador{rng.randrange(players):06d}",
+            "scenario": rng.choice(SCENARIOS),
+            "seed": rng.getrandbits(63),
+            "turns": rng.randint(3, 120),
+            "outcome": "win" if win else "lose",
+            "reason": None if win else rng.choice(REASONS),
+            "duration_ms": rng.randint(5_000, 900_000),
+            "finished": now - (n - i),
+        }
+
+
+def offset_page(stats, scenario, offset):
+    # lo que haría la versión ingenua: saltar filas con OFFSET
+    return stats._reader().execute(
+        "SELECT player, turns, duration_ms FROM best WHERE scenario = ? "
+        "ORDER BY turns, duration_ms, player LIMIT ? OFFSET ?", (scenario, PAGE_SIZE, offset)).fetchall()
+
+
+def bench(path, runs, players, repeat, seed):
+    stats = RunStats(path)
+    try:
+        t0 = time.perf_counter()
+        for run in fake_runs(runs, players, seed):
+            stats.record(run)
+        enqueue_s = time.perf_counter() - t0
+        stats.flush(timeout=600)
+        insert_s = time.perf_counter() - t0
+
+        scenario = SCENARIOS[0]
+        ranked = stats._reader().execute("SELECT COUNT(*) FROM best WHERE scenario = ?", (scenario,)).fetchone()[0]
+        deep = max(0, ranked - PAGE_SIZE)
+        # cursor de la página profunda: la fila justo antes de ella
+        before_deep = offset_page(stats, scenario, deep - 1)[0] if deep else None
+        player = f"jugador{0:06d}"
+        last_id = stats.history(player, limit=PAGE_SIZE)[-1][0]
+        return {
+            "runs": runs,
+            "ranked_players": ranked,
+            "enqueue_us_per_run": round(enqueue_s / runs * 1e6, 2),
+            "insert_runs_per_s": round(runs / insert_s),
+            "db_mb": round(os.path.getsize(path) / 1e6, 1),
+            "leaderboard_first_ms": timed(lambda: stats.leaderboard(scenario), repeat),
+            "leaderboard_deep_cursor_ms": timed(lambda: stats.leaderboard(scenario, before_deep), repeat),
+            "leaderboard_deep_offset_ms": timed(lambda: offset_page(stats, scenario, deep), repeat),
+            "history_first_ms": timed(lambda: stats.history(player), repeat),
+            "history_next_ms": timed(lambda: stats.history(player, last_id), repeat),
+            "totals_ms": timed(lambda: stats.totals(scenario), max(1, repeat // 10)),
+        }
+    finally:
+        stats.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historial de partidas en SQLite con muchas filas")
+    parser.add_argument("--runs", type=int, default=300_000)
+    parser.add_argument("--players", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", default=None, help="archivo de la base (por defecto, uno temporal)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    if args.db:
+        result = bench(args.db, args.runs, args.players, args.repeat, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = bench(os.path.join(tmp, "stats.db"), args.runs, args.players, args.repeat, args.seed)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for name, value in result.items():
+        print(f"{name:<30}{value:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+# benchmarks/suite.py
+# Suite reproducible de las rutas calientes: guardado/carga, despacho de comandos,
+# autocompletado, frames de la máquina de escribir, transiciones de pantalla y
+# arranque en frío.
+# Funciona sin pantalla: si no hay $DISPLAY intenta levantar Xvfb y, si tampoco
+# está, usa un root de Tk simulado para la máquina de escribir y marca como
+# "skipped" lo que necesita widgets reales.
+#
+#   python benchmarks/suite.py --out results.json
+#   python benchmarks/suite.py --baseline results.json --threshold 0.25
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_core import GameSession, scenarios  # noqa: E402
+from persistence import SaveService, read_state, write_state  # noqa: E402
+from rng_streams import SessionRng  # noqa: E402
+from suggest import SuggestIndex, Suggester  # noqa: E402
+
+APP_FILE = os.path.join(ROOT, "proyecto metodologias.py")
+
+# comandos fijos por escenario (se repiten en partidas nuevas hasta completar)
+SCRIPTS = {
+    "scenario1": ["mirar por la ventana", "mover cortinas", "checar debajo de la cama", "abrir cajón",
+                  "bailar", "usar destornillador"],
+    "scenario2": ["buscar", "subir", "elevador", "bajar", "entrar R1", "pista", "bajar", "salir"],
+    "scenario3": ["tomar linterna", "buscar", "avanzar", "beber", "usar cuerda", "avanzar", "avanzar"],
+}
+
+
+# ---------------------------
+# Medición
+# ---------------------------
+def measure(fn, repeat, warmup=3):
+    # ms por llamada; si fn devuelve un entero, es el número de operaciones a dividir
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        ops = fn()
+        elapsed = (time.perf_counter() - t0) * 1000
+        samples.append(elapsed / ops if isinstance(ops, int) and ops > 0 else elapsed)
+    return summarize(samples)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        "n": n,
+        "mean_ms": round(statistics.mean(ordered), 5),
+        "p50_ms": round(ordered[n // 2], 5),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))], 5),
+        "min_ms": round(ordered[0], 5),
+    }
+
+
+# ---------------------------
+# Estados de ejemplo (semillas fijas)
+# ---------------------------
+def small_state():
+    return {
+        "player_name": "bench",
+        "current_scene": "scenario1",
+        "scene_data": {"scenario1": {"found_key": True, "bed_checked": True, "curtains_open": False,
+                                     "window_checked": False, "escaped": False}},
+    }
+
+
+def hospital_state():
+    session = GameSession("scenario2", rng=SessionRng(1))
+    forest = GameSession("scenario3", rng=SessionRng(1))
+    return {
+        "player_name": "bench",
+        "current_scene": "scenario2",
+        "scene_data": {"scenario2": session.state, "scenario3": forest.state},
+        "rng": {"scenario2": session.rng.to_dict()},
+    }
+
+
+# ---------------------------
+# Benchmarks sin pantalla
+# ---------------------------
+def bench_saves(results, workdir, scale):
+    for label, state in (("small", small_state()), ("hospital", hospital_state())):
+        path = os.path.join(workdir, f"{label}.tlc")
+        results[f"save.write_state.{label}"] = measure(lambda: write_state(path, state), 40 * scale)
+        results[f"save.read_state.{label}"] = measure(lambda: read_state(path), 40 * scale)
+        results[f"save.read_state_full.{label}"] = measure(lambda: read_state(path, lazy=False), 40 * scale)
+
+    # diario: un delta por comando (lo que paga el hilo de Tk en cada acción)
+    path = os.path.join(workdir, "journal.tlc")
+    service = SaveService(path, delay=0)   # sin agrupar: el costo de un delta
+    state = hospital_state()
+    service.load()
+    scene = state["scene_data"]["scenario2"]
+
+    def step():
+        scene["floor"] = scene["floor"] % 12 + 1
+        service.mark_dirty(state)
+    results["save.journal_delta.hospital"] = measure(step, 200 * scale)
+    service.close(state)
+
+
+def bench_dispatch(results, scale):
+    for scenario_id, script in SCRIPTS.items():
+        seeds = itertools.count(1)
+
+        def play(scenario_id=scenario_id, script=script, seeds=seeds):
+            # varias partidas con semillas consecutivas (la misma serie en cada corrida)
+            sent = 0
+            for _ in range(20):
+                session = GameSession(scenario_id, rng=SessionRng(next(seeds)))
+                for cmd in script:
+                    session.send(cmd)
+                    sent += 1
+                    if session.finished:
+                        break
+            return sent
+        results[f"dispatch.{scenario_id}"] = measure(play, 20 * scale)
+        # generación de un escenario nuevo (incluye el solver del hospital)
+        results[f"new_state.{scenario_id}"] = measure(
+            lambda scenario_id=scenario_id: GameSession(scenario_id, rng=SessionRng(7)), 50 * scale)
+
+
+def bench_suggest(results, scale):
+    # una tecla a la vez sobre los comandos de SCRIPTS, y con una errata (búsqueda difusa)
+    for scenario_id, script in SCRIPTS.items():
+        scenario = scenarios()[scenario_id]
+        typed = [cmd[:n] for cmd in script for n in range(1, len(cmd) + 1)]
+        typos = [cmd[:n] + "x" + cmd[n + 1:] for cmd in script for n in range(2, len(cmd))]
+        suggester = Suggester(SuggestIndex(scenario), scenario.new_state(check=False))
+
+        def keys(texts):
+            def run():
+                for text in texts:
+                    suggester.suggest(text)
+                return len(texts)
+            return run
+        results[f"suggest.key.{scenario_id}"] = measure(keys(typed), 20 * scale)
+        results[f"suggest.typo.{scenario_id}"] = measure(keys(typos), 20 * scale)
+        results[f"suggest.index.{scenario_id}"] = measure(lambda scenario=scenario: SuggestIndex(scenario), 20 * scale)
+
+
+class _MockRoot:
+    # root mínimo para la máquina de escribir: after() en cola, sin ventana
+    def __init__(self):
+        self.queue = []
+
+    def after(self, ms, fn, *args):
+        self.queue.append((fn, args))
+        return len(self.queue)
+
+    def after_cancel(self, after_id):
+        pass
+
+
+class _MockLabel:
+    def __init__(self):
+        self.text = ""
+
+    def config(self, text=None, **kw):
+        self.text = text
+
+
+def bench_typewriter(results, tk_root, scale):
+    from animation import Typewriter
+
+    text = ("Despiertas en una habitación con ventanas empañadas. " * 400)[:20000]
+    root = tk_root or _MockRoot()
+    if tk_root is not None:
+        import tkinter as tk
+        label = tk.Label(tk_root, wraplength=800)
+        label.pack()
+    else:
+        label = _MockLabel()
+    # reloj simulado: cada tick avanza un frame exacto (16 ms, ~16 caracteres nuevos)
+    now = [0.0]
+    writer = Typewriter(root, clock=lambda: now[0])
+
+    def frames():
+        writer.add(label, text, delay=1)
+        for n in range(1, 61):
+            now[0] += writer.frame_ms / 1000
+            writer._tick()
+            if tk_root is not None:
+                tk_root.update_idletasks()
+        writer.cancel_all()
+        return n
+    results["typewriter.frame.20k"] = measure(frames, 10 * scale)
+    results["typewriter.frame.20k"]["backend"] = "tk" if tk_root is not None else "mock"
+
+
+def _run_python(code, env=None):
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                         env=env, timeout=120)
+    return (time.perf_counter() - t0) * 1000, out
+
+
+def bench_cold_start(results, scale, env):
+    # import del juego en un proceso nuevo (sin ventana) y sondeo de pygame
+    code = ("import importlib.util, time; t=time.perf_counter();"
+            f"s=importlib.util.spec_from_file_location('tlc', {APP_FILE!r});"
+            "m=importlib.util.module_from_spec(s); s.loader.exec_module(m);"
+            "print((time.perf_counter()-t)*1000)")
+    wall, inner = [], []
+    for _ in range(3 * scale):
+        ms, out = _run_python(code, env)
+        wall.append(ms)
+        inner.append(float(out.stdout.strip().splitlines()[-1]))
+    results["startup.process_import"] = summarize(wall)
+    results["startup.module_import"] = summarize(inner)
+
+    code = ("from audio import AudioManager; a=AudioManager(); a.ensure_init();"
+            "print(a.init_seconds * 1000, a.enabled)")
+    probe = []
+    enabled = None
+    for _ in range(3 * scale):
+        _, out = _run_python(code, env)
+        ms, enabled = out.stdout.split()
+        probe.append(float(ms))
+    results["startup.audio_probe"] = summarize(probe)
+    results["startup.audio_probe"]["audio_enabled"] = enabled == "True"
+
+
+# ---------------------------
+# Benchmarks con Tk real (pantalla o Xvfb)
+# ---------------------------
+def bench_first_frame(results, workdir, scale, env):
+    frames = []
+    for _ in range(3 * scale):
+        out = subprocess.run([sys.executable, APP_FILE, "--startup-report"], cwd=tempfile.mkdtemp(dir=workdir),
+                             capture_output=True, text=True, env=env, timeout=120)
+        frames.append(json.loads(out.stdout.strip().splitlines()[-1])["first_frame_ms"])
+    results["startup.first_frame"] = summarize(frames)
+
+
+def bench_transitions(results, workdir, tk_root, scale):
+    spec = importlib.util.spec_from_file_location("the_last_code", APP_FILE)
+    tlc = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(tlc)
+    app = tlc.TheLastCodeApp(tk_root, profiles_dir=tempfile.mkdtemp(dir=workdir))
+    app.player_name = "bench"
+    app.typewriter.instant = True
+    steps = [
+        app.show_welcome_screen,
+        app.show_name_screen,
+        app.show_scenario_selection,
+        lambda: app.scene("scenario1"),
+        app.win_screen,
+        lambda: app.lose_screen("descubierto"),
+    ]
+    for pooled in (True, False):
+        app.screen_pool.pooled = pooled
+
+        def cycle():
+            for step in steps:
+                step()
+                tk_root.update_idletasks()
+            return len(steps)
+        results[f"screen.transition.{'pooled' if pooled else 'rebuild'}"] = measure(cycle, 10 * scale)
+    app.lag_monitor.stop()
+
+
+def start_display():
+    # devuelve (env, proceso Xvfb o None); env sin DISPLAY si no hay forma
+    env = dict(os.environ)
+    if env.get("DISPLAY"):
+        return env, None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        return env, None
+    display = f":{random.Random().randint(90, 190)}"
+    proc = subprocess.Popen([xvfb, display, "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    env["DISPLAY"] = display
+    os.environ["DISPLAY"] = display
+    return env, proc
+
+
+def tk_root_or_none():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        return root
+    except Exception:
+        return None
+
+
+# ---------------------------
+# Regresiones
+# ---------------------------
+def compare(results, baseline, threshold, min_delta_ms):
+    # lista de (nombre, antes, ahora) con mean_ms peor que baseline * (1 + threshold)
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before or "mean_ms" not in now:
+            continue
+        limit = before["mean_ms"] * (1 + threshold)
+        if now["mean_ms"] > limit and now["mean_ms"] - before["mean_ms"] > min_delta_ms:
+            regressions.append((name, before["mean_ms"], now["mean_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas calientes")
+    parser.add_argument("--out", help="guarda los resultados en JSON")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.25, help="regresión permitida (0.25 = +25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.01, help="ignora diferencias menores (ruido)")
+    parser.add_argument("--scale", type=int, default=1, help="multiplica las repeticiones")
+    parser.add_argument("--only", action="append", default=[], help="prefijo de benchmarks a correr")
+    args = parser.parse_args(argv)
+    out = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    random.seed(0)
+    scenarios()   # compilar escenarios fuera de las mediciones
+    env, xvfb = start_display()
+    tk_root = tk_root_or_none()
+    workdir = tempfile.mkdtemp(prefix="tlc-suite-")
+    os.chdir(workdir)   # el juego escribe en el directorio actual
+    results, skipped = {}, []
+    groups = [
+        ("save", lambda: bench_saves(results, workdir, args.scale)),
+        ("dispatch", lambda: bench_dispatch(results, args.scale)),
+        ("suggest", lambda: bench_suggest(results, args.scale)),
+        ("typewriter", lambda: bench_typewriter(results, tk_root, args.scale)),
+        ("startup", lambda: bench_cold_start(results, args.scale, env)),
+        ("startup.first_frame", lambda: bench_first_frame(results, workdir, args.scale, env) if tk_root else skipped.append("startup.first_frame")),
+        ("screen", lambda: bench_transitions(results, workdir, tk_root, args.scale) if tk_root else skipped.append("screen.transition")),
+    ]
+    try:
+        for prefix, run in groups:
+            if args.only and not any(prefix.startswith(o) or o.startswith(prefix) for o in args.only):
+                continue
+            run()
+    finally:
+        if tk_root is not None:
+            tk_root.destroy()
+        if xvfb is not None:
+            xvfb.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "display": "xvfb" if xvfb else ("tk" if tk_root else "none"),
+            "time": round(time.time()),
+            "skipped": skipped,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for name, before, now in regressions:
+            print(f"REGRESIÓN {name}: {before:.4f} ms -> {now:.4f} ms (+{(now / before - 1) * 100:.0f}%)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"Sin regresiones (umbral +{args.threshold * 100:.0f}%)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# benchmarks/transitions.py
+# Latencia de transición entre pantallas: reconstruir (como antes) vs. pantallas reutilizadas.
+# Necesita pantalla; sin ella: xvfb-run python benchmarks/transitions.py
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_app_module():
+    spec = importlib.util.spec_from_file_location("the_last_code", os.path.join(ROOT, "proyecto metodologias.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(pooled, rounds):
+    tlc = load_app_module()
+    import tkinter as tk
+    root = tk.Tk()
+    app = tlc.TheLastCodeApp(root)
+    app.screen_pool.pooled = pooled
+    app.player_name = "bench"
+    app.typewriter.instant = True
+    # recorrido típico de un jugador
+    steps = [
+        app.show_welcome_screen,
+        app.show_name_screen,
+        app.show_scenario_selection,
+        lambda: app.scene("scenario1"),
+        app.win_screen,
+        lambda: app.scene("scenario2"),
+        lambda: app.lose_screen("descubierto"),
+        lambda: app.scene("scenario3"),
+    ]
+    samples = []
+    for _ in range(rounds):
+        for step in steps:
+            t0 = time.perf_counter()
+            step()
+            root.update_idletasks()
+            samples.append((time.perf_counter() - t0) * 1000)
+    root.destroy()
+    first = samples[:len(steps)]
+    rest = samples[len(steps):] or first
+    return {
+        "mode": "pooled" if pooled else "rebuild",
+        "first_visit_ms": round(statistics.mean(first), 3),
+        "mean_ms": round(statistics.mean(rest), 3),
+        "p95_ms": round(sorted(rest)[int(len(rest) * 0.95) - 1], 3),
+        "builds": app.screen_pool.builds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de transiciones entre pantallas")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    # el juego guarda en el directorio actual: usar uno temporal
+    os.chdir(tempfile.mkdtemp(prefix="tlc-bench-"))
+    results = [run(False, args.rounds), run(True, args.rounds)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/worldgen.py
+# Bosque procedural (escenario 3): latencia de generación por chunk y memoria /
+# tamaño del guardado durante una caminata larga. Con drop_far() los chunks en
+# memoria y el guardado deben quedarse planos aunque el jugador no pare de andar.
+#
+#   python benchmarks/worldgen.py --chunks 2000 --steps 20000
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import forest  # noqa: E402
+from persistence import encode_state  # noqa: E402
+
+
+class _Env:
+    # lo mínimo que usan las operaciones del bosque
+    def __init__(self, state, rng):
+        self.state = state
+        self.rng = rng
+        self.vars = {}
+        self.lines = []
+
+
+def bench_chunks(count, seed):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        cx, cy = rng.randint(-10 ** 6, 10 ** 6), rng.randint(-10 ** 6, 10 ** 6)
+        t0 = time.perf_counter()
+        forest.generate_chunk(seed, cx, cy)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "chunks": count,
+        "mean_ms": round(statistics.mean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[int(len(samples) * 0.95)], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def bench_walk(steps, seed, checkpoints=10):
+    # caminata larga: sobre todo hacia el este, girando de vez en cuando
+    rng = random.Random(seed)
+    state = {"pos": 0}
+    env = _Env(state, rng)
+    forest.setup(env)
+    world = forest.world_for(state["forest"]["seed"])
+    tracemalloc.start()
+    rows = []
+    t0 = time.perf_counter()
+    for step in range(1, steps + 1):
+        env.vars = {"dir": rng.choice(["ESTE"] * 6 + ["NORTE", "SUR"]) if rng.random() < 0.3 else None}
+        env.lines = []
+        forest.advance(env)
+        if step % max(1, steps // checkpoints) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            f = state["forest"]
+            rows.append({
+                "step": step,
+                "x": f["x"],
+                "y": f["y"],
+                "chunks_loaded": len(world.chunks),
+                "chunks_generated": world.generated,
+                "traced_kb": round(current / 1024, 1),
+                "save_bytes": len(encode_state({"scene_data": {"scenario3": state}})),
+                "diff_chunks": len(f["taken"]),
+            })
+    elapsed = time.perf_counter() - t0
+    tracemalloc.stop()
+    return {"steps": steps, "steps_per_s": round(steps / elapsed), "checkpoints": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del bosque procedural")
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks a generar para medir latencia")
+    parser.add_argument("--steps", type=int, default=20000, help="pasos de la caminata larga")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    chunks = bench_chunks(args.chunks, args.seed)
+    walk = bench_walk(args.steps, args.seed)
+    if args.json:
+        print(json.dumps({"chunks": chunks, "walk": walk}, indent=2))
+        return
+    print(f"generación: {chunks['chunks']} chunks, media {chunks['mean_ms']} ms, "
+          f"p50 {chunks['p50_ms']} ms, p95 {chunks['p95_ms']} ms, máx {chunks['max_ms']} ms")
+    print(f"caminata: {walk['steps']} pasos, {walk['steps_per_s']} pasos/s")
+    print(f"{'paso':>8}{'x':>9}{'y':>7}{'cargados':>10}{'generados':>11}{'memoria KB':>12}{'guardado B':>12}{'diffs':>7}")
+    for r in walk["checkpoints"]:
+        print(f"{r['step']:>8}{r['x']:>9}{r['y']:>7}{r['chunks_loaded']:>10}{r['chunks_generated']:>11}"
+              f"{r['traced_kb']:>12}{r['save_bytes']:>12}{r['diff_chunks']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# client.py
+# Cliente del servidor de partidas (server.py). GameClient es síncrono (un
+# socket, una línea JSON por mensaje): lo usan el cliente de terminal de abajo y
+# la app de Tk con --server, a través de RemoteSession / RemoteProfiles /
+# RemoteSaver / RemoteStats, que tienen la misma cara que GameSession /
+# ProfileStore / SaveService / RunStats. En modo remoto el estado, los guardados
+# y el historial de partidas viven en el servidor.
+#
+#   python client.py --server 127.0.0.1:8765 --name Ana
+#   python "proyecto metodologias.py" --server 127.0.0.1:8765
+import argparse
+import json
+import socket
+import sys
+import threading
+
+from game_core import Step
+
+
+class ServerError(Exception):
+    pass
+
+
+def connect(address, timeout=10):
+    # "host:puerto" o la ruta de un socket Unix
+    if "/" in address or ":" not in address:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+        return sock
+    host, port = address.rsplit(":", 1)
+    sock = socket.create_connection((host, int(port)), timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+class GameClient:
+    def __init__(self, address="127.0.0.1:8765", timeout=10, lazy=False):
+        self.address = address
+        self.timeout = timeout
+        self._sock = self._file = None
+        # la app llama desde el pool de hilos: una petición con su respuesta a la
+        # vez, si no las líneas se cruzan
+        self._lock = threading.Lock()
+        self.broken = False
+        self.player = None
+        if not lazy:
+            self._connect()
+
+    def _connect(self):
+        # con lazy=True la conexión se abre en la primera petición (p.ej. en el
+        # pool de hilos de la app, no en el hilo de Tk)
+        self._sock = connect(self.address, self.timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def request(self, op, **fields):
+        fields["op"] = op
+        payload = json.dumps(fields, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            if self.broken:
+                raise ServerError("la conexión con el servidor se perdió")
+            try:
+                if self._file is None:
+                    self._connect()
+                self._file.write(payload)
+                self._file.flush()
+                line = self._file.readline()
+                if not line.endswith(b"\n"):
+                    raise ServerError("el servidor cerró la conexión")
+                reply = json.loads(line)
+            except (OSError, ValueError, ServerError):
+                # tiempo agotado o línea a medias: la respuesta que falta llegaría
+                # como la de la siguiente petición, así que la conexión ya no sirve
+                self._abandon()
+                raise
+        if not reply.get("ok"):
+            raise ServerError(reply.get("error", "error desconocido"))
+        return reply
+
+    def hello(self, player, new=False):
+        reply = self.request("hello", player=player, new=new)
+        self.player = reply["player"]
+        return reply
+
+    def profiles(self):
+        return self.request("profiles")["profiles"]
+
+    def start(self, scenario_id):
+        return RemoteSession(self, self.request("start", scenario=scenario_id))
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self.request("bye")
+            except (OSError, ValueError, ServerError):
+                pass
+        self._abandon()
+
+    def _abandon(self):
+        self.broken = True
+        for closable in (self._file, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+
+
+class RemoteSession:
+    # la partida corre en el servidor; send() devuelve un Step sin estado
+    def __init__(self, client, reply):
+        self.client = client
+        self.scenario_id = reply["scenario"]
+        self.title = reply["title"]
+        self._intro = reply["intro"]
+        self.turns = reply["turns"]
+        self.outcome = None
+        self.reason = None
+        self.intent = None
+
+    @property
+    def finished(self):
+        return self.outcome is not None
+
+    def intro(self):
+        return self._intro
+
+    def send(self, cmd):
+        cmd = cmd.strip()
+        if not cmd or self.finished:
+            return Step([], None, self.outcome, self.reason)
+        reply = self.client.request("cmd", text=cmd)
+        self.turns = reply["turns"]
+        self.intent = reply["intent"]
+        if reply["outcome"]:
+            self.outcome, self.reason = reply["outcome"], reply["reason"]
+        return Step(reply["lines"], None, reply["outcome"], reply["reason"])
+
+
+# ---------------------------
+# Para la app de Tk (modo remoto)
+# ---------------------------
+class RemoteProfiles:
+    # lo que la app usa de ProfileStore, respondido por el servidor. El índice
+    # empieza vacío: refresh() habla con el servidor y la app lo llama en el pool
+    def __init__(self, client):
+        self.client = client
+        self._profiles = {}
+
+    def refresh(self):
+        self._profiles = self.client.profiles()
+
+    def has_profiles(self):
+        return bool(self._profiles)
+
+    def names(self):
+        return sorted(self._profiles, key=lambda n: self._profiles[n].get("updated", 0), reverse=True)
+
+    def get(self, name):
+        return self._profiles.get(name)
+
+    def open(self, name, **service_options):
+        try:
+            return RemoteSaver(self.client, self.client.hello(name))
+        except ServerError:
+            return None   # en uso en otro kiosco
+
+    def touch(self, name, **fields):
+        pass   # el servidor actualiza el índice al guardar
+
+    def release(self, name):
+        pass
+
+    def import_legacy(self, save_path, json_path=None):
+        return None
+
+
+class RemoteStats:
+    # lo que la app usa de RunStats; el servidor ya registra cada partida terminada
+    def __init__(self, client):
+        self.client = client
+        self._totals = {}   # escenario -> totales de la última primera página
+
+    def record(self, run):
+        pass
+
+    def close(self):
+        pass
+
+    def leaderboard(self, scenario, after=None, limit=None):
+        fields = {"scenario": scenario, "after": list(after) if after else None}
+        if limit:
+            fields["limit"] = limit
+        reply = self.client.request("leaderboard", **fields)
+        if after is None:
+            self._totals[scenario] = {(o, r): n for o, r, n in reply["totals"]}
+        return [tuple(row) for row in reply["rows"]]
+
+    def history(self, player, before=None, limit=None):
+        # siempre el jugador de la conexión
+        fields = {"before": before}
+        if limit:
+            fields["limit"] = limit
+        return [tuple(row) for row in self.client.request("history", **fields)["rows"]]
+
+    def totals(self, scenario):
+        # llegan con la primera página de la clasificación
+        return self._totals.get(scenario, {})
+
+
+class RemoteSaver:
+    # el servidor guarda solo; aquí solo se piden los datos del perfil
+    def __init__(self, client, reply):
+        self.client = client
+        self.reply = reply
+
+    def load(self):
+        # se pregunta otra vez: ganar o perder cambian el guardado en el servidor
+        self.reply = self.client.hello(self.reply["player"])
+        return {"player_name": self.reply["player"], "current_scene": self.reply["current_scene"]}
+
+    def delete(self):
+        self.reply = self.client.hello(self.reply["player"], new=True)
+
+    def mark_dirty(self, data):
+        pass
+
+    def commit(self, data=None):
+        pass
+
+    def write(self):
+        pass
+
+    def flush(self, data=None):
+        pass
+
+    def close(self, data=None):
+        pass
+
+
+# ---------------------------
+# Cliente de terminal
+# ---------------------------
+def play(client, lines=sys.stdin, out=sys.stdout):
+    # elige escenario por número o id; "salir" termina
+    scenarios = client.request("hello", player=client.player)["scenarios"]
+
+    def ask(prompt):
+        out.write(prompt)
+        out.flush()
+        line = lines.readline()
+        return None if not line else line.strip()
+
+    while True:
+        for n, s in enumerate(scenarios, 1):
+            out.write(f"  {n}. {s['title']} ({s['card'].get('difficulty', '')})\n")
+        choice = ask("escenario> ")
+        if choice is None or choice.lower() in ("salir", "q"):
+            return
+        ids = [s["id"] for s in scenarios]
+        scenario_id = ids[int(choice) - 1] if choice.isdigit() and 0 < int(choice) <= len(ids) else choice
+        try:
+            session = client.start(scenario_id)
+        except ServerError as e:
+            out.write(f"{e}\n")
+            continue
+        out.write(f"\n{session.title}\n{session.intro()}\n")
+        while not session.finished:
+            cmd = ask("> ")
+            if cmd is None:
+                return
+            for line in session.send(cmd).lines:
+                out.write(line + "\n")
+        out.write("¡Ganaste!\n\n" if session.outcome == "win" else f"Fin del juego ({session.reason}).\n\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cliente de terminal del servidor de partidas")
+    parser.add_argument("--server", default="127.0.0.1:8765", help="host:puerto o ruta de socket Unix")
+    parser.add_argument("--name", required=True)
+    parser.add_argument("--new", action="store_true", help="reinicia el guardado del jugador")
+    args = parser.parse_args(argv)
+    try:
+        client = GameClient(args.server)
+        reply = client.hello(args.name, new=args.new)
+    except (OSError, ServerError) as e:
+        print(f"No se pudo conectar a {args.server}: {e}", file=sys.stderr)
+        return 1
+    if reply["current_scene"]:
+        print(f"Partida guardada en {reply['current_scene']}.")
+    try:
+        play(client)
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
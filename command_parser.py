@@ -0,0 +1,195 @@
+# command_parser.py
+import json
+import os
+import re
+import sys
+from collections import namedtuple
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+CORPUS_FILE = os.path.join(SCENARIOS_DIR, "corpus.json")
+
+TOKEN_RE = re.compile(r"\w+")
+
+# resultado del análisis: intención, tokens y valores extraídos (p.ej. room="R2")
+Intent = namedtuple("Intent", "name tokens slots")
+
+
+def tokenize(cmd):
+    return TOKEN_RE.findall(cmd.lower())
+
+
+# ---------------------------
+# Índice de sinónimos
+# ---------------------------
+class _CharTrie:
+    # palabra -> ids de vocabulario; "x*" es raíz: coincide con cualquier token que empiece por x
+    def __init__(self):
+        self.root = {}
+
+    def add(self, word, word_id):
+        stem = word.endswith("*")
+        node = self.root
+        for ch in word.rstrip("*"):
+            node = node.setdefault(ch, {})
+        node.setdefault("*" if stem else "$", []).append(word_id)
+
+    def lookup(self, token):
+        found = []
+        node = self.root
+        for ch in token:
+            found.extend(node.get("*", ()))
+            node = node.get(ch)
+            if node is None:
+                return found
+        found.extend(node.get("*", ()))
+        found.extend(node.get("$", ()))
+        return found
+
+
+class CommandParser:
+    # Compila la tabla de comandos de un escenario una sola vez:
+    #  - cada palabra distinta de los sinónimos recibe un id (trie de caracteres)
+    #  - cada frase es un camino de ids en un trie de frases
+    # parse() recorre los tokens una vez; el costo depende del largo de la entrada
+    # y no de la cantidad de reglas. Si varias intenciones coinciden gana la que
+    # aparece primero en la tabla (el mismo orden que tenían los if/elif).
+    def __init__(self, commands, slots=None):
+        self.words = _CharTrie()
+        self.phrases = {}
+        self.max_len = 1
+        self.intents = []
+        vocab = {}
+        for rank, entry in enumerate(commands):
+            self.intents.append(entry["intent"])
+            for phrase in entry["phrases"]:
+                node = self.phrases
+                parts = phrase.split()
+                self.max_len = max(self.max_len, len(parts))
+                for word in parts:
+                    if word not in vocab:
+                        vocab[word] = len(vocab)
+                        self.words.add(word, vocab[word])
+                    node = node.setdefault(vocab[word], {})
+                best = node.get(None)
+                node[None] = rank if best is None else min(best, rank)
+        self.slots = {name: re.compile(pattern) for name, pattern in (slots or {}).items()}
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        return cls(table["commands"], table.get("slots"))
+
+    def parse(self, cmd):
+        tokens = tokenize(cmd)
+        ids = [self.words.lookup(t) for t in tokens]
+        best = None
+        for start in range(len(tokens)):
+            frontier = [self.phrases]
+            for pos in range(start, min(start + self.max_len, len(tokens))):
+                nxt = []
+                for node in frontier:
+                    for word_id in ids[pos]:
+                        child = node.get(word_id)
+                        if child is not None:
+                            nxt.append(child)
+                            rank = child.get(None)
+                            if rank is not None and (best is None or rank < best):
+                                best = rank
+                if not nxt:
+                    break
+                frontier = nxt
+        slots = {}
+        for name, pattern in self.slots.items():
+            for t in tokens:
+                if pattern.fullmatch(t):
+                    slots[name] = t.upper()
+                    break
+        return Intent(None if best is None else self.intents[best], tokens, slots)
+
+
+_parsers = {}
+
+
+def parser_for(scenario):
+    # se compila una vez por escenario
+    parser = _parsers.get(scenario)
+    if parser is None:
+        parser = _parsers[scenario] = CommandParser.from_file(os.path.join(SCENARIOS_DIR, f"{scenario}.json"))
+    return parser
+
+
+# ---------------------------
+# Corpus de regresión
+# ---------------------------
+# Reglas por subcadena tal como estaban en scene1/2/3; solo se usan para comprobar
+# que cada frase del corpus sin clave "legacy" sigue cayendo en la misma rama.
+LEGACY_RULES = {
+    "scenario1": [
+        ("check_bed", ["bajo", "debajo", "cama"]),
+        ("curtains", ["cortina", "mover"]),
+        ("window", ["ventana", "mirar"]),
+        ("drawer", ["cajón", "abrir cajón"]),
+        ("use_tool", ["usar", "forzar", "destornillador"]),
+    ],
+    "scenario2": [
+        ("go_up", ["subir", "ir arriba", "subir a"], ["ir a", "subir", "bajar"]),
+        ("go_down", ["bajar", "ir abajo", "bajar a"], ["ir a", "subir", "bajar"]),
+        ("go", ["ir a", "subir", "bajar"]),
+        ("elevator", ["elevador"]),
+        ("enter_room", ["entrar r", "entrar a r", "abrir r"]),
+        ("search", ["buscar", "revisar", "inspeccionar"]),
+        ("exit", ["salir", "urgencias", "salida"]),
+    ],
+    "scenario3": [
+        ("take_light", ["tomar linterna", "linterna"]),
+        ("advance", ["avanzar", "seguir", "ir"]),
+        ("search", ["buscar", "inspeccionar"]),
+        ("use_rope", ["usar cuerda"]),
+        ("drink", ["beber", "agua"]),
+    ],
+}
+
+
+def legacy_intent(scenario, cmd):
+    cmd = cmd.strip().lower()   # como llegaba desde el Entry
+    for rule in LEGACY_RULES[scenario]:
+        name, needles = rule[0], rule[1]
+        # (scenario2) subir/bajar estaban anidados dentro de "ir a"/"subir"/"bajar"
+        outer = rule[2] if len(rule) > 2 else None
+        if outer is not None and not any(n in cmd for n in outer):
+            continue
+        if any(n in cmd for n in needles):
+            return name
+    return None
+
+
+def check_corpus(path=CORPUS_FILE):
+    # devuelve la lista de fallos (vacía = todo bien)
+    with open(path, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    failures = []
+    for scenario, cases in corpus.items():
+        parser = parser_for(scenario)
+        for case in cases:
+            cmd, expected = case["input"], case["intent"]
+            got = parser.parse(cmd).name
+            if got != expected:
+                failures.append(f"{scenario}: {cmd!r} -> {got} (esperado {expected})")
+            legacy = legacy_intent(scenario, cmd)
+            # "legacy" documenta los falsos positivos corregidos; si no está, debe ser igual
+            if legacy != case.get("legacy", expected):
+                failures.append(f"{scenario}: {cmd!r} antes era {legacy} (corpus dice {case.get('legacy', expected)})")
+    return failures
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        problems = check_corpus()
+        for p in problems:
+            print(p)
+        print("corpus OK" if not problems else f"{len(problems)} fallos")
+        sys.exit(1 if problems else 0)
+    scenario = sys.argv[1] if len(sys.argv) > 1 else "scenario1"
+    for line in sys.stdin:
+        print(parser_for(scenario).parse(line.strip()))
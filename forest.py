@@ -0,0 +1,400 @@
+# forest.py
+# Bosque procedural del escenario 3. El mundo es una cuadrícula sin bordes
+# partida en chunks de CHUNK x CHUNK casillas; cada chunk se genera solo cuando
+# hace falta, a partir de (semilla, cx, cy), así que siempre sale igual:
+#   - un cruce de senderos y caminos hacia los bordes (la posición del paso en
+#     cada borde depende solo del borde, por eso los senderos empalman)
+#   - a veces una cabaña en el cruce; si no, una señal que apunta a la más cercana
+#   - territorios de animales (de 2x2 chunks) y escondites con agua o cuerda
+# En memoria quedan solo los chunks cercanos al jugador (World.drop_far) y unos
+# pocos mundos (_WORLDS). En el guardado va la semilla, la posición y los
+# escondites ya vaciados por chunk ("taken"), acotados a MAX_DIFF_CHUNKS.
+#
+#   python forest.py --seed 7 --radius 2      (dibuja el mapa alrededor del inicio)
+import argparse
+import random
+import time
+from collections import OrderedDict
+
+from instrumentation import metrics
+
+CHUNK = 16
+KEEP_RADIUS = 1          # chunks que se conservan alrededor del jugador (3x3)
+MAX_WORLDS = 64          # mundos en memoria (uno por partida activa)
+MAX_DIFF_CHUNKS = 64     # chunks con escondites vaciados que recuerda el guardado
+CABIN_CHANCE = 0.8       # con 0.2 y CABIN_SIGHT 3 el jugador aleatorio de simulate.py
+                         # se quedaba sin terminar en ~36% de las partidas
+EDGE_OPEN = 0.75         # probabilidad de que un sendero cruce un borde
+SIGN_RADIUS = 4          # chunks que "ve" una señal
+TRAIL_STEPS = 6          # casillas por "avanzar" siguiendo un sendero
+FOREST_STEPS = 3         # casillas por "avanzar" entre los árboles
+CABIN_SIGHT = 12         # a esta distancia (o menos) se ve la cabaña y se llega
+CABIN_MIN_CHUNKS = 1     # sin cabañas a menos de tantos chunks del inicio (el suyo)
+
+TRAIL, CACHE, CABIN, CROSSING = 1, 2, 4, 8
+
+DIRECTIONS = {"NORTE": (0, -1), "SUR": (0, 1), "ESTE": (1, 0), "OESTE": (-1, 0)}
+DIR_NAMES = {v: k.lower() for k, v in DIRECTIONS.items()}
+ANIMALS = [(0.45, None), (0.65, "lobo"), (0.85, "serpiente"), (1.0, "oso")]
+# con la cabaña vedada hasta pos 5 (ver scenario3.json) estos valores dejan
+# simulate.py cerca del escenario original: ~74% aleatorio y ~83% con guion
+DANGER = {"sendero": 0.3, "bosque": 0.3}
+
+
+def _rng(seed, *key):
+    return random.Random(":".join(str(k) for k in (seed,) + key))
+
+
+def _edge(seed, kind, cx, cy):
+    # paso del sendero en un borde; lo comparten los dos chunks que lo tocan
+    rng = _rng(seed, kind, cx, cy)
+    return 2 + int(rng.random() * (CHUNK - 4)) if rng.random() < EDGE_OPEN else None
+
+
+def has_cabin(seed, cx, cy):
+    return max(abs(cx), abs(cy)) >= CABIN_MIN_CHUNKS and _rng(seed, "cabin", cx, cy).random() < CABIN_CHANCE
+
+
+def territory(seed, cx, cy):
+    roll = _rng(seed, "animal", cx // 2, cy // 2).random()
+    for limit, animal in ANIMALS:
+        if roll < limit:
+            return animal
+    return None
+
+
+def nearest_cabin(seed, cx, cy, radius=SIGN_RADIUS):
+    # (dx, dy) en chunks hacia la cabaña más cercana, por anillos; None si no hay
+    for r in range(1, radius + 1):
+        ring = [(dx, dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1) if max(abs(dx), abs(dy)) == r]
+        found = [(abs(dx) + abs(dy), dx, dy) for dx, dy in ring if has_cabin(seed, cx + dx, cy + dy)]
+        if found:
+            _, dx, dy = min(found)
+            return dx, dy
+    return None
+
+
+def direction_name(dx, dy):
+    if abs(dx) >= abs(dy):
+        return "este" if dx > 0 else "oeste"
+    return "sur" if dy > 0 else "norte"
+
+
+# ---------------------------
+# Chunks
+# ---------------------------
+class Chunk:
+    __slots__ = ("cx", "cy", "tiles", "crossing", "cabin", "sign", "animal", "caches")
+
+    def __init__(self, cx, cy, tiles, crossing, cabin, sign, animal, caches):
+        self.cx = cx
+        self.cy = cy
+        self.tiles = tiles          # bytearray CHUNK*CHUNK con banderas TRAIL/CACHE/CABIN/CROSSING
+        self.crossing = crossing    # (lx, ly)
+        self.cabin = cabin
+        self.sign = sign            # texto de la señal del cruce o None
+        self.animal = animal        # territorio: "lobo" / "serpiente" / "oso" / None
+        self.caches = caches        # índice de casilla -> (n, objeto)
+
+
+def generate_chunk(seed, cx, cy):
+    t0 = time.perf_counter()
+    rng = _rng(seed, "chunk", cx, cy)
+    tiles = bytearray(CHUNK * CHUNK)
+    px, py = 3 + int(rng.random() * (CHUNK - 6)), 3 + int(rng.random() * (CHUNK - 6))
+
+    def line(x0, y0, x1, y1):
+        # tramo recto horizontal o vertical
+        for x in range(min(x0, x1), max(x0, x1) + 1):
+            for y in range(min(y0, y1), max(y0, y1) + 1):
+                tiles[y * CHUNK + x] |= TRAIL
+
+    west, east = _edge(seed, "v", cx, cy), _edge(seed, "v", cx + 1, cy)
+    north, south = _edge(seed, "h", cx, cy), _edge(seed, "h", cx, cy + 1)
+    if west is not None:
+        line(px, py, px, west)
+        line(px, west, 0, west)
+    if east is not None:
+        line(px, py, px, east)
+        line(px, east, CHUNK - 1, east)
+    if north is not None:
+        line(px, py, north, py)
+        line(north, py, north, 0)
+    if south is not None:
+        line(px, py, south, py)
+        line(south, py, south, CHUNK - 1)
+    center = py * CHUNK + px
+    tiles[center] |= TRAIL | CROSSING
+
+    cabin = has_cabin(seed, cx, cy)
+    sign = None
+    if cabin:
+        tiles[center] |= CABIN
+    else:
+        target = nearest_cabin(seed, cx, cy)
+        sign = (f"Una señal vieja apunta al {direction_name(*target)}: «Cabaña»."
+                if target else "Una señal vieja, tan borrosa que no se puede leer.")
+
+    trail = [i for i, t in enumerate(tiles) if t & TRAIL and not t & CROSSING]
+    caches = {}
+    for n in range(int(rng.random() * 3)):
+        if trail and rng.random() < 0.7:
+            i = trail[int(rng.random() * len(trail))]
+        else:
+            i = int(rng.random() * CHUNK * CHUNK)
+        if i == center or i in caches:
+            continue
+        caches[i] = (n, "agua" if rng.random() < 0.7 else "cuerda")
+        tiles[i] |= CACHE
+    chunk = Chunk(cx, cy, tiles, (px, py), cabin, sign, territory(seed, cx, cy), caches)
+    metrics.record("forest.chunk", (time.perf_counter() - t0) * 1000)
+    return chunk
+
+
+class World:
+    # chunks generados de una semilla; drop_far() suelta los lejanos
+    def __init__(self, seed, keep_radius=KEEP_RADIUS):
+        self.seed = seed
+        self.keep_radius = keep_radius
+        self.chunks = {}
+        self.generated = 0
+
+    def chunk(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = self.chunks[(cx, cy)] = generate_chunk(self.seed, cx, cy)
+            self.generated += 1
+        return chunk
+
+    def locate(self, x, y):
+        chunk = self.chunk(x // CHUNK, y // CHUNK)
+        return chunk, (y % CHUNK) * CHUNK + (x % CHUNK)
+
+    def flags(self, x, y):
+        chunk, i = self.locate(x, y)
+        return chunk.tiles[i]
+
+    def drop_far(self, x, y):
+        cx, cy, r = x // CHUNK, y // CHUNK, self.keep_radius
+        far = [key for key in self.chunks if abs(key[0] - cx) > r or abs(key[1] - cy) > r]
+        for key in far:
+            del self.chunks[key]
+        return len(far)
+
+
+_WORLDS = OrderedDict()
+
+
+def world_for(seed):
+    world = _WORLDS.get(seed)
+    if world is None:
+        world = _WORLDS[seed] = World(seed)
+        while len(_WORLDS) > MAX_WORLDS:
+            _WORLDS.popitem(last=False)
+    else:
+        _WORLDS.move_to_end(seed)
+    return world
+
+
+# ---------------------------
+# Estado guardado: {"seed", "x", "y", "heading", "taken": {"cx,cy": [n, ...]}}
+# ---------------------------
+def new_forest(seed):
+    chunk = generate_chunk(seed, 0, 0)
+    x, y = chunk.crossing
+    return {"seed": seed, "x": x, "y": y, "heading": "NORTE", "taken": {}}
+
+
+def _forest(env):
+    forest = env.state.get("forest")
+    if forest is None:
+        # partidas guardadas antes del mapa procedural: la semilla sale del flujo
+        # "setup" de la partida, como en setup(), así la repetición coincide
+        rng = env.source.stream("setup") if env.source is not None else env.rng
+        forest = env.state["forest"] = new_forest(rng.randint(1, 2 ** 31 - 1))
+    return forest
+
+
+def _is_taken(forest, chunk, n):
+    return n in forest["taken"].get(f"{chunk.cx},{chunk.cy}", ())
+
+
+def _take(forest, chunk, n):
+    key = f"{chunk.cx},{chunk.cy}"
+    taken = forest["taken"]
+    taken[key] = taken.pop(key, []) + [n]
+    # los escondites de chunks muy viejos se olvidan: el bosque se repone
+    while len(taken) > MAX_DIFF_CHUNKS:
+        del taken[next(iter(taken))]
+
+
+def _cache_at(forest, chunk, i):
+    cache = chunk.caches.get(i)
+    if cache is None or _is_taken(forest, chunk, cache[0]):
+        return None
+    return cache
+
+
+def _cabin_in_sight(world, x, y):
+    # la cabaña está en el cruce de su chunk; basta mirar los 3x3 chunks vecinos
+    cx, cy = x // CHUNK, y // CHUNK
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if has_cabin(world.seed, cx + dx, cy + dy):
+                chunk = world.chunk(cx + dx, cy + dy)
+                tx, ty = chunk.cx * CHUNK + chunk.crossing[0], chunk.cy * CHUNK + chunk.crossing[1]
+                if abs(tx - x) + abs(ty - y) <= CABIN_SIGHT:
+                    return tx, ty
+    return None
+
+
+def _trail_neighbors(world, x, y):
+    return [(dx, dy) for dx, dy in DIRECTIONS.values() if world.flags(x + dx, y + dy) & TRAIL]
+
+
+def _walk(world, forest, heading, chosen):
+    # devuelve (pasos, terreno, casilla final, chunk, índice)
+    x, y = forest["x"], forest["y"]
+    dx, dy = heading
+    on_trail = world.flags(x, y) & TRAIL
+    if on_trail and not chosen:
+        # seguir el sendero: de frente, luego a los lados, y atrás solo sin salida
+        options = _trail_neighbors(world, x, y)
+        for d in [(dx, dy), (-dy, dx), (dy, -dx), (-dx, -dy)]:
+            if d in options:
+                dx, dy = d
+                break
+    trail = world.flags(x + dx, y + dy) & TRAIL
+    limit = TRAIL_STEPS if trail else FOREST_STEPS
+    steps = 0
+    while steps < limit:
+        x, y = x + dx, y + dy
+        steps += 1
+        chunk, i = world.locate(x, y)
+        flags = chunk.tiles[i]
+        if flags & (CABIN | CROSSING) or _cache_at(forest, chunk, i):
+            break
+        if trail:
+            if not flags & TRAIL:
+                break
+            options = [d for d in _trail_neighbors(world, x, y) if d != (-dx, -dy)]
+            if len(options) != 1:
+                break   # cruce o fin del sendero
+            dx, dy = options[0]
+        elif flags & TRAIL:
+            break       # sales a un sendero
+    forest["x"], forest["y"] = x, y
+    forest["heading"] = {v: k for k, v in DIRECTIONS.items()}[(dx, dy)]
+    return steps, ("sendero" if trail else "bosque"), chunk, i
+
+
+# ---------------------------
+# Operaciones para la acción "world" de los escenarios (reciben el entorno:
+# env.state, env.vars, env.rng, env.lines)
+# ---------------------------
+def setup(env):
+    env.state["forest"] = new_forest(env.rng.randint(1, 2 ** 31 - 1))
+
+
+def advance(env):
+    # camina y deja en env.vars lo encontrado: terrain, item, cabin, animal, danger.
+    # Con env.vars["cabin_ready"] falso (p.ej. un "let" del escenario con un
+    # mínimo de turnos) la cabaña todavía no se ve ni cuenta como llegada
+    forest = _forest(env)
+    world = world_for(forest["seed"])
+    chosen = env.vars.get("dir")
+    ready = env.vars.get("cabin_ready", True)
+    heading = DIRECTIONS.get(chosen) or DIRECTIONS[forest["heading"]]
+    before = (forest["x"] // CHUNK, forest["y"] // CHUNK)
+    steps, terrain, chunk, i = _walk(world, forest, heading, chosen)
+    cabin = _cabin_in_sight(world, forest["x"], forest["y"]) if ready else None
+    if cabin is not None:
+        forest["x"], forest["y"] = cabin
+        chunk, i = world.locate(*cabin)
+    world.drop_far(forest["x"], forest["y"])
+
+    where = "por el sendero" if terrain == "sendero" else "entre los árboles"
+    env.lines.append(f"Caminas {steps} {'paso' if steps == 1 else 'pasos'} {where} "
+                     f"hacia el {forest['heading'].lower()}...")
+    flags = chunk.tiles[i]
+    at_cabin = bool(flags & CABIN) and ready
+    if (chunk.cx, chunk.cy) != before and chunk.animal:
+        env.lines.append(f"Ves huellas de {chunk.animal} en el suelo.")
+    if flags & CROSSING and not at_cabin:
+        env.lines.append("Llegas a un cruce de senderos. " + (chunk.sign or "La niebla no deja ver más allá."))
+    item = None
+    cache = _cache_at(forest, chunk, i)
+    if cache is not None:
+        _take(forest, chunk, cache[0])
+        item = cache[1]
+    env.vars.update({
+        "terrain": terrain,
+        "item": item,
+        "cabin": at_cabin,
+        "animal": chunk.animal,
+        "danger": DANGER[terrain],
+    })
+
+
+def look(env):
+    forest = _forest(env)
+    world = world_for(forest["seed"])
+    x, y = forest["x"], forest["y"]
+    chunk, i = world.locate(x, y)
+    flags = chunk.tiles[i]
+    lines = env.lines
+    if flags & TRAIL:
+        ways = ", ".join(DIR_NAMES[d] for d in _trail_neighbors(world, x, y))
+        lines.append(f"Estás en un sendero. Sigue hacia: {ways}." if ways else "Estás en un sendero sin salida.")
+    else:
+        lines.append("Estás entre árboles espesos; no hay sendero a la vista.")
+    if flags & CROSSING:
+        lines.append(chunk.sign)
+    seen = []
+    for dx in range(-3, 4):
+        for dy in range(-3, 4):
+            if (dx or dy) and abs(dx) + abs(dy) <= 3:
+                c, j = world.locate(x + dx, y + dy)
+                if _cache_at(forest, c, j):
+                    seen.append(direction_name(dx, dy))
+    if seen:
+        lines.append(f"Algo brilla entre la maleza hacia el {seen[0]}.")
+    if chunk.animal:
+        lines.append(f"Hay huellas de {chunk.animal} por todas partes. Mantén la calma.")
+
+
+OPS = {"setup": setup, "advance": advance, "look": look}
+
+
+# ---------------------------
+# Mapa en texto (depuración)
+# ---------------------------
+def render(seed, cx, cy, radius=1, forest=None):
+    world = World(seed, keep_radius=radius)
+    rows = []
+    for y in range((cy - radius) * CHUNK, (cy + radius + 1) * CHUNK):
+        row = []
+        for x in range((cx - radius) * CHUNK, (cx + radius + 1) * CHUNK):
+            flags = world.flags(x, y)
+            if forest and (x, y) == (forest["x"], forest["y"]):
+                row.append("@")
+            elif flags & CABIN:
+                row.append("C")
+            elif flags & CROSSING:
+                row.append("+")
+            elif flags & CACHE:
+                row.append("*")
+            elif flags & TRAIL:
+                row.append(".")
+            else:
+                row.append(" ")
+        rows.append("".join(row))
+    return "\n".join(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dibuja el bosque procedural alrededor del inicio")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--radius", type=int, default=1, help="chunks alrededor del inicio")
+    args = parser.parse_args()
+    print(render(args.seed, 0, 0, args.radius, new_forest(args.seed)))
@@ -0,0 +1,136 @@
+# game_core.py
+# Núcleo del juego sin interfaz: una partida de un escenario que recibe comandos
+# y devuelve texto + estado. Lo usan la app de Tk, los simuladores y los benchmarks.
+import random
+import time
+from collections import namedtuple
+
+from persistence import scene_section
+from rng_streams import SessionRng
+from scenario_engine import load_scenarios
+
+# resultado de un turno: líneas a mostrar, estado del escenario y desenlace
+Step = namedtuple("Step", "lines state outcome reason")
+
+_SCENARIOS = None
+
+
+def scenarios():
+    # los escenarios se compilan una sola vez por proceso
+    global _SCENARIOS
+    if _SCENARIOS is None:
+        _SCENARIOS = load_scenarios()
+    return _SCENARIOS
+
+
+class GameSession:
+    def __init__(self, scenario, state=None, rng=None):
+        if isinstance(scenario, str):
+            scenario = scenarios()[scenario]
+        self.scenario = scenario
+        # por defecto, flujos con semilla propia (reproducibles, ver rng_streams)
+        self.rng = rng if rng is not None else SessionRng()
+        # sin estado previo se genera uno nuevo (p.ej. los pisos del hospital); en
+        # juego el estado es el tipado del escenario (ver state_model)
+        self.state = scenario.model.load(state if state else scenario.new_state(self.rng))
+        self.turns = 0
+        self.outcome = None
+        self.reason = None
+        self.intent = None   # intención del último comando
+        self.recorder = None   # replay.Recorder si se está grabando
+        # tiempo de juego: lo de sesiones anteriores (del guardado) + esta
+        self.elapsed = 0.0
+        self._started = time.perf_counter()
+        self._ended = None
+
+    @property
+    def finished(self):
+        return self.outcome is not None
+
+    def intro(self):
+        return self.scenario.intro_text(self.state)
+
+    def duration(self):
+        # segundos jugados; se detiene en el desenlace
+        return self.elapsed + (self._ended or time.perf_counter()) - self._started
+
+    def send(self, cmd):
+        # aplica un comando; después del desenlace ya no cambia nada
+        cmd = cmd.strip()
+        if not cmd or self.finished:
+            return Step([], self.state, self.outcome, self.reason)
+        result = self.scenario.run(cmd, self.state, self.rng)
+        self.turns += 1
+        self.intent = result.intent
+        if result.outcome:
+            self.outcome = result.outcome
+            self.reason = result.reason
+            self._ended = time.perf_counter()
+        step = Step(result.lines, self.state, result.outcome, result.reason)
+        if self.recorder is not None:
+            self.recorder.record(cmd, step)
+        return step
+
+    def play(self, commands):
+        # juega una lista de comandos hasta terminar; devuelve el último Step
+        step = Step([], self.state, None, None)
+        for cmd in commands:
+            step = self.send(cmd)
+            if self.finished:
+                break
+        return step
+
+
+# ---------------------------
+# Partidas dentro del guardado
+# ---------------------------
+# El guardado de un jugador es {"player_name", "current_scene", "scene_data":
+# {escenario: estado}, "rng": {escenario: SessionRng.to_dict()}, "runs":
+# {escenario: {"turns", "seconds"}}}; lo comparten la app de Tk y el servidor.
+def resume_session(save, scenario):
+    # partida del escenario guardada en save (o una nueva); save queda apuntando
+    # al estado de la sesión, así que los cambios ya están en el guardado
+    if isinstance(scenario, str):
+        scenario = scenarios()[scenario]
+    data = scene_section(save, scenario.id)
+    rng_data = save.setdefault("rng", {}).get(scenario.id)
+    rng = SessionRng.from_dict(rng_data) if data and rng_data else SessionRng()
+    session = GameSession(scenario, data, rng)
+    run = save.setdefault("runs", {}).get(scenario.id)
+    if data and run:
+        # partida retomada: turnos y tiempo siguen contando para el historial
+        session.turns, session.elapsed = run["turns"], run["seconds"]
+    save.setdefault("scene_data", {})[scenario.id] = session.state
+    save["rng"][scenario.id] = rng.to_dict()
+    save["current_scene"] = scenario.id
+    return session
+
+
+def store_progress(save, session):
+    # después de cada comando: contadores del RNG, turnos y tiempo de juego (el
+    # estado ya es el mismo objeto)
+    save.setdefault("rng", {})[session.scenario.id] = session.rng.to_dict()
+    save.setdefault("runs", {})[session.scenario.id] = {"turns": session.turns,
+                                                        "seconds": round(session.duration(), 3)}
+
+
+def end_run(save):
+    # después de ganar o perder se vuelve a la selección de nivel
+    save["current_scene"] = None
+    save["scene_data"] = {}
+    save["rng"] = {}
+    save["runs"] = {}
+
+
+def random_command(scenario, rng=random):
+    # jugador aleatorio: una intención al azar y uno de sus ejemplos
+    intent = rng.choice(scenario.parser.intents)
+    return rng.choice(scenario.examples[intent])
+
+
+def play_random(scenario, rng, max_turns=200):
+    # una partida completa con el jugador aleatorio; devuelve la sesión terminada
+    session = GameSession(scenario, rng=rng)
+    while not session.finished and session.turns < max_turns:
+        session.send(random_command(session.scenario, rng))
+    return session
@@ -0,0 +1,366 @@
+# hospital.py
+# Hospitales del escenario 2 generados en bloque con NumPy: miles de distribuciones
+# a la vez como arreglos booleanos (hospital x piso x habitación) para simular y
+# analizar. Solo se convierten al dict del juego cuando una partida las necesita.
+# Las probabilidades salen de la acción "grid" de scenarios/scenario2.json.
+# También el solver del hospital: pistas y rechazo de mapas imposibles.
+#
+#   python hospital.py --layouts 100000 --seed 1
+#   python hospital.py --solve 10000 --seed 1
+import argparse
+import ast
+import functools
+import json
+import random
+import sys
+import time
+from collections import deque, namedtuple
+
+try:
+    import numpy as np
+except ImportError:   # opcional: sin NumPy el juego usa el generador del motor
+    np = None
+
+from scenario_engine import ScenarioError, compile_expr, expr_env
+
+HAVE_NUMPY = np is not None
+
+
+def grid_spec(scenario):
+    # la acción "grid" del setup del escenario (None si no tiene)
+    for action in scenario.spec.get("setup", []):
+        if "grid" in action:
+            return action["grid"]
+    return None
+
+
+def grid_probabilities(scenario):
+    # {campo: arreglo pisos x habitaciones} con la probabilidad de cada celda;
+    # cada campo debe ser de la forma chance(<expresión de row/col>)
+    spec = grid_spec(scenario)
+    if spec is None:
+        raise ScenarioError(f"{scenario.id}: no tiene acción grid")
+    rows, cols = int(spec["rows"]), int(spec["cols"])
+    probs = {}
+    for name, src in spec["cells"].items():
+        node = ast.parse(src, mode="eval").body
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id == "chance" and len(node.args) == 1):
+            raise ScenarioError(f"{scenario.id}: {name} no es chance(...): {src!r}")
+        p = compile_expr(ast.unparse(node.args[0]))
+        values = dict(scenario.initial_state)
+        env = expr_env(values)
+        table = np.empty((rows, cols))
+        for row in range(rows):
+            values["row"] = row + 1
+            for col in range(cols):
+                values["col"] = col + 1
+                table[row, col] = p(env)
+        probs[name] = table
+    return probs
+
+
+class Layouts:
+    # n hospitales; cada campo es un arreglo bool de forma (n, pisos, habitaciones)
+    def __init__(self, scenario, fields):
+        self.scenario = scenario
+        self.fields = fields
+        spec = grid_spec(scenario)
+        self.target = spec["target"]
+        self.row_key = spec.get("row_key", "{row}")
+        self.col_key = spec.get("col_key", "{col}")
+        self.occupied = fields.get("occupied")
+        self.has_tool = fields.get("has_tool")
+        self._cells = None   # listas de Python, se crean en la primera conversión
+        rows, cols = next(iter(fields.values())).shape[1:]
+        self._keys = [
+            (self.row_key.format(row=row, col=0), [self.col_key.format(row=row, col=col) for col in range(1, cols + 1)])
+            for row in range(1, rows + 1)
+        ]
+
+    def __len__(self):
+        return len(next(iter(self.fields.values())))
+
+    def floors(self, i):
+        # forma del juego: {"1": {"R1": {"occupied": bool, "has_tool": bool}, ...}, ...}
+        names = list(self.fields)
+        if self._cells is None:
+            # una sola conversión para todo el bloque (mucho más barata que por hospital)
+            self._cells = np.stack([self.fields[name] for name in names], axis=-1).tolist()
+        return {
+            row_key: {key: dict(zip(names, values)) for key, values in zip(col_keys, line)}
+            for (row_key, col_keys), line in zip(self._keys, self._cells[i])
+        }
+
+    def state(self, i):
+        # estado inicial completo del escenario con el hospital i
+        state = json.loads(json.dumps(self.scenario.initial_state))
+        state[self.target] = self.floors(i)
+        return state
+
+    def states(self):
+        for i in range(len(self)):
+            yield self.state(i)
+
+
+def generate(scenario, n, seed=None):
+    # mismas probabilidades que el juego; reproducible con la misma semilla
+    if not HAVE_NUMPY:
+        raise RuntimeError("Se necesita NumPy (pip install numpy)")
+    rng = np.random.default_rng(seed)
+    probs = grid_probabilities(scenario)
+    fields = {name: rng.random((n,) + p.shape) < p for name, p in probs.items()}
+    return Layouts(scenario, fields)
+
+
+def analyze(layouts, start_floor=None, exit_floor=1):
+    # estadísticas de n hospitales; el camino seguro baja de start_floor a exit_floor
+    if start_floor is None:
+        start_floor = layouts.scenario.initial_state.get("floor", 1)
+    occupied, has_tool = layouts.occupied, layouts.has_tool
+    free = ~occupied
+    lo, hi = min(start_floor, exit_floor), max(start_floor, exit_floor)
+    path = slice(lo - 1, hi)
+    # herramienta en una habitación vacía de algún piso del camino
+    tool_on_path = (has_tool & free)[:, path, :].any(axis=(1, 2))
+    return {
+        "layouts": len(layouts),
+        "path_floors": [lo, hi],
+        "occupied_rate_by_floor": occupied.mean(axis=(0, 2)).round(4).tolist(),
+        "free_rooms_per_hospital": round(float(free.sum(axis=(1, 2)).mean()), 3),
+        "hospitals_with_full_floor": round(float(occupied.all(axis=2).any(axis=1).mean()), 4),
+        "tool_on_safe_path": round(float(tool_on_path.mean()), 4),
+        "free_room_on_every_path_floor": round(float(free[:, path, :].any(axis=2).all(axis=1).mean()), 4),
+    }
+
+
+# ---------------------------
+# Solver
+# ---------------------------
+# Modelo de las reglas de scenario2.json sobre el mapa de pisos: escaleras
+# (subir/bajar, sin riesgo), entrar a una habitación (ocupada = derrota; con
+# herramienta = has_key), elevador (funciona con ELEVATOR_WORKS y deja en un piso
+# uniforme) y salir en EXIT_FLOOR. El estado de búsqueda es (piso, has_key) y no
+# (piso, has_key, habitaciones visitadas): entrar a una vacía solo cambia has_key
+# (la herramienta se toma) y a una ocupada termina la partida, así que las
+# visitadas no distinguen estados. check_plan() ejecuta los planes con el motor
+# real para validar el modelo.
+#
+# Con las reglas actuales (escaleras sin riesgo, salida sin llave) todo hospital
+# se puede ganar; "winnable" sigue en classify() para cuando las reglas cambien.
+# El rechazo de scenario2.json ("accept") solo descarta los imposibles. No hay
+# rechazo de "triviales": como las escaleras no tienen riesgo, el plan del solver
+# (bajar hasta la salida) es igual de fácil en todos los hospitales, y path_risk
+# (habitaciones ocupadas en los pisos del camino) no cambia ese plan; queda en
+# classify() solo como medida. Un hospital sin herramienta alcanzable se acepta
+# como antes, para no cambiar la distribución que mide simulate.py.
+ELEVATOR_WORKS = 0.6
+EXIT_FLOOR = 1
+INF = float("inf")
+
+Solution = namedtuple("Solution", "n_floors rooms safe_tools occupied escape tool")
+
+
+def layout_key(floors):
+    # huella de la distribución: (pisos, habitaciones, bits ocupada, bits herramienta)
+    n_floors = len(floors)
+    rooms = tuple(sorted(floors["1"], key=lambda r: int(r[1:])))
+    occupied = tool = 0
+    bit = 1
+    for f in range(1, n_floors + 1):
+        line = floors[str(f)]
+        for r in rooms:
+            cell = line[r]
+            if cell.get("occupied"):
+                occupied |= bit
+            if cell.get("has_tool"):
+                tool |= bit
+            bit <<= 1
+    return n_floors, rooms, occupied, tool
+
+
+def solve(floors):
+    return _solve(layout_key(floors))
+
+
+@functools.lru_cache(maxsize=4096)
+def _solve(key):
+    n_floors, rooms, occupied_bits, tool_bits = key
+    n_rooms = len(rooms)
+    occupied, safe_tools = [], []
+    for f in range(n_floors):
+        bits = [(f * n_rooms + i) for i in range(n_rooms)]
+        occupied.append(tuple(rooms[i] for i, b in enumerate(bits) if occupied_bits >> b & 1))
+        safe_tools.append(tuple(rooms[i] for i, b in enumerate(bits)
+                                if tool_bits >> b & 1 and not occupied_bits >> b & 1))
+    occupied, safe_tools = tuple(occupied), tuple(safe_tools)
+    return Solution(n_floors, rooms, safe_tools, occupied,
+                    _expected_costs(n_floors, safe_tools, need_key=False),
+                    _expected_costs(n_floors, safe_tools, need_key=True))
+
+
+def _expected_costs(n_floors, safe_tools, need_key):
+    # turnos esperados hasta salir con la mejor política sin riesgo; el elevador es
+    # una transición aleatoria. {(piso, has_key): (turnos, comando)}
+    floors = range(1, n_floors + 1)
+    # con llave (o si no hace falta): escaleras hasta la salida, o elevador
+    top = _with_elevator({f: abs(f - EXIT_FLOOR) + 1 for f in floors})
+    low = top
+    if need_key:
+        # sin llave: caminar a un piso con herramienta segura, entrar, y seguir con llave
+        tools = [g for g in floors if safe_tools[g - 1]]
+        low = _with_elevator({f: min((abs(f - g) + 1 + top[g] for g in tools), default=INF) for f in floors})
+    value = {}
+    for f in floors:
+        value[(f, True)], value[(f, False)] = top[f], low[f]
+    means = {k: sum(value[(f, k)] for f in floors) / n_floors for k in (False, True)}
+    result = {}
+    for (f, k), v in value.items():
+        # el comando es el que alcanza el valor (un paso de Bellman)
+        options = []
+        if f <= EXIT_FLOOR and (k or not need_key):
+            options.append((1.0, "salir"))
+        if f > 1:
+            options.append((1 + value[(f - 1, k)], "bajar"))
+        if f < n_floors:
+            options.append((1 + value[(f + 1, k)], "subir"))
+        if not k and safe_tools[f - 1]:
+            options.append((1 + value[(f, True)], f"entrar {safe_tools[f - 1][0]}"))
+        options.append((1 / ELEVATOR_WORKS + means[k], "elevador"))
+        cost, action = min(options)
+        result[(f, k)] = (v, action if cost < INF else None)
+    return result
+
+
+def _with_elevator(stairs):
+    # V(f) = min(stairs[f], 1/p + M) con M = media de V. Con las j mejores por
+    # escalera y el resto en elevador: M = (suma de esas j + (n - j) / p) / j;
+    # la mejor política es la de menor M.
+    n = len(stairs)
+    costs = sorted(stairs.values())
+    best, total = INF, 0.0
+    for j, d in enumerate(costs, 1):
+        if d == INF:
+            break
+        total += d
+        best = min(best, (total + (n - j) / ELEVATOR_WORKS) / j)
+    elevator = 1 / ELEVATOR_WORKS + best
+    return {f: min(d, elevator) for f, d in stairs.items()}
+
+
+def shortest_plan(solution, floor, has_key=False, need_key=False):
+    # secuencia más corta sin riesgo y sin elevador (BFS); None si no existe
+    return _stairs_plan(solution.n_floors, solution.safe_tools, floor, has_key, need_key)
+
+
+def _stairs_plan(n_floors, safe_tools, floor, has_key, need_key):
+    start = (floor, has_key)
+    previous = {start: None}
+    queue = deque([start])
+    while queue:
+        f, k = queue.popleft()
+        if f <= EXIT_FLOOR and (k or not need_key):
+            plan = ["salir"]
+            state = (f, k)
+            while previous[state] is not None:
+                state, cmd = previous[state]
+                plan.append(cmd)
+            return plan[::-1]
+        moves = []
+        if f > 1:
+            moves.append(((f - 1, k), "bajar"))
+        if f < n_floors:
+            moves.append(((f + 1, k), "subir"))
+        if not k and safe_tools[f - 1]:
+            moves.append(((f, True), f"entrar {safe_tools[f - 1][0]}"))
+        for nxt, cmd in moves:
+            if nxt not in previous:
+                previous[nxt] = ((f, k), cmd)
+                queue.append(nxt)
+    return None
+
+
+def classify(state):
+    # medidas de dificultad de un hospital (para aceptar/rechazar al generarlo)
+    floors, start = state["floors"], state.get("floor", 1)
+    solution = solve(floors)
+    escape = shortest_plan(solution, start)
+    tool = shortest_plan(solution, start, need_key=True)
+    lo, hi = min(start, EXIT_FLOOR), max(start, EXIT_FLOOR)
+    on_path = [solution.occupied[f - 1] for f in range(lo, hi + 1)]
+    return {
+        "winnable": escape is not None,
+        "escape_turns": len(escape) if escape else None,
+        "expected_turns": round(solution.escape[(start, False)][0], 3),
+        "tool_turns": len(tool) if tool else None,
+        "path_risk": sum(len(o) for o in on_path) / (len(on_path) * len(solution.rooms)),
+    }
+
+
+def hint(state):
+    # siguiente comando de la mejor política desde el estado actual
+    solution = solve(state["floors"])
+    turns, action = solution.escape[(state.get("floor", 1), bool(state.get("has_key")))]
+    if action is None:
+        return ["No se me ocurre cómo salir de aquí..."]
+    return [f"Pista: {action} (salida en ~{turns:.1f} turnos)."]
+
+
+def check_plan(scenario, state, plan):
+    # juega el plan con el motor real; devuelve el desenlace y los turnos usados
+    from game_core import GameSession
+
+    session = GameSession(scenario, json.loads(json.dumps(state)), random.Random(0))
+    session.play(plan)
+    return session.outcome, session.turns
+
+
+def solver_report(scenario, n, seed=None):
+    # tiempo del solver (sin caché) sobre n hospitales generados por el motor
+    rng = random.Random(seed)
+    states = [scenario.new_state(rng, check=False) for _ in range(n)]
+    times, rejected, mismatches = [], 0, 0
+    reject_if = scenario.accept_rule
+    for state in states:
+        _solve.cache_clear()
+        t0 = time.perf_counter()
+        info = classify(state)
+        times.append((time.perf_counter() - t0) * 1000)
+        if reject_if is not None and reject_if(info):
+            rejected += 1
+        plan = shortest_plan(solve(state["floors"]), state["floor"])
+        if check_plan(scenario, state, plan) != ("win", len(plan)):
+            mismatches += 1
+    times.sort()
+    return {
+        "hospitals": n,
+        "solve_ms_mean": round(sum(times) / n, 4),
+        "solve_ms_p99": round(times[int(n * 0.99) - 1], 4),
+        "rejected": rejected,
+        "plan_mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    from game_core import scenarios
+
+    parser = argparse.ArgumentParser(description="Análisis de hospitales generados en bloque")
+    parser.add_argument("--layouts", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--scenario", default="scenario2")
+    parser.add_argument("--start-floor", type=int, default=None)
+    parser.add_argument("--solve", type=int, default=0, metavar="N", help="mide el solver sobre N hospitales")
+    args = parser.parse_args(argv)
+    if args.solve:
+        print(json.dumps(solver_report(scenarios()[args.scenario], args.solve, args.seed), indent=2))
+        return 0
+    if not HAVE_NUMPY:
+        print("Se necesita NumPy (pip install numpy)")
+        return 1
+    layouts = generate(scenarios()[args.scenario], args.layouts, args.seed)
+    print(json.dumps(analyze(layouts, args.start_floor), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
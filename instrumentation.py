@@ -0,0 +1,225 @@
+# instrumentation.py
+# Temporizadores y contadores de las rutas calientes (tick de la máquina de
+# escribir, guardado, transiciones de pantalla, carga de sonidos, comandos), un
+# monitor del retraso del bucle de Tk y un overlay opcional (F3). Todo queda en
+# `metrics`; export_json/export_csv sirven para comparar versiones.
+import csv
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SAMPLES = 512   # últimas muestras por temporizador (para percentiles)
+
+
+class Timer:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        self.samples.append(ms)
+
+    def summary(self):
+        recent = sorted(self.samples)
+        n = len(recent)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50_ms": round(recent[n // 2], 4) if n else 0.0,
+            "p95_ms": round(recent[min(n - 1, int(n * 0.95))], 4) if n else 0.0,
+            "max_ms": round(self.max, 4),
+        }
+
+
+class Metrics:
+    # seguro entre hilos (el guardado y el audio registran desde sus hilos)
+    def __init__(self):
+        self.enabled = True
+        self.timers = {}
+        self.counters = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, name, ms):
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = Timer()
+            timer.add(ms)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def timed(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000)
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_s": round(time.time() - self.started, 3),
+                "timers": {name: t.summary() for name, t in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def export_json(self, path, extra=None):
+        data = self.snapshot()
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def export_csv(self, path):
+        # una fila por temporizador o contador: kind,name,count,total_ms,mean_ms,p50_ms,p95_ms,max_ms
+        data = self.snapshot()
+        fields = ["count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms"]
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name"] + fields)
+            for name, s in data["timers"].items():
+                writer.writerow(["timer", name] + [s[k] for k in fields])
+            for name, n in data["counters"].items():
+                writer.writerow(["counter", name, n] + [""] * (len(fields) - 1))
+
+
+metrics = Metrics()
+
+
+def timed(name):
+    # decorador: @timed("save.flush")
+    def wrap(fn):
+        def inner(*args, **kwargs):
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.record(name, (time.perf_counter() - t0) * 1000)
+        inner.__name__ = fn.__name__
+        inner.__doc__ = fn.__doc__
+        return inner
+    return wrap
+
+
+# ---------------------------
+# Retraso del bucle de eventos de Tk
+# ---------------------------
+class LagMonitor:
+    # programa un after cada interval_ms y registra cuánto tarde llega ("tk.lag").
+    # Usa root.after directo: pasar por los ticks de Scheduler sumaría su redondeo
+    # al retraso medido; la app lo anota con scheduler.watch()
+    def __init__(self, root, interval_ms=100, registry=metrics):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.metrics = registry
+        self._expected = None
+        self._after_id = None
+
+    def start(self):
+        if self._after_id is None:
+            self._schedule()
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self._after_id = self.root.after(self.interval_ms, self._fire)
+
+    def _fire(self):
+        lag = max(0.0, (time.perf_counter() - self._expected) * 1000)
+        self.metrics.record("tk.lag", lag)
+        self._schedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def pending(self):
+        return 0 if self._after_id is None else 1
+
+
+# ---------------------------
+# Overlay en pantalla
+# ---------------------------
+class ProfilerOverlay:
+    # etiqueta semitransparente arriba a la derecha; toggle() la muestra/oculta.
+    # timers: dónde programar el refresco (p.ej. scheduler.scoped(); por defecto root)
+    def __init__(self, root, registry=metrics, refresh_ms=500, rows=8, timers=None):
+        self.root = root
+        self.timers = timers or root
+        self.metrics = registry
+        self.refresh_ms = refresh_ms
+        self.rows = rows
+        self.label = None
+        self._after_id = None
+
+    @property
+    def visible(self):
+        return self._after_id is not None
+
+    def toggle(self, event=None):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        import tkinter as tk
+
+        if self.label is None:
+            self.label = tk.Label(self.root, text="", justify="left", anchor="ne",
+                                  font=("Consolas", 9), bg="#000000", fg="#9ef0a0")
+        self.label.place(relx=1.0, rely=0.0, anchor="ne")
+        self.label.lift()
+        self._refresh()
+
+    def hide(self):
+        if self._after_id is not None:
+            self.timers.after_cancel(self._after_id)
+            self._after_id = None
+        if self.label is not None:
+            self.label.place_forget()
+
+    def text(self):
+        data = self.metrics.snapshot()
+        lines = [f"{'ruta':<20}{'n':>6}{'p50':>8}{'p95':>8}{'max':>8}"]
+        timers = sorted(data["timers"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+        for name, s in timers[:self.rows]:
+            lines.append(f"{name[:20]:<20}{s['count']:>6}{s['p50_ms']:>8.2f}{s['p95_ms']:>8.2f}{s['max_ms']:>8.1f}")
+        for name, n in list(data["counters"].items())[:self.rows]:
+            lines.append(f"{name[:20]:<20}{n:>6}")
+        return "\n".join(lines)
+
+    def _refresh(self):
+        self.label.config(text=self.text())
+        self._after_id = self.timers.after(self.refresh_ms, self._refresh)
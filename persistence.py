@@ -0,0 +1,547 @@
+# persistence.py
+import copy
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from instrumentation import metrics, timed
+from state_model import SceneState, StateView, from_inline_save, from_save, model_headers, register_header, section_key
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_EVERY = 64   # líneas de diario antes de compactar en la foto
+
+# contenedor binario: b"TLCS" + versión + tabla de secciones
+MAGIC = b"TLCS"
+FORMAT_VERSION = 1
+CODEC_JSON = 0
+CODEC_HOSPITAL = 1   # mapa de pisos/habitaciones empacado en bits
+CODEC_STATE = 2      # estado tipado con la cabecera del modelo en la sección (solo lectura)
+CODEC_STATE_REF = 3  # estado tipado de state_model (SceneState.to_save); cabecera en "models"
+
+# ---------------------------
+# Escritura atómica
+# ---------------------------
+def atomic_write_bytes(path, payload: bytes):
+    # escribe a un temporal, fsync y rename: nunca queda un archivo a medias
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def journal_path(path):
+    return path + JOURNAL_SUFFIX
+
+
+def _json_bytes(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def _json_default(o):
+    if isinstance(o, RawSection):
+        return o.decode()
+    if isinstance(o, SceneState):
+        return o.to_dict()
+    raise TypeError(f"No serializable: {type(o).__name__}")
+
+
+# ---------------------------
+# Formato binario por secciones
+# ---------------------------
+# cabecera: MAGIC, "<BH" (versión, nº de secciones)
+# tabla:    por sección "<B" largo del nombre + nombre + "<BII" (códec, offset, largo)
+# secciones: "meta" (player_name, current_scene, ...), "models" (cabeceras de los
+# modelos de state_model, una por modelo usado) y "scene:<escenario>" por cada scene_data
+class RawSection:
+    # sección de escenario aún sin decodificar: se reescribe tal cual si nadie la toca
+    __slots__ = ("codec", "payload")
+
+    def __init__(self, codec, payload: bytes):
+        self.codec = codec
+        self.payload = payload
+
+    def decode(self):
+        return _decode_section(self.codec, self.payload)
+
+    def __eq__(self, other):
+        return isinstance(other, RawSection) and self.codec == other.codec and self.payload == other.payload
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _pack_bits(bits) -> bytes:
+    out = bytearray((len(bits) + 7) // 8)
+    for i, b in enumerate(bits):
+        if b:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+def _unpack_bits(buf, n):
+    return [bool(buf[i >> 3] & (1 << (i & 7))) for i in range(n)]
+
+
+def _hospital_shape(floors):
+    # solo se empaca la forma regular que genera scene2: pisos "1".."N", habitaciones "R1".."Rm"
+    if not isinstance(floors, dict) or not floors:
+        return None
+    n_floors = len(floors)
+    first = floors.get("1")
+    if not isinstance(first, dict) or not first:
+        return None
+    n_rooms = len(first)
+    if n_floors > 255 or n_rooms > 255:
+        return None
+    for i in range(1, n_floors + 1):
+        rooms = floors.get(str(i))
+        if not isinstance(rooms, dict) or len(rooms) != n_rooms:
+            return None
+        for r in range(1, n_rooms + 1):
+            room = rooms.get(f"R{r}")
+            if (not isinstance(room, dict) or len(room) != 2
+                    or type(room.get("occupied")) is not bool or type(room.get("has_tool")) is not bool):
+                return None
+    return n_floors, n_rooms
+
+
+def _encode_section(data):
+    if isinstance(data, RawSection):
+        return data.codec, data.payload
+    if isinstance(data, SceneState):
+        return CODEC_STATE_REF, data.to_save()
+    if isinstance(data, dict):
+        shape = _hospital_shape(data.get("floors"))
+        if shape:
+            n_floors, n_rooms = shape
+            floors = data["floors"]
+            rooms = [floors[str(i)][f"R{r}"] for i in range(1, n_floors + 1) for r in range(1, n_rooms + 1)]
+            rest = {k: v for k, v in data.items() if k != "floors"}
+            payload = (struct.pack("<BB", n_floors, n_rooms)
+                       + _pack_bits([room["occupied"] for room in rooms])
+                       + _pack_bits([room["has_tool"] for room in rooms])
+                       + _json_bytes(rest))
+            return CODEC_HOSPITAL, payload
+    return CODEC_JSON, _json_bytes(data)
+
+
+def _decode_section(codec, payload):
+    if codec == CODEC_JSON:
+        return json.loads(bytes(payload).decode("utf-8"))
+    if codec == CODEC_STATE_REF:
+        return from_save(payload)
+    if codec == CODEC_STATE:
+        return from_inline_save(payload)
+    if codec == CODEC_HOSPITAL:
+        n_floors, n_rooms = struct.unpack_from("<BB", payload, 0)
+        n = n_floors * n_rooms
+        nbytes = (n + 7) // 8
+        occupied = _unpack_bits(payload[2:2 + nbytes], n)
+        tools = _unpack_bits(payload[2 + nbytes:2 + 2 * nbytes], n)
+        data = json.loads(bytes(payload[2 + 2 * nbytes:]).decode("utf-8"))
+        data["floors"] = {
+            str(i): {f"R{r}": {"occupied": occupied[k], "has_tool": tools[k]}
+                     for r, k in ((r, (i - 1) * n_rooms + r - 1) for r in range(1, n_rooms + 1))}
+            for i in range(1, n_floors + 1)
+        }
+        return data
+    raise ValueError(f"Códec de sección desconocido: {codec}")
+
+
+def encode_state(data: dict) -> bytes:
+    meta = {k: v for k, v in data.items() if k != "scene_data"}
+    sections = [("meta", CODEC_JSON, _json_bytes(meta))]
+    keys = []
+    for name, scene in (data.get("scene_data") or {}).items():
+        codec, payload = _encode_section(scene)
+        sections.append((f"scene:{name}", codec, payload))
+        if codec == CODEC_STATE_REF and section_key(payload) not in keys:
+            keys.append(section_key(payload))
+    if keys:
+        # las cabeceras ya son JSON: la sección es la lista de ellas, sin escapar
+        sections.insert(1, ("models", CODEC_JSON, b"[" + b",".join(model_headers(keys)) + b"]"))
+    names = [n.encode("utf-8") for n, _, _ in sections]
+    table_size = sum(1 + len(n) + 9 for n in names)
+    offset = len(MAGIC) + 3 + table_size
+    header = [MAGIC, struct.pack("<BH", FORMAT_VERSION, len(sections))]
+    for raw_name, (_, codec, payload) in zip(names, sections):
+        header.append(struct.pack("<B", len(raw_name)) + raw_name + struct.pack("<BII", codec, offset, len(payload)))
+        offset += len(payload)
+    return b"".join(header + [payload for _, _, payload in sections])
+
+
+def read_sections(blob: bytes):
+    # devuelve {nombre: (códec, memoryview)} sin decodificar nada
+    if blob[:4] != MAGIC:
+        raise ValueError("No es un archivo de guardado")
+    version, count = struct.unpack_from("<BH", blob, 4)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Versión de guardado no soportada: {version}")
+    view = memoryview(blob)
+    pos = 7
+    sections = {}
+    for _ in range(count):
+        n = blob[pos]
+        name = bytes(view[pos + 1:pos + 1 + n]).decode("utf-8")
+        codec, offset, length = struct.unpack_from("<BII", blob, pos + 1 + n)
+        pos += 1 + n + 9
+        sections[name] = (codec, view[offset:offset + length])
+    return sections
+
+
+def decode_state(blob: bytes, scenes=None) -> dict:
+    # scenes=None decodifica todo; si no, solo esos escenarios y el resto queda como RawSection
+    sections = read_sections(blob)
+    codec, payload = sections.get("meta", (CODEC_JSON, b"{}"))
+    state = _decode_section(codec, payload)
+    if "models" in sections:
+        # antes que las secciones: también las que queden como RawSection las usan
+        for header in _decode_section(*sections["models"]):
+            register_header(header)
+    scene_data = {}
+    for name, (codec, payload) in sections.items():
+        if not name.startswith("scene:"):
+            continue
+        scene = name[len("scene:"):]
+        if scenes is None or scene in scenes:
+            scene_data[scene] = _decode_section(codec, payload)
+        else:
+            scene_data[scene] = RawSection(codec, bytes(payload))
+    state["scene_data"] = scene_data
+    return state
+
+
+def scene_section(state: dict, name: str) -> dict:
+    # acceso a scene_data[name] decodificando la sección si todavía está empacada
+    scene_data = state.setdefault("scene_data", {})
+    data = scene_data.get(name)
+    if isinstance(data, RawSection):
+        data = scene_data[name] = data.decode()
+    return data if data is not None else {}
+
+
+# ---------------------------
+# Diferencias de estado (delta por comando)
+# ---------------------------
+# Una operación es [ruta, valor] (asignar) o [ruta] (borrar); ruta = lista de claves.
+def diff_state(old: dict, new: dict, prefix=()):
+    ops = []
+    for k, v in new.items():
+        if k not in old:
+            ops.append([list(prefix) + [k], v])
+            continue
+        ov = old[k]
+        if isinstance(ov, RawSection) and not isinstance(v, RawSection):
+            ov = old[k] = ov.decode()
+        if isinstance(v, SceneState) and type(ov) is type(v):
+            # estado tipado: banderas, enteros y celdas sin recorrer dicts
+            ops.extend(v.diff(ov, prefix + (k,)))
+            ops.extend(diff_state(ov.extra, v.extra, prefix + (k,)))
+            continue
+        if ov == v and type(ov) is type(v):
+            continue
+        if isinstance(ov, dict) and isinstance(v, dict):
+            ops.extend(diff_state(ov, v, prefix + (k,)))
+        else:
+            ops.append([list(prefix) + [k], v])
+    for k in old:
+        if k not in new:
+            ops.append([list(prefix) + [k]])
+    return ops
+
+
+def apply_ops(state: dict, ops):
+    # las operaciones son absolutas, así que re-aplicarlas es idempotente
+    for op in ops:
+        path = op[0]
+        node = state
+        for k in path[:-1]:
+            nxt = node.get(k)
+            if not isinstance(nxt, (dict, StateView)):
+                nxt = {}
+                node[k] = nxt
+            node = nxt
+        if len(op) > 1:
+            node[path[-1]] = copy.deepcopy(op[1])
+        else:
+            node.pop(path[-1], None)
+    return state
+
+
+def read_journal(path):
+    # cada línea: {"t": marca de tiempo, "ops": [...]}; sirve también como registro de partida
+    jpath = journal_path(path)
+    if not os.path.exists(jpath):
+        return
+    with open(jpath, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # línea final cortada por un cierre abrupto: se ignora
+                break
+
+
+@timed("save.read_state")
+def read_state(path, lazy=True) -> dict:
+    # foto + cola del diario. Con lazy solo se decodifica el escenario activo
+    # (y los que el diario modifica); los demás quedan como RawSection.
+    try:
+        journal = list(read_journal(path))
+    except Exception:
+        journal = []
+    state = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            scenes = None
+            if lazy:
+                codec, payload = read_sections(blob).get("meta", (CODEC_JSON, b"{}"))
+                scenes = {_decode_section(codec, payload).get("current_scene")}
+                for entry in journal:
+                    for op in entry.get("ops", []):
+                        path_ = op[0]
+                        if len(path_) > 1 and path_[0] == "scene_data":
+                            scenes.add(path_[1])
+            state = decode_state(blob, scenes=scenes)
+        except Exception:
+            state = {}
+    try:
+        for entry in journal:
+            apply_ops(state, entry.get("ops", []))
+    except Exception:
+        pass
+    return state
+
+
+@timed("save.write_state")
+def write_state(path, data: dict):
+    atomic_write_bytes(path, encode_state(data))
+    remove_file(journal_path(path))
+
+
+# ---------------------------
+# Conversión desde el formato JSON anterior
+# ---------------------------
+def read_json_state(path) -> dict:
+    state = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except Exception:
+            state = {}
+    try:
+        for entry in read_journal(path):
+            apply_ops(state, entry.get("ops", []))
+    except Exception:
+        pass
+    return state
+
+
+def convert_json_save(json_path, path, remove_old=True):
+    # savegame.json (+ su diario) -> contenedor binario; devuelve True si convirtió algo
+    if not (os.path.exists(json_path) or os.path.exists(journal_path(json_path))):
+        return False
+    write_state(path, read_json_state(json_path))
+    if remove_old:
+        remove_file(json_path)
+        remove_file(journal_path(json_path))
+    return True
+
+
+def save_exists(path, legacy_path=None):
+    paths = [path, journal_path(path)]
+    if legacy_path:
+        paths += [legacy_path, journal_path(legacy_path)]
+    return any(os.path.exists(p) for p in paths)
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+# ---------------------------
+# Servicio de guardado en segundo plano
+# ---------------------------
+class SaveService:
+    # mark_dirty() calcula el delta respecto a lo ya guardado y lo encola como una
+    # línea del diario; un hilo aparte las agrega al archivo (varias por escritura).
+    # Las ráfagas de cambios se agrupan en un solo delta: con schedule (p.ej.
+    # root.after) el delta se arma delay ms después del primer cambio; sin él, a
+    # lo sumo uno por ventana de delay ms y lo que quede pendiente sale con el
+    # siguiente mark_dirty() o en flush(). delay=0 = un delta por llamada.
+    # Cada COMPACT_EVERY líneas, y en flush() (ganar / perder / salir), el diario se
+    # compacta en la foto completa con escritura atómica.
+    def __init__(self, path, delay=400, schedule=None, compact_every=COMPACT_EVERY, legacy_path=None):
+        self.path = path
+        self.jpath = journal_path(path)
+        self.legacy_path = legacy_path   # guardado JSON anterior, se convierte al cargar
+        self.delay = delay            # ms de espera para agrupar cambios
+        self.schedule = schedule      # p.ej. root.after; None = ventana de delay ms
+        self.compact_every = compact_every
+        self._data = None
+        self._scheduled = False
+        self._last_delta = None       # time.monotonic() del último delta (sin schedule)
+        self._base = {}               # lo que representan foto + diario en disco
+        self._journal_len = 0
+        self._jobs = deque()          # ("append", bytes) | ("snapshot", bytes)
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="save-worker", daemon=True)
+        self._thread.start()
+
+    def load(self) -> dict:
+        # foto + cola del diario; el resultado pasa a ser la base de los deltas
+        with self._write_lock:
+            if self.legacy_path and not os.path.exists(self.path):
+                try:
+                    convert_json_save(self.legacy_path, self.path)
+                except Exception:
+                    pass
+            state = read_state(self.path)
+            self._journal_len = sum(1 for _ in read_journal(self.path))
+        self._base = copy.deepcopy(state)
+        return state
+
+    # --- lado UI ---
+    def mark_dirty(self, data: dict):
+        self._data = data
+        if self.schedule is None:
+            now = time.monotonic()
+            if self._last_delta is None or (now - self._last_delta) * 1000 >= self.delay:
+                self._last_delta = now
+                self._snapshot()
+        elif not self._scheduled:
+            self._scheduled = True
+            self.schedule(self.delay, self._snapshot)
+
+    @timed("save.delta")
+    def _snapshot(self, compact=False):
+        self._scheduled = False
+        data, self._data = self._data, None
+        if data is None:
+            return
+        ops = diff_state(self._base, data)
+        if ops:
+            apply_ops(self._base, ops)
+            self._journal_len += 1
+            metrics.count("save.ops", len(ops))
+        if compact or self._journal_len >= self.compact_every:
+            self._push("snapshot", encode_state(self._base))
+            self._journal_len = 0
+        elif ops:
+            line = json.dumps({"t": round(time.time(), 3), "ops": ops}, ensure_ascii=False, default=_json_default)
+            self._push("append", (line + "\n").encode("utf-8"))
+
+    def _push(self, kind, payload):
+        with self._cond:
+            self._jobs.append((kind, payload))
+            self._cond.notify()
+
+    def flush(self, data: dict = None):
+        self.commit(data)
+        self.write()
+
+    def commit(self, data: dict = None):
+        # lado UI de flush(): encola la foto compacta sin tocar el disco
+        if data is not None:
+            self._data = data
+        if self._data is None:
+            self._data = self._base
+        self._snapshot(compact=True)
+
+    def write(self):
+        # lado disco de flush(): escribe lo encolado (puede correr en otro hilo)
+        with self._write_lock:
+            self._drain()
+
+    def discard(self):
+        # olvida cambios pendientes (p.ej. nueva partida) y espera a la escritura en curso
+        self._data = None
+        with self._write_lock:
+            with self._cond:
+                self._jobs.clear()
+        self._base = {}
+        self._journal_len = 0
+
+    def delete(self):
+        self.discard()
+        with self._write_lock:
+            remove_file(self.path)
+            remove_file(self.jpath)
+            if self.legacy_path:
+                remove_file(self.legacy_path)
+                remove_file(journal_path(self.legacy_path))
+
+    def close(self, data: dict = None):
+        self.flush(data)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=2)
+
+    # --- lado hilo ---
+    @timed("save.write")
+    def _drain(self):
+        # se llama con _write_lock tomado: escribe los trabajos en orden
+        with self._cond:
+            jobs = list(self._jobs)
+            self._jobs.clear()
+        chunk = []
+        for kind, payload in jobs:
+            if kind == "append":
+                chunk.append(payload)
+                continue
+            chunk = []   # la foto ya contiene las líneas anteriores
+            try:
+                # compactación: foto atómica y luego vaciar el diario.
+                # Si se corta entre ambos pasos, re-aplicar el diario es idempotente.
+                atomic_write_bytes(self.path, payload)
+                remove_file(self.jpath)
+            except Exception:
+                pass
+        if chunk:
+            try:
+                with open(self.jpath, "ab") as f:
+                    f.write(b"".join(chunk))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception:
+                pass
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if not self._jobs and self._closed:
+                    return
+            with self._write_lock:
+                self._drain()
+
+
+# ---------------------------
+# Conversor manual: python persistence.py savegame.json savegame.tlc
+# ---------------------------
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("uso: python persistence.py <savegame.json> <savegame.tlc>")
+        sys.exit(2)
+    if convert_json_save(sys.argv[1], sys.argv[2], remove_old=False):
+        print(f"Convertido {sys.argv[1]} -> {sys.argv[2]}")
+    else:
+        print(f"No existe {sys.argv[1]}")
+        sys.exit(1)
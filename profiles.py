@@ -0,0 +1,235 @@
+# profiles.py
+# Varios jugadores en la misma máquina (kiosco): un guardado por perfil dentro de
+# saves/ y un índice (saves/index.json) con lo necesario para listar perfiles sin
+# abrir sus partidas. Las consultas van al índice en memoria; las escrituras del
+# índice se hacen con candado entre procesos (leer, modificar, escribir atómico),
+# y cada perfil abierto queda reservado por la instancia que lo usa.
+import hashlib
+import json
+import os
+import re
+import time
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+from persistence import (SaveService, atomic_write_bytes, convert_json_save, journal_path, read_state,
+                         remove_file, save_exists, write_state)
+
+PROFILES_DIR = "saves"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+SAVE_SUFFIX = ".tlc"
+
+
+# ---------------------------
+# Candado entre procesos
+# ---------------------------
+class FileLock:
+    # flock en POSIX, msvcrt.locking en Windows; sin ninguno no bloquea
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        f = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            elif msvcrt is not None:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+                        time.sleep(0.05)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def profile_slug(name):
+    # nombre de archivo estable y seguro para cualquier nombre de jugador
+    base = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:24] or "jugador"
+    return f"{base}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+
+# ---------------------------
+# Almacén de perfiles
+# ---------------------------
+class ProfileStore:
+    def __init__(self, directory=PROFILES_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._index_lock = FileLock(os.path.join(directory, "index.lock"))
+        self._claims = {}     # perfiles reservados por esta instancia
+        self._index = {"version": INDEX_VERSION, "profiles": {}, "last": None}
+        self._mtime = None
+        self.refresh()
+
+    # --- índice ---
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"version": INDEX_VERSION, "profiles": {}, "last": None}
+
+    def _stat(self):
+        try:
+            return os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self):
+        # relee el índice solo si otra instancia lo cambió
+        mtime = self._stat()
+        if mtime != self._mtime:
+            self._index = self._read_index()
+            self._mtime = mtime
+
+    def _update(self, change):
+        # leer-modificar-escribir con el candado tomado (seguro entre instancias)
+        with self._index_lock:
+            index = self._read_index()
+            change(index)
+            payload = json.dumps(index, ensure_ascii=False, indent=1).encode("utf-8")
+            atomic_write_bytes(self.index_path, payload)
+            self._index = index
+            self._mtime = self._stat()
+
+    # --- consultas (índice en memoria) ---
+    def has_profiles(self):
+        return bool(self._index["profiles"])
+
+    def names(self):
+        # el más reciente primero
+        profiles = self._index["profiles"]
+        return sorted(profiles, key=lambda n: profiles[n].get("updated", 0), reverse=True)
+
+    def get(self, name):
+        return self._index["profiles"].get(name)
+
+    def last(self):
+        return self._index.get("last")
+
+    def path(self, name):
+        entry = self.get(name)
+        slug = entry["file"] if entry else profile_slug(name)
+        return os.path.join(self.directory, slug + SAVE_SUFFIX)
+
+    # --- perfiles ---
+    def claim(self, name):
+        # reserva el perfil para esta instancia; False si otra lo está usando
+        if name in self._claims:
+            return True
+        lock = FileLock(self.path(name) + ".lock")
+        if not lock.acquire(blocking=False):
+            return False
+        self._claims[name] = lock
+        return True
+
+    def release(self, name):
+        lock = self._claims.pop(name, None)
+        if lock is not None:
+            lock.release()
+
+    def open(self, name, **service_options):
+        # SaveService del perfil (lo crea en el índice); None si está en uso
+        if not self.claim(name):
+            return None
+        self.touch(name)
+        return SaveService(self.path(name), **service_options)
+
+    def touch(self, name, **fields):
+        # actualiza la entrada del perfil (p.ej. current_scene) y lo marca como último
+        self.touch_many({name: fields})
+
+    def touch_many(self, updates):
+        # varias entradas en una sola escritura del índice ({nombre: campos}); el
+        # servidor la usa para guardar muchas sesiones de una vez
+        if not updates:
+            return
+        now = round(time.time(), 3)
+
+        def change(index):
+            for name, fields in updates.items():
+                entry = index["profiles"].setdefault(name, {"file": profile_slug(name), "created": now})
+                entry.update(fields)
+                entry["updated"] = now
+                index["last"] = name
+        self._update(change)
+
+    def remove(self, name):
+        path = self.path(name)
+        self.release(name)
+
+        def change(index):
+            index["profiles"].pop(name, None)
+            if index.get("last") == name:
+                index["last"] = None
+        self._update(change)
+        remove_file(path)
+        remove_file(journal_path(path))
+        remove_file(path + ".lock")
+
+    def import_save(self, state, fallback_name="Jugador"):
+        # agrega una partida suelta (p.ej. el savegame único anterior) como perfil
+        name = state.get("player_name") or fallback_name
+        if self.get(name) is not None:
+            return None
+        write_state(self.path(name), state)
+        self.touch(name, current_scene=state.get("current_scene"))
+        return name
+
+    def import_legacy(self, save_path, json_path=None):
+        # savegame.tlc / savegame.json del directorio actual -> perfil (una sola vez)
+        if not save_exists(save_path, json_path):
+            return None
+        with self._index_lock:
+            if json_path and not save_exists(save_path):
+                convert_json_save(json_path, save_path)
+            state = read_state(save_path, lazy=False)
+        name = self.import_save(state) if state else None
+        if name or not state:
+            # si el nombre ya tiene perfil se deja el archivo para no perder nada
+            remove_file(save_path)
+            remove_file(journal_path(save_path))
+        return name
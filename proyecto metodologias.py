@@ -1,77 +1,122 @@
 # the_last_code.py
+import time
+_T_START = time.perf_counter()   # para el reporte de arranque (import -> primer frame)
+
 import tkinter as tk
 from tkinter import messagebox
 import json
 import os
-import random
-import threading
-import time
-
-# Sonidos opcionales con pygame (si no está instalado funciona sin sonidos)
-try:
-    import pygame
-    pygame.mixer.init()
-    SOUND_AVAILABLE = True
-except Exception:
-    SOUND_AVAILABLE = False
-
-SAVEFILE = "savegame.json"
-
-# ---------------------------
-# UTILIDADES: guardar / cargar
-# ---------------------------
-def load_save():
-    if os.path.exists(SAVEFILE):
-        try:
-            with open(SAVEFILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-def save_game(data: dict):
-    with open(SAVEFILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+import sqlite3
+import sys
+
+from animation import Typewriter
+from async_bridge import AsyncBridge
+from audio import SCENE_SOUNDS, AudioManager
+from client import GameClient, RemoteProfiles, RemoteStats, ServerError
+from game_core import end_run, resume_session, scenarios, store_progress
+from instrumentation import LagMonitor, ProfilerOverlay, metrics
+from profiles import PROFILES_DIR, ProfileStore
+from replay import Recorder
+from rng_streams import SessionRng
+from run_stats import PAGE_SIZE, STATS_FILE, RunStats, run_record
+from scheduler import Scheduler
+from screens import ScreenPool
+from suggest import Suggester, index_for
+from transcript import Transcript
+
+_T_IMPORTED = time.perf_counter()
+
+# un guardado por jugador en PROFILES_DIR (ver profiles.py); los archivos de
+# partida única anteriores se importan como perfil la primera vez
+SAVEFILE = "savegame.tlc"
+LEGACY_SAVEFILE = "savegame.json"
 
 # ---------------------------
 # Sonidos (si están disponibles)
 # ---------------------------
+# Sonidos opcionales con pygame (si no está instalado funciona sin sonidos).
+# pygame y el mezclador se inician en segundo plano después de pintar la
+# bienvenida (ver TheLastCodeApp.__init__) o en el primer uso.
+# caché LRU de sonidos decodificados; los archivos que faltan no se reintentan
+audio = AudioManager()
+
 def play_sound(path, loops=0):
-    if not SOUND_AVAILABLE:
-        return
-    try:
-        s = pygame.mixer.Sound(path)
-        s.play(loops=loops)
-    except Exception:
-        pass
+    audio.play(path, loops=loops)
 
 def stop_music():
-    if not SOUND_AVAILABLE:
-        return
-    try:
-        pygame.mixer.stop()
-    except Exception:
-        pass
+    audio.stop_ambience()
+    audio.stop_all()
 
 # ---------------------------
 # APP
 # ---------------------------
 class TheLastCodeApp:
-    def __init__(self, root):
+    def __init__(self, root, record_dir=None, profiles_dir=PROFILES_DIR, metrics_out=None, server=None):
         self.root = root
         root.title("The Last Code")
         root.geometry("900x640")
         root.resizable(False, False)
-
-        # estado del juego en memoria
-        self.state = load_save()
-        self.player_name = self.state.get("player_name", None)
-        self.current_scene = self.state.get("current_scene", None)  # e.g. "scenario1", etc.
-        self.scene_data = self.state.get("scene_data", {})
+        root.protocol("WM_DELETE_WINDOW", self.quit)
+
+        # con server ("host:puerto") la app es cliente de server.py: partidas,
+        # perfiles y guardados viven allá (ver client.py). El socket bloquea, así
+        # que se conecta en la primera petición y todas van al pool de hilos
+        self.remote = GameClient(server, lazy=True) if server else None
+
+        # perfiles de jugador; el índice responde sin leer las partidas
+        self.profiles = RemoteProfiles(self.remote) if self.remote else ProfileStore(profiles_dir)
+        self.profiles.import_legacy(SAVEFILE, LEGACY_SAVEFILE)
+        # guardado en segundo plano del perfil abierto: cada comando agrega su
+        # delta al diario (fuera del hilo de Tk) y se compacta periódicamente
+        self.saver = None
+
+        # historial de partidas terminadas (SQLite, escrito por lotes en su hilo) y
+        # clasificación; en modo remoto lo lleva el servidor
+        self.stats = RemoteStats(self.remote) if self.remote else RunStats(os.path.join(profiles_dir, STATS_FILE))
+
+        # temporizadores de las pantallas: cada after queda anotado con la pantalla
+        # actual y clear() los cancela; los que vencen en el mismo tick van juntos
+        self.scheduler = Scheduler(root, current_scope=lambda: self.screen_pool.current)
+
+        # animaciones de texto: un solo tick para todas; Escape las completa
+        self.typewriter = Typewriter(self.scheduler)
+        root.bind("<Escape>", lambda e: self.typewriter.skip())
+
+        # trabajo en segundo plano: corutinas en el bucle de Tk + pool de hilos;
+        # las tareas de una pantalla se cancelan al salir de ella (clear)
+        self.tasks = AsyncBridge(root)
+
+        # instrumentación: retraso del bucle de Tk, overlay con F3 y, con
+        # metrics_out (.json o .csv), exportación al salir
+        self.lag_monitor = LagMonitor(root)
+        self.lag_monitor.start()
+        self.overlay = ProfilerOverlay(root, timers=self.scheduler.scoped(None))
+        # lo que programa Tk sin pasar por el scheduler también sale en sus stats
+        self.scheduler.watch("async_tasks", self.tasks.pending)
+        self.scheduler.watch("lag_monitor", self.lag_monitor.pending)
+        root.bind("<F3>", self.overlay.toggle)
+        self.metrics_out = metrics_out
+
+        # escenarios declarados en scenarios/*.json (reglas compiladas al cargar)
+        self.scenarios = scenarios()
+
+        # aleatoriedad de la partida actual (semilla + flujos, va en el guardado);
+        # con record_dir cada escenario se graba para reproducirlo con replay.py
+        self.rng = SessionRng()
+        self.record_dir = record_dir
+        self.recorder = None
+
+        # estado del juego en memoria (foto + diario del perfil abierto)
+        self.state = {}
+        self.player_name = None
+        self.current_scene = None  # e.g. "scenario1", etc.
+        self.scene_data = {}
 
         # contenedores
         self.main_frame = tk.Frame(root, bg="#111111")
         self.main_frame.pack(fill="both", expand=True)
+        # cada pantalla se construye una vez y luego solo se oculta / muestra
+        self.screen_pool = ScreenPool(self.main_frame)
 
         # Fuente simple
         self.title_font = ("Segoe UI", 36, "bold")
@@ -79,36 +124,232 @@ class TheLastCodeApp:
         self.h2 = ("Segoe UI", 14, "normal")
 
         self.show_welcome_screen()
+        if self.remote is not None:
+            self.tasks.spawn(self.remote_refresh())
+
+        # el audio arranca cuando Tk ya pintó la primera pantalla
+        root.after_idle(audio.init_async)
+
+    # ---------------------------
+    # UTIL: guardar
+    # ---------------------------
+    def save(self):
+        # durante el juego: solo marca sucio, se escribe en segundo plano
+        if self.saver is not None:
+            self.saver.mark_dirty(self.state)
+
+    def save_now(self):
+        # en transiciones importantes (ganar / perder / nombre nuevo): foto completa
+        # escrita antes de seguir, así un cierre justo después no pierde el final
+        if self.saver is not None:
+            self.saver.flush(self.state)
+            self.profiles.touch(self.player_name, current_scene=self.state.get("current_scene"))
+
+    def open_profile(self, name):
+        # cambia al perfil name; False si otra instancia lo tiene abierto
+        if name == self.player_name and self.saver is not None:
+            return True
+        self.close_profile()
+        # los cambios de una ráfaga de comandos salen en un solo delta; el
+        # temporizador no es de ninguna pantalla para que clear() no lo cancele
+        saver = self.profiles.open(name, schedule=lambda ms, fn: self.scheduler.after(ms, fn, scope=None))
+        return self.use_profile(name, saver)
+
+    def use_profile(self, name, saver):
+        if saver is None:
+            messagebox.showwarning("Perfil en uso", f"El perfil {name} está abierto en otra ventana.")
+            return False
+        self.saver = saver
+        self.player_name = name
+        return True
+
+    async def remote_profile(self, name, new=False):
+        # modo remoto: hello (y luego load o delete) en el pool de hilos; el
+        # resultado sigue en el hilo de Tk como open_profile + resume/new
+        saver = self.saver if name == self.player_name else None
+        if saver is None:
+            self.close_profile()
+        try:
+            if saver is None:
+                saver = await self.tasks.to_thread(self.profiles.open, name)
+            state = None
+            if saver is not None:
+                state = await self.tasks.to_thread(saver.delete if new else saver.load)
+        except (OSError, ServerError) as e:
+            messagebox.showerror("Servidor", f"No se pudo abrir el perfil: {e}")
+            return
+        if not self.use_profile(name, saver):
+            return
+        if new:
+            self.start_profile()
+        else:
+            self.enter_profile(state)
+
+    async def remote_refresh(self, then=None):
+        # índice de perfiles del servidor; al arrancar solo actualiza "Continuar"
+        try:
+            await self.tasks.to_thread(self.profiles.refresh)
+        except (OSError, ServerError) as e:
+            messagebox.showerror("Servidor", f"No se pudo conectar con el servidor: {e}")
+            return
+        if then is not None:
+            then()
+        elif getattr(self.screen_pool.current, "name", None) == "welcome":
+            self.show_continue(self.screen_pool.current)
+
+    def close_profile(self):
+        if self.saver is None:
+            return
+        self.saver.close(self.state)
+        self.profiles.touch(self.player_name, current_scene=self.state.get("current_scene"))
+        self.profiles.release(self.player_name)
+        self.saver = None
+
+    def quit(self):
+        self.stop_recording()
+        self.close_profile()   # escritura síncrona de lo pendiente
+        self.tasks.close()
+        self.stats.close()
+        self.lag_monitor.stop()
+        self.export_metrics()
+        self.scheduler.cancel_all()
+        if self.remote is not None:
+            self.remote.close()
+        self.root.destroy()
+
+    def export_metrics(self, path=None):
+        path = path or self.metrics_out
+        if not path:
+            return
+        if path.endswith(".csv"):
+            metrics.export_csv(path)
+        else:
+            metrics.export_json(path, extra={"timers": self.scheduler.stats()})
+
+    def start_recording(self, session):
+        if self.record_dir is None:
+            return
+        base = os.path.join(self.record_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{session.scenario.id}")
+        path, n = f"{base}.jsonl", 1
+        while os.path.exists(path):
+            n += 1
+            path = f"{base}-{n}.jsonl"
+        self.recorder = Recorder(path, session)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
     # ---------------------------
     # UTIL: limpiar pantalla
     # ---------------------------
     def clear(self):
-        for w in self.main_frame.winfo_children():
-            w.destroy()
-        stop_music()
+        # oculta la pantalla actual; se conserva para la próxima visita
+        with metrics.timed("screen.clear"):
+            self.tasks.cancel_scope(self.screen_pool.current)
+            self.typewriter.cancel_all()
+            self.scheduler.cancel_scope(self.screen_pool.current)
+            self.screen_pool.hide_current()
+            stop_music()
+            self.stop_recording()
+
+    def show_screen(self, name, build, bg="#111111"):
+        # build(screen) solo corre la primera vez; lo dinámico se reinicia en cada show_*
+        self.clear()
+        return self.screen_pool.show(name, build, bg=bg)
+
+    # ---------------------------
+    # UTIL: transcripción de los escenarios
+    # ---------------------------
+    def make_transcript(self, parent, bg):
+        return Transcript(parent, height=14, wrap="word", font=("Segoe UI", 12), bg=bg, fg="#e6eef6")
+
+    def build_scene_screen(self, screen, title, text_bg, title_pady=6):
+        # título + transcripción + entrada; los comandos van a screen.on_command
+        f = screen.frame
+
+        title_lbl = tk.Label(f, text=title, font=self.h1, bg="#071018", fg="#e6eef6")
+        title_lbl.pack(pady=title_pady)
+
+        screen.transcript = self.make_transcript(f, bg=text_bg)
+        screen.transcript.pack(padx=20, pady=8, fill="both", expand=False)
+
+        input_frame = tk.Frame(f, bg="#071018")
+        input_frame.pack(pady=6)
+
+        screen.cmd_var = tk.StringVar()
+        screen.entry = tk.Entry(input_frame, textvariable=screen.cmd_var, font=self.h2, width=60)
+        screen.entry.pack(side="left", padx=8)
+
+        def submit():
+            if screen.on_command:
+                screen.on_command(screen.cmd_var.get().strip().lower())
+
+        submit_btn = tk.Button(input_frame, text="OK", command=submit)
+        submit_btn.pack(side="left")
+
+        # optional: allow Enter to submit
+        screen.entry.bind("<Return>", lambda e: submit_btn.invoke())
+
+        # sugerencias mientras se escribe (ver suggest.py); Tab acepta la primera
+        screen.suggest_lbl = tk.Label(f, text="", font=("Segoe UI", 11), bg="#071018", fg="#8fa3b5")
+        screen.suggest_lbl.pack(pady=(0, 6))
+
+        def on_type(*_):
+            if screen.suggester is None:
+                return
+            with metrics.timed("suggest"):
+                found = screen.suggester.suggest(screen.cmd_var.get())
+            screen.suggest_lbl.config(text="   ·   ".join(found))
+
+        def complete(e):
+            if screen.suggester is not None:
+                screen.cmd_var.set(screen.suggester.complete(screen.cmd_var.get()))
+                screen.entry.icursor("end")
+            return "break"
+
+        screen.refresh_suggestions = on_type
+        screen.cmd_var.trace_add("write", on_type)
+        screen.entry.bind("<Tab>", complete)
+
+    def enter_scene_screen(self, name, title, text_bg, title_pady=6, bg="#111111"):
+        screen = self.show_screen(name, lambda sc: self.build_scene_screen(sc, title, text_bg, title_pady), bg=bg)
+        screen.on_command = None
+        screen.suggester = None
+        screen.waiting = False     # comando en camino al servidor (modo remoto)
+        screen.transcript.reset()
+        screen.cmd_var.set("")
+        screen.entry.focus_set()
+        return screen
 
     # ---------------------------
     # Animación de texto (tipo máquina)
     # ---------------------------
     def type_text(self, label, text, delay=30, after_callback=None):
         # label: tk.Label, text: str, delay in ms per char
-        label.config(text="")
-        def run(i=0):
-            if i <= len(text):
-                label.config(text=text[:i])
-                self.root.after(delay, run, i+1)
-            else:
-                if after_callback:
-                    after_callback()
-        run(1)
+        # (se agrupan los caracteres por frame; ver animation.Typewriter)
+        self.typewriter.add(label, text, delay=delay, after_callback=after_callback)
 
     # ---------------------------
     # PANTALLA: Bienvenida
     # ---------------------------
     def show_welcome_screen(self):
-        self.clear()
-        f = self.main_frame
+        screen = self.show_screen("welcome", self.build_welcome_screen)
+        self.show_continue(screen)
+
+    def show_continue(self, screen):
+        # Continue only if some profile exists (consulta al índice en memoria)
+        if self.profiles.has_profiles():
+            screen.placeholder.pack_forget()
+            screen.cont_btn.pack(after=screen.new_btn)
+        else:
+            screen.cont_btn.pack_forget()
+            # invisible placeholder for spacing niceness
+            screen.placeholder.pack(after=screen.new_btn)
+
+    def build_welcome_screen(self, screen):
+        f = screen.frame
 
         # Left title box
         left = tk.Frame(f, bg="#0f1720", width=420, height=640)
@@ -131,108 +372,315 @@ class TheLastCodeApp:
         spacer = tk.Frame(right, height=120, bg="#081018")
         spacer.pack()
 
-        new_btn = tk.Button(right, text="New Game", font=self.h1, width=18, command=self.new_game)
-        new_btn.pack(pady=(0, 10))
+        screen.new_btn = tk.Button(right, text="New Game", font=self.h1, width=18, command=self.new_game)
+        screen.new_btn.pack(pady=(0, 10))
 
-        # Continue only if save exists
-        if os.path.exists(SAVEFILE):
-            cont_btn = tk.Button(right, text="Continue", font=self.h1, width=18, command=self.continue_game)
-            cont_btn.pack()
-        else:
-            # invisible placeholder for spacing niceness
-            tk.Label(right, text="", bg="#081018").pack()
+        # Continue / placeholder: se muestra uno u otro en show_welcome_screen
+        screen.cont_btn = tk.Button(right, text="Continue", font=self.h1, width=18, command=self.continue_game)
+        screen.placeholder = tk.Label(right, text="", bg="#081018")
+
+        screen.board_btn = tk.Button(right, text="Leaderboard", font=self.h1, width=18, command=self.show_leaderboard)
+        screen.board_btn.pack(pady=(10, 10))
 
         # Small footer
         footer = tk.Label(right, text="© The Last Code - Demo", bg="#081018", fg="#94a3b8", font=("Segoe UI", 10))
         footer.pack(side="bottom", pady=12)
 
     def new_game(self):
-        # reset saved current_scene and scene_data (but keep player_name if any? we will ask name anyway)
+        # the profile for the entered name starts over; other profiles are kept
+        self.close_profile()
         self.state = {}
-        if os.path.exists(SAVEFILE):
-            try:
-                os.remove(SAVEFILE)
-            except Exception:
-                pass
         self.player_name = None
         self.current_scene = None
         self.scene_data = {}
         self.show_name_screen()
 
     def continue_game(self):
-        self.state = load_save()
-        self.player_name = self.state.get("player_name", None)
+        # with one profile resume it directly; with several, let the player choose
+        if self.remote is not None:
+            if not self.tasks.pending(self.screen_pool.current):
+                self.tasks.spawn(self.remote_refresh(then=self.choose_profile), scope=self.screen_pool.current)
+            return
+        self.profiles.refresh()
+        self.choose_profile()
+
+    def choose_profile(self):
+        names = self.profiles.names()
+        if len(names) == 1:
+            self.resume_profile(names[0])
+        else:
+            self.show_profile_screen()
+
+    def resume_profile(self, name):
+        if self.remote is not None:
+            if not self.tasks.pending(self.screen_pool.current):
+                self.tasks.spawn(self.remote_profile(name), scope=self.screen_pool.current)
+            return
+        if not self.open_profile(name):
+            return
+        self.enter_profile(self.saver.load())
+
+    def enter_profile(self, state):
+        name = self.player_name
+        self.state = state
+        self.state.setdefault("player_name", name)
         self.current_scene = self.state.get("current_scene", None)
         self.scene_data = self.state.get("scene_data", {})
-        if self.player_name is None:
-            self.show_name_screen()
-            return
         # if in the middle of a scenario, resume
-        if self.current_scene in ("scenario1", "scenario2", "scenario3"):
+        if self.current_scene in self.scenarios:
             self.start_scenario(self.current_scene, resume=True)
         else:
             self.show_scenario_selection()
 
     # ---------------------------
-    # PANTALLA: Registro / Nombre
+    # PANTALLA: Perfiles (Continue con varios jugadores)
     # ---------------------------
-    def show_name_screen(self):
-        self.clear()
-        f = self.main_frame
+    def show_profile_screen(self):
+        screen = self.show_screen("profiles", self.build_profile_screen, bg="#07101a")
+        # solo el índice: no se abre ninguna partida para listar
+        screen.names = self.profiles.names()
+        screen.listbox.delete(0, "end")
+        for name in screen.names:
+            scene = self.scenarios.get(self.profiles.get(name).get("current_scene"))
+            screen.listbox.insert("end", f"{name}  —  {scene.title if scene else 'Selección de nivel'}")
+        if screen.names:
+            screen.listbox.selection_set(0)
+        screen.listbox.focus_set()
+
+    def build_profile_screen(self, screen):
+        frame = tk.Frame(screen.frame, bg="#07101a")
+        frame.pack(fill="both", expand=True)
 
-        label_frame = tk.Frame(f, bg="#07101a")
-        label_frame.pack(fill="both", expand=True)
+        title = tk.Label(frame, text="¿Quién juega?", font=self.h1, bg="#07101a", fg="#e2e8f0")
+        title.pack(pady=(60, 20))
 
-        text_label = tk.Label(label_frame, text="", font=self.h1, bg="#07101a", fg="#e2e8f0")
-        text_label.place(relx=0.5, rely=0.35, anchor="center")
+        screen.listbox = tk.Listbox(frame, font=self.h2, width=40, height=10, activestyle="none",
+                                    bg="#0b1b22", fg="#e6eef8", selectbackground="#1f3a4a")
+        screen.listbox.pack()
 
-        entry_var = tk.StringVar()
-        name_entry = tk.Entry(label_frame, textvariable=entry_var, font=self.h2, width=30)
-        name_entry.place(relx=0.5, rely=0.47, anchor="center")
+        def choose(event=None):
+            selected = screen.listbox.curselection()
+            if selected:
+                self.resume_profile(screen.names[selected[0]])
+
+        screen.listbox.bind("<Double-Button-1>", choose)
+        screen.listbox.bind("<Return>", choose)
+
+        buttons = tk.Frame(frame, bg="#07101a")
+        buttons.pack(pady=20)
+        tk.Button(buttons, text="Continuar", font=self.h2, command=choose).pack(side="left", padx=8)
+        tk.Button(buttons, text="Volver", font=self.h2, command=self.show_welcome_screen).pack(side="left", padx=8)
+
+    # ---------------------------
+    # PANTALLA: Clasificación / historial
+    # ---------------------------
+    def show_leaderboard(self, view=None):
+        screen = self.show_screen("leaderboard", self.build_leaderboard, bg="#07101a")
+        # el historial es del jugador con perfil abierto (si lo hay)
+        if self.player_name:
+            screen.history_btn.pack(side="left", padx=4)
+        else:
+            screen.history_btn.pack_forget()
+        screen.loading = False   # una carga de la visita anterior se canceló en clear()
+        self.open_board(screen, view or ("board", next(iter(self.scenarios))))
+
+    def build_leaderboard(self, screen):
+        frame = tk.Frame(screen.frame, bg="#07101a")
+        frame.pack(fill="both", expand=True)
+
+        screen.title = tk.Label(frame, text="", font=self.h1, bg="#07101a", fg="#e2e8f0")
+        screen.title.pack(pady=(30, 10))
+
+        tabs = tk.Frame(frame, bg="#07101a")
+        tabs.pack()
+        for scenario in self.scenarios.values():
+            tk.Button(tabs, text=scenario.title, font=self.h2,
+                      command=lambda sid=scenario.id: self.open_board(screen, ("board", sid))).pack(side="left", padx=4)
+        screen.history_btn = tk.Button(tabs, text="Mi historial", font=self.h2,
+                                       command=lambda: self.open_board(screen, ("history", self.player_name)))
+
+        # una página a la vez: la lista nunca tiene más de PAGE_SIZE filas
+        screen.listbox = tk.Listbox(frame, font=("Consolas", 12), width=72, height=PAGE_SIZE, activestyle="none",
+                                    bg="#0b1b22", fg="#e6eef8", selectbackground="#1f3a4a")
+        screen.listbox.pack(pady=12)
+
+        nav = tk.Frame(frame, bg="#07101a")
+        nav.pack()
+        tk.Button(nav, text="◀", font=self.h2, command=lambda: self.turn_page(screen, -1)).pack(side="left", padx=8)
+        screen.page_label = tk.Label(nav, text="", font=self.h2, bg="#07101a", fg="#94a3b8", width=14)
+        screen.page_label.pack(side="left")
+        tk.Button(nav, text="▶", font=self.h2, command=lambda: self.turn_page(screen, 1)).pack(side="left", padx=8)
+
+        screen.totals = tk.Label(frame, text="", bg="#07101a", fg="#94a3b8", wraplength=760)
+        screen.totals.pack(pady=8)
+        tk.Button(frame, text="Volver", font=self.h2, command=self.show_welcome_screen).pack(pady=8)
+        screen.loading = False
+
+    def open_board(self, screen, view):
+        if screen.loading:
+            return
+        screen.view = view
+        # cursores de las páginas vistas (la primera empieza en None); "atrás" solo desapila
+        screen.cursors = [None]
+        screen.next_cursor = None
+        kind, key = view
+        screen.title.config(text=f"Historial de {key}" if kind == "history" else f"Clasificación: {self.scenarios[key].title}")
+        screen.totals.config(text="")
+        self.load_page(screen)
+
+    def turn_page(self, screen, step):
+        if screen.loading:
+            return
+        if step > 0 and screen.next_cursor is not None:
+            screen.cursors.append(screen.next_cursor)
+        elif step < 0 and len(screen.cursors) > 1:
+            screen.cursors.pop()
+        else:
+            return
+        self.load_page(screen)
+
+    def load_page(self, screen):
+        # la consulta (SQLite o servidor) va al pool de hilos; se pide una fila de
+        # más para saber si hay página siguiente sin contar
+        kind, key = screen.view
+        cursor = screen.cursors[-1]
+        stats = self.stats
+
+        def query():
+            with metrics.timed("stats.page"):
+                if kind == "history":
+                    return stats.history(key, cursor, PAGE_SIZE + 1), None
+                rows = stats.leaderboard(key, cursor, PAGE_SIZE + 1)
+                return rows, stats.totals(key) if cursor is None else None
+
+        def render(result):
+            screen.loading = False
+            rows, totals = result
+            screen.next_cursor = None
+            if len(rows) > PAGE_SIZE:
+                rows = rows[:PAGE_SIZE]
+                # la clasificación sigue tras la última fila; el historial tras su id
+                screen.next_cursor = rows[-1][0] if kind == "history" else rows[-1]
+            screen.listbox.delete(0, "end")
+            first = (len(screen.cursors) - 1) * PAGE_SIZE + 1
+            for n, row in enumerate(rows, first):
+                if kind == "history":
+                    _, scenario_id, _, turns, outcome, reason, ms, finished = row
+                    scenario = self.scenarios.get(scenario_id)
+                    result_text = "victoria" if outcome == "win" else f"derrota ({reason or '?'})"
+                    line = (f"{time.strftime('%d/%m %H:%M', time.localtime(finished))}  "
+                            f"{scenario.title if scenario else scenario_id:<18} {result_text:<22} "
+                            f"{turns:>4} turnos {ms / 1000:>7.1f} s")
+                else:
+                    player, turns, ms = row
+                    line = f"{n:>5}. {player:<24} {turns:>4} turnos {ms / 1000:>8.1f} s"
+                screen.listbox.insert("end", line)
+            if not rows:
+                screen.listbox.insert("end", "  (sin partidas todavía)")
+            screen.page_label.config(text=f"Página {len(screen.cursors)}")
+            if totals is not None:
+                wins = sum(n for (outcome, _), n in totals.items() if outcome == "win")
+                losses = ", ".join(f"{reason or '?'}: {n}" for (outcome, reason), n in sorted(totals.items(), key=str)
+                                   if outcome != "win")
+                screen.totals.config(text=f"{sum(totals.values())} partidas, {wins} victorias"
+                                          + (f" · derrotas por {losses}" if losses else ""))
+
+        def failed():
+            screen.loading = False
+            screen.listbox.delete(0, "end")
+            screen.listbox.insert("end", "  (no se pudo leer el historial)")
+
+        async def job():
+            try:
+                render(await self.tasks.to_thread(query))
+            except (OSError, ServerError, sqlite3.Error):
+                failed()
+
+        screen.loading = True
+        screen.listbox.delete(0, "end")
+        screen.listbox.insert("end", "  cargando…")
+        self.tasks.spawn(job(), scope=screen)
+
+    # ---------------------------
+    # PANTALLA: Registro / Nombre
+    # ---------------------------
+    def show_name_screen(self):
+        screen = self.show_screen("name", self.build_name_screen)
+        screen.entry_var.set("")
 
         def after_typing():
-            name_entry.focus_set()
+            screen.name_entry.focus_set()
 
         # start typing animation
         anim_text = "Bienvenido... Introduce tu nombre o apodo"
-        self.type_text(text_label, anim_text, delay=40, after_callback=after_typing)
+        self.type_text(screen.text_label, anim_text, delay=40, after_callback=after_typing)
+
+    def build_name_screen(self, screen):
+        f = screen.frame
+
+        label_frame = tk.Frame(f, bg="#07101a")
+        label_frame.pack(fill="both", expand=True)
+
+        screen.text_label = tk.Label(label_frame, text="", font=self.h1, bg="#07101a", fg="#e2e8f0")
+        screen.text_label.place(relx=0.5, rely=0.35, anchor="center")
+
+        entry_var = screen.entry_var = tk.StringVar()
+        name_entry = screen.name_entry = tk.Entry(label_frame, textvariable=entry_var, font=self.h2, width=30)
+        name_entry.place(relx=0.5, rely=0.47, anchor="center")
 
         def submit_name(event=None):
             name = entry_var.get().strip()
             if not name:
                 messagebox.showwarning("Nombre requerido", "Introduce un nombre o apodo para continuar.")
                 return
-            self.player_name = name
-            # save minimal data
-            self.state = {"player_name": self.player_name}
-            save_game(self.state)
-            self.show_scenario_selection()
+            if self.remote is not None:
+                if not self.tasks.pending(screen):
+                    self.tasks.spawn(self.remote_profile(name, new=True), scope=screen)
+                return
+            if not self.open_profile(name):
+                return
+            # nueva partida: se reinicia solo el perfil de este jugador
+            self.saver.delete()
+            self.start_profile()
 
         submit_btn = tk.Button(label_frame, text="Continuar", font=self.h2, command=submit_name)
         submit_btn.place(relx=0.5, rely=0.58, anchor="center")
         name_entry.bind("<Return>", submit_name)
 
+    def start_profile(self):
+        # save minimal data
+        self.state = {"player_name": self.player_name}
+        self.save_now()
+        self.show_scenario_selection()
+
     # ---------------------------
     # PANTALLA: Selección de escenarios
     # ---------------------------
     def show_scenario_selection(self):
-        self.clear()
-        f = self.main_frame
+        screen = self.show_screen("selection", self.build_scenario_selection)
+
+        welcome_text = f"Selecciona un nivel ({self.player_name})"
+        self.type_text(screen.header_label, welcome_text, delay=35)
+
+        # precargar en segundo plano mientras el jugador elige
+        sounds = {p for paths in SCENE_SOUNDS.values() for p in paths}
+        sounds.update(p for scenario in self.scenarios.values() for p in scenario.sounds)
+        audio.preload(sorted(sounds))
+
+    def build_scenario_selection(self, screen):
+        f = screen.frame
 
         header_frame = tk.Frame(f, bg="#0b1220", height=90)
         header_frame.pack(fill="x")
         header_frame.pack_propagate(False)
 
-        header_label = tk.Label(header_frame, text="", font=self.h1, bg="#0b1220", fg="#e6eef6")
-        header_label.place(relx=0.5, rely=0.5, anchor="center")
-
-        welcome_text = f"Selecciona un nivel ({self.player_name})"
-        self.type_text(header_label, welcome_text, delay=35)
+        screen.header_label = tk.Label(header_frame, text="", font=self.h1, bg="#0b1220", fg="#e6eef6")
+        screen.header_label.place(relx=0.5, rely=0.5, anchor="center")
 
         cards_frame = tk.Frame(f, bg="#07101a")
         cards_frame.pack(fill="both", expand=True, pady=12, padx=20)
 
-        # Create 3 cards horizontally
+        # Create the cards horizontally
         card_width = 250
         padx = 20
 
@@ -255,23 +703,14 @@ class TheLastCodeApp:
             btn.pack(side="bottom", pady=12)
             return card
 
-        create_card(cards_frame,
-                    "Escenario 1: Habitación",
-                    "Fácil",
-                    "Escapa de una habitación con lluvia y truenos. Escribe tus acciones.",
-                    lambda: self.start_scenario("scenario1"))
-
-        create_card(cards_frame,
-                    "Escenario 2: Hospital",
-                    "Medio",
-                    "Estás en el 3er piso de un hospital de 12. Evita ser descubierto.",
-                    lambda: self.start_scenario("scenario2"))
-
-        create_card(cards_frame,
-                    "Escenario 3: Bosque",
-                    "Difícil",
-                    "Sobrevive al bosque con fauna salvaje y encuentra una cabaña.",
-                    lambda: self.start_scenario("scenario3"))
+        # one card per scenario file, horizontally
+        for scenario in self.scenarios.values():
+            card = scenario.card
+            create_card(cards_frame,
+                        card["title"],
+                        card["difficulty"],
+                        card["description"],
+                        lambda sid=scenario.id: self.start_scenario(sid))
 
     # ---------------------------
     # INICIO ESCENARIO
@@ -282,453 +721,219 @@ class TheLastCodeApp:
         self.state["player_name"] = self.player_name
         self.state["current_scene"] = self.current_scene
         self.state.setdefault("scene_data", {})
-        save_game(self.state)
-
-        # Routing
-        if scenario_id == "scenario1":
-            self.scene1(resume=resume)
-        elif scenario_id == "scenario2":
-            self.scene2(resume=resume)
-        elif scenario_id == "scenario3":
-            self.scene3(resume=resume)
-
-    # ---------------------------
-    # ESCENARIO 1: Habitación (Fácil)
-    # ---------------------------
-    def scene1(self, resume=False):
-        self.clear()
-        f = self.main_frame
-
-        # Ambient sound: rain+thunder (if present, you must provide your own sound files in same folder)
-        # try to play "rain.wav" looped and "thunder.wav" on events
-        if SOUND_AVAILABLE:
-            # Attempt to play rain.wav looped; if file missing, ignore
-            try:
-                rain = pygame.mixer.Sound("rain.wav")
-                rain.play(loops=-1)
-            except Exception:
-                pass
-
-        # initial description
-        desc_frame = tk.Frame(f, bg="#071018")
-        desc_frame.pack(fill="both", expand=True)
-
-        title = tk.Label(desc_frame, text="Escenario 1 - Habitación", font=self.h1, bg="#071018", fg="#e6eef6")
-        title.pack(pady=8)
-
-        text_area = tk.Text(desc_frame, height=14, wrap="word", font=("Segoe UI", 12), bg="#0b1b22", fg="#e6eef6")
-        text_area.pack(padx=20, pady=8, fill="both", expand=False)
+        self.save()
+        self.profiles.touch(self.player_name, current_scene=scenario_id)
 
-        input_frame = tk.Frame(desc_frame, bg="#071018")
-        input_frame.pack(pady=6)
-
-        cmd_var = tk.StringVar()
-        entry = tk.Entry(input_frame, textvariable=cmd_var, font=self.h2, width=60)
-        entry.pack(side="left", padx=8)
-        entry.focus_set()
-
-        submit_btn = tk.Button(input_frame, text="OK", command=lambda: process_command(cmd_var.get().strip().lower()))
-        submit_btn.pack(side="left")
-
-        # Game state
-        data = self.state.get("scene_data", {}).get("scenario1", {})
-        if not data:
-            data = {"found_key": False, "bed_checked": False, "curtains_open": False, "window_checked": False, "escaped": False}
-            self.state.setdefault("scene_data", {})["scenario1"] = data
-            save_game(self.state)
-
-        # helper to print and save
-        def write(text):
-            text_area.insert("end", text + "\n\n")
-            text_area.see("end")
-
-        # initial description (typed quickly)
-        intro = ("Despiertas en una habitación con ventanas empañadas. Afuera llueve y se escuchan truenos. "
-                 "Hay una cama, una mesa pequeña con un cajón, unas cortinas y una ventana con pestillo. "
-                 "¿Qué deseas hacer? (Escribe acciones como: checar debajo de la cama, mover cortinas, mirar por la ventana, abrir cajón)")
-        write(intro)
-
-        def process_command(cmd):
-            if not cmd:
-                return
-            write(f"> {cmd}")
-            # core logic
-            if "bajo" in cmd or "debajo" in cmd or "cama" in cmd:
-                if not data["bed_checked"]:
-                    write("Revisas debajo de la cama y encuentras una llave pequeña. (La llave podría servir).")
-                    data["found_key"] = True
-                    data["bed_checked"] = True
-                else:
-                    write("Ya revisaste debajo de la cama, solo hay polvo.")
-            elif "cortina" in cmd or "mover" in cmd:
-                if not data["curtains_open"]:
-                    write("Abres las cortinas. Afuera sólo ves una calle vacía y la lluvia; la ventana tiene un pestillo.")
-                    data["curtains_open"] = True
-                else:
-                    write("Las cortinas ya están abiertas.")
-            elif "ventana" in cmd or "mirar" in cmd:
-                write("Al mirar la ventana notas que el pestillo está oxidado pero se puede abrir desde dentro con una herramienta.")
-                data["window_checked"] = True
-            elif "cajón" in cmd or "abrir cajón" in cmd:
-                if data["found_key"]:
-                    write("Abres el cajón usando la llave. Dentro hay un destornillador. Puede servir para forzar el pestillo.")
-                    data["has_screwdriver"] = True
-                else:
-                    write("Intentas abrir el cajón pero está cerrado con un pequeño candado.")
-            elif "usar" in cmd or "forzar" in cmd or "destornillador" in cmd:
-                if data.get("has_screwdriver") or data.get("found_key"):
-                    write("Usas la herramienta para forzar el pestillo. La ventana cede y puedes salir por ella. ¡Has escapado!")
-                    data["escaped"] = True
-                    self.state["scene_data"]["scenario1"] = data
-                    save_game(self.state)
-                    self.win_screen()
-                    return
-                else:
-                    write("No tienes herramientas para forzar el pestillo.")
-            else:
-                write("No entiendo esa acción exactamente. Intenta acciones como: checar debajo de la cama, abrir cajón, mover cortinas, mirar por la ventana, usar destornillador.")
-            # save after every action
-            self.state["scene_data"]["scenario1"] = data
-            save_game(self.state)
+        # sonidos del escenario y de la pantalla final (si ya están en caché no hace nada)
+        audio.preload(self.scenarios[scenario_id].sounds)
+        audio.preload_scene("win")
 
-        # optional: allow Enter to submit
-        entry.bind("<Return>", lambda e: submit_btn.invoke())
+        # Routing
+        self.scene(scenario_id, resume=resume)
 
     # ---------------------------
-    # ESCENARIO 2: Hospital (Medio)
+    # ESCENARIO (vista compartida; reglas en scenarios/*.json)
     # ---------------------------
-    def scene2(self, resume=False):
-        self.clear()
-        f = self.main_frame
-
-        # Basic setup: player starts at floor 3
-        data = self.state.get("scene_data", {}).get("scenario2", {})
-        if not data:
-            # floors: 1..12; player starts at floor 3
-            # each floor has rooms, some occupied (if enter occupied -> defeat)
-            floors = {}
-            for i in range(1, 13):
-                # each floor has 4 rooms, some are occupied randomly
-                rooms = {}
-                for r in range(1, 5):
-                    occupied = random.random() < (0.18 + 0.02 * i)  # higher floors maybe more chance
-                    rooms[f"R{r}"] = {"occupied": occupied, "has_tool": random.random() < 0.25}
-                floors[str(i)] = rooms
-            data = {"floor": 3, "floors": floors, "has_key": False, "escaped": False}
-            self.state.setdefault("scene_data", {})["scenario2"] = data
-            save_game(self.state)
-
-        title = tk.Label(f, text="Escenario 2 - Hospital", font=self.h1, bg="#071018", fg="#e6eef6")
-        title.pack(pady=6)
-
-        text_area = tk.Text(f, height=14, wrap="word", font=("Segoe UI", 12), bg="#08121a", fg="#e6eef6")
-        text_area.pack(padx=20, pady=8, fill="both", expand=False)
+    def scene(self, scenario_id, resume=False):
+        scenario = self.scenarios[scenario_id]
+        screen = self.enter_scene_screen(scenario_id, scenario.title, **scenario.screen)
+
+        # Ambient sound (e.g. rain.wav looped); if file missing, ignore
+        if scenario.ambience:
+            audio.play_ambience(scenario.ambience)
+
+        # Game state: la partida vive en game_core (o en el servidor); aquí solo se dibuja
+        if self.remote is not None:
+            # el socket bloquea: la petición va al pool de hilos (ver remote_scene)
+            self.tasks.spawn(self.remote_scene(screen, scenario), scope=screen)
+            return
+        session = resume_session(self.state, scenario)
+        self.rng = session.rng
+        self.save()
+        self.start_recording(session)
+        self.play_session(screen, scenario, session)
 
-        input_frame = tk.Frame(f, bg="#071018")
-        input_frame.pack(pady=6)
+    async def remote_scene(self, screen, scenario):
+        try:
+            session = await self.tasks.to_thread(self.remote.start, scenario.id)
+        except (OSError, ServerError) as e:
+            messagebox.showerror("Servidor", f"No se pudo iniciar la partida: {e}")
+            self.show_welcome_screen()
+            return
+        self.play_session(screen, scenario, session)
 
-        cmd_var = tk.StringVar()
-        entry = tk.Entry(input_frame, textvariable=cmd_var, font=self.h2, width=60)
-        entry.pack(side="left", padx=8)
-        entry.focus_set()
-        submit_btn = tk.Button(input_frame, text="OK", command=lambda: process_command(cmd_var.get().strip().lower()))
-        submit_btn.pack(side="left")
+    def play_session(self, screen, scenario, session):
+        # autocompletado: el índice es del escenario; lo activo depende del estado
+        # (en modo remoto el estado no está aquí y se sugiere todo)
+        state = session.state if self.remote is None else None
+        screen.suggester = Suggester(index_for(scenario), state)
 
-        def write(text):
-            text_area.insert("end", text + "\n\n")
-            text_area.see("end")
+        # helper to print (transcripción acotada compartida)
+        write = screen.transcript.write
 
         # initial description
-        intro = (f"Estás en el pasillo del piso {data['floor']} de un hospital de 12 pisos. Hay puertas a las habitaciones etiquetadas R1..R4, "
-                 "un elevador y escaleras. Ten cuidado: si entras a una habitación que está ocupada, serás descubierto y perderás.")
-        write(intro)
+        write(session.intro())
 
         def process_command(cmd):
-            if not cmd:
+            if not cmd or screen.waiting:
                 return
+            t0 = time.perf_counter()
             write(f"> {cmd}")
-            floor = data["floor"]
-            floors = data["floors"]
-
-            if "ir a" in cmd or "subir" in cmd or "bajar" in cmd:
-                # change floor
-                if "subir" in cmd or "ir arriba" in cmd or "subir a" in cmd:
-                    if floor >= 12:
-                        write("Ya estás en el piso más alto.")
-                    else:
-                        floor += 1
-                        data["floor"] = floor
-                        write(f"Subes al piso {floor}.")
-                elif "bajar" in cmd or "ir abajo" in cmd or "bajar a" in cmd:
-                    if floor <= 1:
-                        write("Ya estás en el piso 1.")
-                    else:
-                        floor -= 1
-                        data["floor"] = floor
-                        write(f"Bajas al piso {floor}.")
-                else:
-                    write("Especifica subir o bajar.")
-            elif "elevador" in cmd:
-                # random chance elevator active
-                if random.random() < 0.6:
-                    dest = random.randint(1, 12)
-                    data["floor"] = dest
-                    write(f"El elevador funciona. Sales en el piso {dest}.")
-                else:
-                    write("El elevador está fuera de servicio en este momento.")
-            elif "entrar r" in cmd or "entrar a r" in cmd or "abrir r" in cmd:
-                # detect room code
-                found = None
-                for token in cmd.split():
-                    if token.upper().startswith("R") and token[1:].isdigit():
-                        found = token.upper()
-                        break
-                if not found:
-                    write("Indica la habitación (ej: entrar R2).")
-                else:
-                    room = floors[str(floor)].get(found)
-                    if not room:
-                        write("No existe esa habitación en este piso.")
-                    else:
-                        if room["occupied"]:
-                            # defeat
-                            write(f"Entras a {found} y hay alguien dentro. Te han descubierto.")
-                            self.state["scene_data"]["scenario2"] = data
-                            save_game(self.state)
-                            self.lose_screen(reason="descubierto")
-                            return
-                        else:
-                            write(f"Entras a {found}. La habitación está vacía.")
-                            if room.get("has_tool"):
-                                # collect tool
-                                write("Encuentras una herramienta (destornillador/manija). Podría servir para abrir puertas cerradas.")
-                                data["has_key"] = True
-                                room["has_tool"] = False
-            elif "buscar" in cmd or "revisar" in cmd or "inspeccionar" in cmd:
-                write("Revisas el pasillo: hay puertas, una salida de emergencia en el piso 1 y un acceso a urgencias en la planta baja.")
-            elif "salir" in cmd or "urgencias" in cmd or "salida" in cmd:
-                # if on floor 1 or 0, can escape to urgencias
-                if data["floor"] <= 1:
-                    write("Encuentras la salida de urgencias. ¡Has salido del hospital!")
-                    data["escaped"] = True
-                    self.state["scene_data"]["scenario2"] = data
-                    save_game(self.state)
-                    self.win_screen()
-                    return
-                else:
-                    write("La entrada de urgencias está en la planta baja. Debes descender primero.")
-            else:
-                write("Acciones posibles: subir, bajar, elevador, entrar R1..R4, buscar, salir/urgencias.")
-            # save
-            self.state["scene_data"]["scenario2"] = data
-            save_game(self.state)
-
-        entry.bind("<Return>", lambda e: submit_btn.invoke())
-
-    # ---------------------------
-    # ESCENARIO 3: Bosque (Difícil)
-    # ---------------------------
-    def scene3(self, resume=False):
-        self.clear()
-        f = self.main_frame
-
-        data = self.state.get("scene_data", {}).get("scenario3", {})
-        if not data:
-            data = {"pos": 0, "has_light": False, "water_bottles": 0, "escaped": False}
-            self.state.setdefault("scene_data", {})["scenario3"] = data
-            save_game(self.state)
-
-        title = tk.Label(f, text="Escenario 3 - Bosque", font=self.h1, bg="#071018", fg="#e6eef6")
-        title.pack(pady=6)
-
-        text_area = tk.Text(f, height=14, wrap="word", font=("Segoe UI", 12), bg="#07101a", fg="#e6eef6")
-        text_area.pack(padx=20, pady=8, fill="both", expand=False)
-
-        input_frame = tk.Frame(f, bg="#071018")
-        input_frame.pack(pady=6)
-
-        cmd_var = tk.StringVar()
-        entry = tk.Entry(input_frame, textvariable=cmd_var, font=self.h2, width=60)
-        entry.pack(side="left", padx=8)
-        entry.focus_set()
-        submit_btn = tk.Button(input_frame, text="OK", command=lambda: process_command(cmd_var.get().strip().lower()))
-        submit_btn.pack(side="left")
-
-        def write(text):
-            text_area.insert("end", text + "\n\n")
-            text_area.see("end")
-
-        intro = ("Te adentras en un bosque al anochecer. Hay senderos, señales viejas, una linterna tirada cerca, y sonidos de animales. "
-                 "Debes encontrar una cabaña para refugiarte. Ten cuidado: algunos animales son agresivos.")
-        write(intro)
-
-        def random_encounter():
-            # 15% chance of encountering wild animal on move
-            if random.random() < 0.15:
-                animal = random.choice(["lobo", "serpiente", "oso"])
-                write(f"¡Encuentras un {animal}! Es peligroso.")
-                # player can try to huir or usar objeto
-                return animal
-            return None
+            if self.remote is not None:
+                # un comando a la vez; la respuesta llega por el bucle de Tk
+                screen.waiting = True
+                self.tasks.spawn(send_remote(cmd, t0), scope=screen)
+                return
+            show_step(session.send(cmd), t0)
 
-        def process_command(cmd):
-            if not cmd:
+        async def send_remote(cmd, t0):
+            try:
+                step = await self.tasks.to_thread(session.send, cmd)
+            except (OSError, ServerError) as e:
+                write(f"(sin conexión con el servidor: {e})")
                 return
-            write(f"> {cmd}")
-            if "tomar linterna" in cmd or "linterna" in cmd:
-                if not data.get("has_light"):
-                    write("Recoges la linterna. Puede ayudarte por la noche.")
-                    data["has_light"] = True
-                else:
-                    write("Ya tienes la linterna.")
-            elif "avanzar" in cmd or "seguir" in cmd or "ir" in cmd:
-                # move forward
-                # chance of water bottle, rope, or encounter
-                data["pos"] += 1
-                write("Caminas por el sendero...")
-                # random find
-                rr = random.random()
-                if rr < 0.12:
-                    write("Encuentras una botella de agua.")
-                    data["water_bottles"] = data.get("water_bottles", 0) + 1
-                elif rr < 0.18:
-                    write("Encuentras una cuerda que podría servir.")
-                    data["rope"] = True
-                # encounter
-                animal = random_encounter()
-                if animal:
-                    # simple resolution: if bear or wolf, need to huir or use rope/linterna
-                    if animal == "serpiente":
-                        # chance to avoid: if you have stick/rope, safe
-                        if data.get("rope") or data.get("has_light"):
-                            write("Logras espantar a la serpiente y sigues.")
-                        else:
-                            write("La serpiente te muerde. Pierdes consciencia.")
-                            self.state["scene_data"]["scenario3"] = data
-                            save_game(self.state)
-                            self.lose_screen(reason="atacado")
-                            return
-                    else:
-                        # wolf or oso
-                        if data.get("has_light") and random.random() < 0.7:
-                            write("Usas la linterna para asustar al animal y escapas.")
-                        elif data.get("rope") and random.random() < 0.5:
-                            write("Usas la cuerda para distraer y escapas.")
-                        else:
-                            write(f"El {animal} te ataca.")
-                            self.state["scene_data"]["scenario3"] = data
-                            save_game(self.state)
-                            self.lose_screen(reason="atacado")
-                            return
-                # maybe find cabin
-                if data["pos"] >= 5 and random.random() < 0.35:
-                    write("Ves una cabaña entre los árboles. Has encontrado refugio. ¡Has sobrevivido!")
-                    data["escaped"] = True
-                    self.state["scene_data"]["scenario3"] = data
-                    save_game(self.state)
-                    self.win_screen()
-                    return
-            elif "buscar" in cmd or "inspeccionar" in cmd:
-                write("Exploras alrededor: hay senderos, señales viejas y zonas con animales. Mantén la calma.")
-            elif "usar cuerda" in cmd or "usar cuerda" in cmd:
-                if data.get("rope"):
-                    write("Usas la cuerda para cruzar un precipicio o distraer animales si es necesario.")
-                else:
-                    write("No tienes cuerda.")
-            elif "beber" in cmd or "agua" in cmd:
-                if data.get("water_bottles", 0) > 0:
-                    data["water_bottles"] -= 1
-                    write("Bebes agua y recuperas energías.")
-                else:
-                    write("No tienes agua.")
-            else:
-                write("Intenta acciones como: tomar linterna, avanzar, buscar, usar cuerda, beber.")
-            # save
-            self.state["scene_data"]["scenario3"] = data
-            save_game(self.state)
+            finally:
+                screen.waiting = False
+            show_step(step, t0)
+
+        def show_step(step, t0):
+            for line in step.lines:
+                write(line)
+            metrics.record("command", (time.perf_counter() - t0) * 1000)
+            metrics.count(f"command.{session.intent or 'unknown'}")
+            if self.remote is None:
+                store_progress(self.state, session)
+                if session.finished:
+                    # se encola; el hilo de run_stats lo escribe con el siguiente lote
+                    self.stats.record(run_record(self.player_name, session))
+                if screen.suggester.update(session.state):
+                    screen.refresh_suggestions()
+            if step.outcome == "win":
+                self.save_now()
+                self.win_screen()
+                return
+            if step.outcome == "lose":
+                self.save_now()
+                self.lose_screen(reason=step.reason)
+                return
+            # save after every action (en segundo plano)
+            self.save()
 
-        entry.bind("<Return>", lambda e: submit_btn.invoke())
+        screen.on_command = process_command
 
     # ---------------------------
     # PANTALLA: Éxito
     # ---------------------------
     def win_screen(self):
-        self.clear()
-        f = self.main_frame
+        screen = self.show_screen("win", self.build_win_screen)
 
         # play success bells
-        if SOUND_AVAILABLE:
-            try:
-                bell = pygame.mixer.Sound("bells.wav")
-                bell.play()
-            except Exception:
-                pass
+        play_sound("bells.wav")
 
-        frame = tk.Frame(f, bg="#072016")
-        frame.pack(fill="both", expand=True)
+        screen.msg.config(text=f"Felicidades {self.player_name} por completar el nivel")
 
-        msg = tk.Label(frame, text=f"Felicidades {self.player_name} por completar el nivel", font=self.h1, bg="#072016", fg="#dff6e3")
-        msg.pack(expand=True)
+        # After 5 seconds, go to welcome screen (temporizador de la pantalla:
+        # se cancela si se sale antes)
+        self.scheduler.after(5000, self.win_done)
 
-        # After 5 seconds, go to welcome screen
-        def go_back():
-            # reset current scene
-            self.state["current_scene"] = None
-            self.state["scene_data"] = {}
-            save_game(self.state)
-            self.show_welcome_screen()
+    def win_done(self):
+        # reset current scene
+        end_run(self.state)
+        self.save_now()
+        self.show_welcome_screen()
 
-        # run after 5s (5000 ms)
-        self.root.after(5000, go_back)
+    def build_win_screen(self, screen):
+        frame = tk.Frame(screen.frame, bg="#072016")
+        frame.pack(fill="both", expand=True)
+
+        screen.msg = tk.Label(frame, text="", font=self.h1, bg="#072016", fg="#dff6e3")
+        screen.msg.pack(expand=True)
 
     # ---------------------------
     # PANTALLA: Derrota
     # ---------------------------
     def lose_screen(self, reason="descubierto"):
-        self.clear()
-        f = self.main_frame
+        screen = self.show_screen("lose", self.build_lose_screen)
 
         # stop ambient music if any
         stop_music()
 
-        frame = tk.Frame(f, bg="#19080a")
-        frame.pack(fill="both", expand=True)
-
-        # Glitch animation: flash text a few times
-        label1 = tk.Label(frame, text="El juego está fallando...", font=self.h2, bg="#19080a", fg="#fca5a5")
-        label1.pack(pady=30)
-        final_label = tk.Label(frame, text="", font=self.h1, bg="#19080a", fg="#ffeeee")
-        final_label.pack(pady=20)
+        final_label = screen.final_label
+        final_label.config(text="", fg="#ffeeee")
+        screen.sub.pack_forget()
+        screen.btn.pack_forget()
 
         def glitch_cycle(i=0):
             if i < 6:
-                final_label.config(text="¡¡ ERROR !!", fg=random.choice(["#ff4d4d", "#ffeeee", "#ffbcbc"]))
-                self.root.after(200, glitch_cycle, i+1)
+                final_label.config(text="¡¡ ERROR !!", fg=self.rng.stream("ui").choice(["#ff4d4d", "#ffeeee", "#ffbcbc"]))
+                self.scheduler.after(200, glitch_cycle, i+1)
             else:
                 # final game over message
                 if reason == "descubierto":
                     final_label.config(text="Has sido descubierto", fg="#ffffff")
                 else:
                     final_label.config(text="Has sido atacado", fg="#ffffff")
-                sub = tk.Label(frame, text="Game Over", font=self.h1, bg="#19080a", fg="#f87171")
-                sub.pack(pady=8)
+                screen.sub.pack(pady=8)
                 # option to return to start
-                btn = tk.Button(frame, text="Volver al inicio", command=self.reset_to_start)
-                btn.pack(pady=12)
+                screen.btn.pack(pady=12)
 
         glitch_cycle()
 
+    def build_lose_screen(self, screen):
+        frame = tk.Frame(screen.frame, bg="#19080a")
+        frame.pack(fill="both", expand=True)
+
+        # Glitch animation: flash text a few times
+        label1 = tk.Label(frame, text="El juego está fallando...", font=self.h2, bg="#19080a", fg="#fca5a5")
+        label1.pack(pady=30)
+        screen.final_label = tk.Label(frame, text="", font=self.h1, bg="#19080a", fg="#ffeeee")
+        screen.final_label.pack(pady=20)
+        # se muestran al terminar el glitch
+        screen.sub = tk.Label(frame, text="Game Over", font=self.h1, bg="#19080a", fg="#f87171")
+        screen.btn = tk.Button(frame, text="Volver al inicio", command=self.reset_to_start)
+
     def reset_to_start(self):
         # clear saved current scene and data
-        self.state["current_scene"] = None
-        self.state["scene_data"] = {}
-        save_game(self.state)
+        end_run(self.state)
+        self.save_now()
         self.show_welcome_screen()
 
 # ---------------------------
 # Ejecutar app
 # ---------------------------
+def startup_report(max_ms=None):
+    # mide import -> primer frame pintado. Sin pantalla: xvfb-run python "proyecto metodologias.py" --startup-report
+    root = tk.Tk()
+    t_tk = time.perf_counter()
+    TheLastCodeApp(root)
+    root.update()
+    t_frame = time.perf_counter()
+    audio.wait_ready(5)
+    report = {
+        "import_ms": round((_T_IMPORTED - _T_START) * 1000, 2),
+        "tk_root_ms": round((t_tk - _T_IMPORTED) * 1000, 2),
+        "first_frame_ms": round((t_frame - _T_START) * 1000, 2),
+        "audio_init_ms": None if audio.init_seconds is None else round(audio.init_seconds * 1000, 2),
+        "audio_enabled": audio.enabled,
+    }
+    root.destroy()
+    print(json.dumps(report))
+    if max_ms is not None and report["first_frame_ms"] > max_ms:
+        print(f"Arranque lento: {report['first_frame_ms']} ms > {max_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="The Last Code")
+    parser.add_argument("--startup-report", action="store_true", help="mide el arranque, imprime JSON y sale")
+    parser.add_argument("--max-startup-ms", type=float, default=None, help="falla si el primer frame tarda más")
+    parser.add_argument("--record", metavar="DIR", default=None, help="graba cada partida en DIR (ver replay.py)")
+    parser.add_argument("--metrics-out", metavar="FILE", default=None, help="exporta métricas al salir (.json o .csv)")
+    parser.add_argument("--server", metavar="HOST:PUERTO", default=None, help="juega contra server.py (kiosco)")
+    args = parser.parse_args()
+    if args.startup_report:
+        sys.exit(startup_report(args.max_startup_ms))
     root = tk.Tk()
-    app = TheLastCodeApp(root)
+    app = TheLastCodeApp(root, record_dir=args.record, metrics_out=args.metrics_out, server=args.server)
     root.mainloop()
\ No newline at end of file
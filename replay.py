@@ -0,0 +1,124 @@
+# replay.py
+# Grabar y reproducir partidas. La grabación es un JSONL: la primera línea tiene
+# el escenario, la semilla/contadores del SessionRng y el estado inicial; después
+# una línea por comando con los números sorteados, el texto y el desenlace.
+# El reproductor vuelve a jugar sin interfaz y compara todo: sirve como prueba
+# de regresión (reglas, parser, RNG) y como benchmark.
+#
+#   python replay.py grabacion.jsonl
+#   python replay.py grabaciones/*.jsonl --repeat 200 --json
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+from game_core import GameSession, scenarios
+from rng_streams import SessionRng
+from state_model import as_dict
+
+
+class Recorder:
+    def __init__(self, path, session):
+        if not isinstance(session.rng, SessionRng):
+            raise ValueError("Solo se pueden grabar partidas con SessionRng")
+        self.path = path
+        self.session = session
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({
+            "scenario": session.scenario.id,
+            "rng": session.rng.to_dict(),
+            "state": as_dict(session.state),
+        })
+        session.rng.start_log()
+        session.recorder = self
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record(self, cmd, step):
+        self._write({
+            "cmd": cmd,
+            "draws": self.session.rng.take_log(),
+            "lines": step.lines,
+            "outcome": step.outcome,
+            "reason": step.reason,
+        })
+
+    def close(self):
+        self.session.recorder = None
+        self._file.close()
+
+
+def load_recording(path):
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        raise ValueError(f"Grabación vacía: {path}")
+    return entries[0], entries[1:]
+
+
+def replay(header, commands, check=True):
+    # reproduce una grabación; devuelve (sesión, lista de diferencias)
+    rng = SessionRng.from_dict(header["rng"])
+    session = GameSession(scenarios()[header["scenario"]], copy.deepcopy(header["state"]), rng)
+    if check:
+        rng.start_log()
+    problems = []
+    for n, entry in enumerate(commands, 1):
+        step = session.send(entry["cmd"])
+        if not check:
+            continue
+        draws = rng.take_log()
+        for field, got in (("draws", draws), ("lines", step.lines), ("outcome", step.outcome)):
+            if got != entry[field]:
+                problems.append(f"comando {n} {entry['cmd']!r}: {field} {got!r} != {entry[field]!r}")
+        if problems:
+            break   # a partir de aquí todo difiere
+    return session, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproduce partidas grabadas sin interfaz")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--repeat", type=int, default=1, help="repeticiones para medir rendimiento")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    reports, failed = [], 0
+    for path in args.recordings:
+        header, commands = load_recording(path)
+        session, problems = replay(header, commands)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            replay(header, commands, check=False)
+        elapsed = time.perf_counter() - t0
+        failed += bool(problems)
+        reports.append({
+            "recording": path,
+            "scenario": header["scenario"],
+            "commands": len(commands),
+            "outcome": session.outcome,
+            "ok": not problems,
+            "problems": problems,
+            "replays_per_s": round(args.repeat / elapsed) if elapsed else None,
+            "commands_per_s": round(args.repeat * len(commands) / elapsed) if elapsed else None,
+        })
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+    else:
+        for r in reports:
+            status = "OK" if r["ok"] else "DIFERENTE"
+            print(f"{status} {r['recording']} ({r['scenario']}, {r['commands']} comandos, {r['outcome']}) "
+                  f"{r['replays_per_s']} repeticiones/s")
+            for p in r["problems"]:
+                print(f"   {p}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
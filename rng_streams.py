@@ -0,0 +1,71 @@
+# rng_streams.py
+# Aleatoriedad reproducible por partida: una semilla y un flujo independiente por
+# subsistema (generación del mapa, cada comando, encuentros, interfaz...). Cada
+# flujo solo cuenta cuántos números ha sacado, así que el estado que va al
+# guardado es diminuto: {"seed": ..., "draws": {"setup": 48, "elevator": 3}}.
+import random
+
+
+class Stream:
+    # cada sorteo consume exactamente un random(), por eso basta con contar
+    # para reconstruir el flujo (randint/choice no usan getrandbits)
+    __slots__ = ("name", "draws", "log", "_rng")
+
+    def __init__(self, seed, name, draws=0):
+        self.name = name
+        self._rng = random.Random(f"{seed}:{name}")
+        for _ in range(draws):
+            self._rng.random()
+        self.draws = draws
+        self.log = None
+
+    def random(self):
+        value = self._rng.random()
+        self.draws += 1
+        if self.log is not None:
+            self.log.append([self.name, value])
+        return value
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+
+class SessionRng:
+    def __init__(self, seed=None, draws=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.streams = {}
+        self._draws = dict(draws or {})
+        self.log = None   # lista de [flujo, valor] mientras se graba
+
+    def stream(self, name):
+        s = self.streams.get(name)
+        if s is None:
+            s = self.streams[name] = Stream(self.seed, name, self._draws.pop(name, 0))
+        s.log = self.log
+        return s
+
+    def start_log(self):
+        self.log = []
+        for s in self.streams.values():
+            s.log = self.log
+
+    def take_log(self):
+        # devuelve lo sorteado desde la última llamada y empieza una lista nueva
+        log = self.log or []
+        if self.log is not None:
+            self.start_log()
+        return log
+
+    def to_dict(self):
+        draws = dict(self._draws)
+        draws.update((name, s.draws) for name, s in self.streams.items() if s.draws)
+        return {"seed": self.seed, "draws": draws}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["seed"], data.get("draws"))
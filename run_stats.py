@@ -0,0 +1,208 @@
+# run_stats.py
+# Historial de partidas terminadas en SQLite (saves/stats.db): jugador, escenario,
+# semilla, turnos, desenlace, duración y causa de la derrota. record() solo
+# encola; un hilo propio escribe por lotes, una transacción por lote, así que
+# ganar o perder no toca el disco desde el hilo de Tk.
+#
+# "best" guarda la mejor victoria de cada jugador por escenario (menos turnos y
+# luego menos tiempo) y se actualiza en el mismo lote. Las consultas van por
+# páginas con cursor (WHERE (turns, duration_ms, player) > el último visto) sobre
+# índices: la página 5000 cuesta lo mismo que la primera, sin OFFSET.
+#
+#   python run_stats.py --db saves/stats.db --scenario scenario2
+#   python run_stats.py --db saves/stats.db --player Ana
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+
+from instrumentation import metrics
+
+STATS_FILE = "stats.db"
+PAGE_SIZE = 15
+BATCH_MAX = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    seed INTEGER,
+    turns INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    reason TEXT,
+    duration_ms INTEGER NOT NULL,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_player ON runs (player, id);
+CREATE INDEX IF NOT EXISTS runs_by_outcome ON runs (scenario, outcome, reason);
+CREATE TABLE IF NOT EXISTS best (
+    scenario TEXT NOT NULL,
+    player TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    turns INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    PRIMARY KEY (scenario, player)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS best_rank ON best (scenario, turns, duration_ms, player);
+"""
+
+_INSERT = ("INSERT INTO runs (player, scenario, seed, turns, outcome, reason, duration_ms, finished) "
+           "VALUES (:player, :scenario, :seed, :turns, :outcome, :reason, :duration_ms, :finished)")
+_BEST = ("INSERT INTO best (scenario, player, run_id, turns, duration_ms) VALUES (?, ?, ?, ?, ?) "
+         "ON CONFLICT (scenario, player) DO UPDATE SET "
+         "run_id = excluded.run_id, turns = excluded.turns, duration_ms = excluded.duration_ms "
+         "WHERE (excluded.turns, excluded.duration_ms) < (best.turns, best.duration_ms)")
+
+
+def run_record(player, session):
+    # fila de runs para una partida terminada (game_core.GameSession)
+    return {
+        "player": player,
+        "scenario": session.scenario.id,
+        "seed": getattr(session.rng, "seed", None),
+        "turns": session.turns,
+        "outcome": session.outcome,
+        "reason": session.reason,
+        "duration_ms": round(session.duration() * 1000),
+        "finished": round(time.time(), 3),
+    }
+
+
+class RunStats:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # el esquema se crea aquí para que las lecturas funcionen desde el principio
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")   # lecturas mientras el hilo escribe
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._local = threading.local()   # una conexión de lectura por hilo
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="stats-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- escritura (cualquier hilo) ---
+    def record(self, run):
+        with self._cond:
+            if self._closed:
+                return
+            self._queue.append(run)
+            self._pending += 1
+            self._cond.notify()
+
+    def flush(self, timeout=5):
+        # espera a que el hilo escriba todo lo encolado
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+    def _worker(self):
+        conn = self._connect()
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._queue or self._closed)
+                    if not self._queue:
+                        return
+                    batch = [self._queue.popleft() for _ in range(min(len(self._queue), BATCH_MAX))]
+                try:
+                    with metrics.timed("stats.batch"):
+                        self._write(conn, batch)
+                    metrics.count("stats.runs", len(batch))
+                except sqlite3.Error:
+                    metrics.count("stats.errors")
+                with self._cond:
+                    self._pending -= len(batch)
+                    self._cond.notify_all()
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        with conn:   # una transacción por lote
+            for run in batch:
+                run_id = conn.execute(_INSERT, run).lastrowid
+                if run["outcome"] == "win":
+                    conn.execute(_BEST, (run["scenario"], run["player"], run_id, run["turns"], run["duration_ms"]))
+
+    # --- lectura (por páginas) ---
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def leaderboard(self, scenario, after=None, limit=PAGE_SIZE):
+        # mejores victorias por jugador; after = la última fila vista (player, turns, duration_ms)
+        if after is None:
+            rows = self._reader().execute(
+                "SELECT player, turns, duration_ms FROM best WHERE scenario = ? "
+                "ORDER BY turns, duration_ms, player LIMIT ?", (scenario, limit))
+        else:
+            rows = self._reader().execute(
+                "SELECT player, turns, duration_ms FROM best WHERE scenario = ? "
+                "AND (turns, duration_ms, player) > (?, ?, ?) "
+                "ORDER BY turns, duration_ms, player LIMIT ?", (scenario, after[1], after[2], after[0], limit))
+        return rows.fetchall()
+
+    def history(self, player, before=None, limit=PAGE_SIZE):
+        # partidas del jugador, la más reciente primero; before = id de la última fila vista
+        columns = "SELECT id, scenario, seed, turns, outcome, reason, duration_ms, finished FROM runs "
+        if before is None:
+            rows = self._reader().execute(columns + "WHERE player = ? ORDER BY id DESC LIMIT ?", (player, limit))
+        else:
+            rows = self._reader().execute(columns + "WHERE player = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                                          (player, before, limit))
+        return rows.fetchall()
+
+    def totals(self, scenario):
+        # {(desenlace, motivo): partidas} desde el índice, sin leer la tabla
+        rows = self._reader().execute(
+            "SELECT outcome, reason, COUNT(*) FROM runs WHERE scenario = ? GROUP BY outcome, reason", (scenario,))
+        return {(outcome, reason): n for outcome, reason, n in rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta el historial de partidas")
+    parser.add_argument("--db", default=os.path.join("saves", STATS_FILE))
+    parser.add_argument("--scenario", help="clasificación del escenario")
+    parser.add_argument("--player", help="historial del jugador")
+    parser.add_argument("--limit", type=int, default=PAGE_SIZE)
+    args = parser.parse_args(argv)
+    stats = RunStats(args.db)
+    try:
+        if args.scenario:
+            for n, (player, turns, ms) in enumerate(stats.leaderboard(args.scenario, limit=args.limit), 1):
+                print(f"{n:>4}. {player:<20} {turns:>4} turnos  {ms / 1000:>8.1f} s")
+            for (outcome, reason), count in sorted(stats.totals(args.scenario).items(), key=str):
+                print(f"      {outcome} {reason or ''}: {count}")
+        if args.player:
+            for run_id, scenario, seed, turns, outcome, reason, ms, finished in stats.history(args.player, limit=args.limit):
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(finished))
+                print(f"{when}  {scenario:<10} {outcome:<4} {reason or '':<12} {turns:>4} turnos  {ms / 1000:>8.1f} s")
+    finally:
+        stats.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
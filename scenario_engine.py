@@ -0,0 +1,460 @@
+# scenario_engine.py
+import ast
+import importlib
+import json
+import os
+import random
+import string
+from collections import namedtuple
+
+from command_parser import SCENARIOS_DIR, CommandParser
+from state_model import StateView, compile_model
+
+# resultado de un comando: líneas a mostrar y desenlace (None / "win" / "lose")
+Result = namedtuple("Result", "lines outcome reason intent")
+
+
+class ScenarioError(Exception):
+    pass
+
+
+# ---------------------------
+# Expresiones de los archivos de escenario
+# ---------------------------
+# Subconjunto de Python compilado a closures al cargar: nombres (variables locales
+# o del estado), constantes, and/or/not, comparaciones, + - * /, x.y y x[y] sobre
+# dicts (o el estado tipado de state_model), y las funciones de FUNCTIONS. Nada
+# más se acepta. Con el modelo del escenario, los nombres del estado se enlazan
+# a su bit o slot (model.readers / model.writers) en vez de pasar por get().
+def _lookup(container, key):
+    if isinstance(container, (dict, StateView)):
+        return container.get(key if isinstance(key, str) else str(key))
+    return None
+
+
+FUNCTIONS = {
+    "chance": lambda env, p: env.rng.random() < p,
+    "random": lambda env: env.rng.random(),
+    "randint": lambda env, a, b: env.rng.randint(a, b),
+    "choice": lambda env, *items: env.rng.choice(list(items)),
+    "str": lambda env, v: str(v),
+    "int": lambda env, v: int(v),
+    "min": lambda env, *v: min(v),
+    "max": lambda env, *v: max(v),
+}
+
+_BINOPS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.Mod: lambda a, b: a % b,
+}
+
+_CMPOPS = {
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+def compile_expr(src, model=None):
+    try:
+        tree = ast.parse(src, mode="eval")
+    except SyntaxError as e:
+        raise ScenarioError(f"Expresión inválida {src!r}: {e}") from None
+    return _compile_node(tree.body, src, model)
+
+
+def _compile_node(node, src, model=None):
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda env: value
+    if isinstance(node, ast.Name):
+        return _compile_name(node.id, model)
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v, src, model) for v in node.values]
+        if isinstance(node.op, ast.And):
+            def run_and(env):
+                value = True
+                for part in parts:
+                    value = part(env)
+                    if not value:
+                        return value
+                return value
+            return run_and
+
+        def run_or(env):
+            value = False
+            for part in parts:
+                value = part(env)
+                if value:
+                    return value
+            return value
+        return run_or
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand, src, model)
+        if isinstance(node.op, ast.Not):
+            return lambda env: not operand(env)
+        if isinstance(node.op, ast.USub):
+            return lambda env: -operand(env)
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+        op = _BINOPS[type(node.op)]
+        left, right = _compile_node(node.left, src, model), _compile_node(node.right, src, model)
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.Compare) and all(type(o) in _CMPOPS for o in node.ops):
+        first = _compile_node(node.left, src, model)
+        rest = [(_CMPOPS[type(o)], _compile_node(c, src, model)) for o, c in zip(node.ops, node.comparators)]
+
+        def run_cmp(env):
+            left = first(env)
+            for op, comp in rest:
+                right = comp(env)
+                if not op(left, right):
+                    return False
+                left = right
+            return True
+        return run_cmp
+    if isinstance(node, ast.Attribute):
+        base, attr = _compile_node(node.value, src, model), node.attr
+        return lambda env: _lookup(base(env), attr)
+    if isinstance(node, ast.Subscript):
+        base, key = _compile_node(node.value, src, model), _compile_node(node.slice, src, model)
+        return lambda env: _lookup(base(env), key(env))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+        fn = FUNCTIONS[node.func.id]
+        args = [_compile_node(a, src, model) for a in node.args]
+        return lambda env: fn(env, *[a(env) for a in args])
+    raise ScenarioError(f"Expresión no permitida en {src!r}: {ast.dump(node)[:60]}")
+
+
+def _compile_name(name, model):
+    # variable local o del estado; si el estado es de la clase del modelo se lee
+    # el bit o el slot directamente (un estado que no encajó sigue siendo dict)
+    read = model.readers.get(name) if model is not None else None
+    if read is None:
+        return lambda env: env.get(name)
+    cls = model.cls
+
+    def read_state(env):
+        local = env.vars
+        if name in local:
+            return local[name]
+        state = env.state
+        if state.__class__ is cls:
+            return read(state)
+        return state.get(name)
+    return read_state
+
+
+def compile_target(src, model=None):
+    # destino de set/calc: nombre del estado, o x.y / x[y] sobre un dict
+    try:
+        node = ast.parse(src, mode="eval").body
+    except SyntaxError as e:
+        raise ScenarioError(f"Destino inválido {src!r}: {e}") from None
+    if isinstance(node, ast.Name):
+        name = node.id
+        write = model.writers.get(name) if model is not None else None
+        if write is None:
+            return lambda env, value: env.state.__setitem__(name, value)
+        cls = model.cls
+
+        def write_state(env, value):
+            state = env.state
+            if state.__class__ is cls:
+                write(state, value)
+            else:
+                state[name] = value
+        return write_state
+    if isinstance(node, ast.Attribute):
+        base, key = _compile_node(node.value, src, model), node.attr
+        return lambda env, value: _assign(base(env), key, value)
+    if isinstance(node, ast.Subscript):
+        base, key = _compile_node(node.value, src, model), _compile_node(node.slice, src, model)
+        return lambda env, value: _assign(base(env), str(key(env)), value)
+    raise ScenarioError(f"Destino no permitido: {src!r}")
+
+
+# solvers disponibles para "hint" y "accept" (módulo con hint(state) y classify(state))
+SOLVERS = {"hospital": "hospital"}
+
+
+def solver(name):
+    if name not in SOLVERS:
+        raise ScenarioError(f"Solver desconocido: {name!r}")
+    return importlib.import_module(SOLVERS[name])
+
+
+# mundos procedurales para "world" (módulo con OPS: nombre -> función(env))
+WORLDS = {"forest": "forest"}
+
+
+def world(name):
+    if name not in WORLDS:
+        raise ScenarioError(f"Mundo desconocido: {name!r}")
+    return importlib.import_module(WORLDS[name])
+
+
+def _assign(container, key, value):
+    if isinstance(container, (dict, StateView)):
+        container[key] = value
+
+
+class _Env:
+    # variables locales (slots del parser, let) y luego el estado del escenario;
+    # source es el SessionRng de la partida (None con un random.Random simple)
+    __slots__ = ("state", "vars", "rng", "source", "lines")
+
+    def __init__(self, state, rng, vars_=None, source=None):
+        self.state = state
+        self.vars = vars_ or {}
+        self.rng = rng
+        self.source = source
+        self.lines = []
+
+    def get(self, name):
+        if name in self.vars:
+            return self.vars[name]
+        return self.state.get(name)
+
+
+def expr_env(values, rng=None):
+    # entorno para evaluar lo que devuelve compile_expr fuera de una partida
+    # (p.ej. hospital.py); values es el dict de variables y se lee en vivo
+    return _Env(values, rng)
+
+
+class _FormatEnv(dict):
+    def __init__(self, env):
+        super().__init__()
+        self.env = env
+
+    def __missing__(self, key):
+        return self.env.get(key)
+
+
+# ---------------------------
+# Acciones
+# ---------------------------
+# Cada acción compilada recibe el entorno y devuelve el desenlace ("win"/"lose", motivo)
+# o None para seguir con la siguiente.
+def compile_actions(actions, model=None):
+    if not isinstance(actions, list):
+        raise ScenarioError(f"Se esperaba una lista de acciones: {actions!r}")
+    compiled = [_compile_action(a, model) for a in actions]
+
+    def run(env):
+        for action in compiled:
+            end = action(env)
+            if end is not None:
+                return end
+        return None
+    return run
+
+
+def _compile_action(action, model=None):
+    if not isinstance(action, dict) or len(action) != 1:
+        raise ScenarioError(f"Acción inválida: {action!r}")
+    (kind, arg), = action.items()
+    if kind == "say":
+        fields = {f for _, f, _, _ in string.Formatter().parse(arg) if f}
+        if not fields:
+            return lambda env: env.lines.append(arg)
+
+        def say(env):
+            env.lines.append(arg.format_map(_FormatEnv(env)))
+        return say
+    if kind == "set":
+        items = [(compile_target(t, model), v) for t, v in arg.items()]
+
+        def set_(env):
+            for target, value in items:
+                target(env, value)
+        return set_
+    if kind == "calc":
+        items = [(compile_target(t, model), compile_expr(e, model)) for t, e in arg.items()]
+
+        def calc(env):
+            for target, expr in items:
+                target(env, expr(env))
+        return calc
+    if kind == "let":
+        items = [(name, compile_expr(e, model)) for name, e in arg.items()]
+
+        def let(env):
+            for name, expr in items:
+                env.vars[name] = expr(env)
+        return let
+    if kind == "cases":
+        cases = []
+        for case in arg:
+            cond = compile_expr(case["if"], model) if "if" in case else None
+            cases.append((cond, compile_actions(case.get("do", []), model)))
+
+        def run_cases(env):
+            for cond, body in cases:
+                if cond is None or cond(env):
+                    return body(env)
+            return None
+        return run_cases
+    if kind == "win":
+        return lambda env: ("win", None)
+    if kind == "lose":
+        return lambda env: ("lose", arg)
+    if kind == "grid":
+        return _compile_grid(arg, model)
+    if kind == "hint":
+        if arg not in SOLVERS:
+            raise ScenarioError(f"Solver desconocido: {arg!r}")
+
+        def hint(env):
+            env.lines.extend(solver(arg).hint(env.state))
+        return hint
+    if kind == "world":
+        # {"world": {"name": "forest", "op": "advance"}}: la operación escribe en
+        # env.lines y deja lo encontrado en env.vars para las acciones siguientes
+        name, op = arg["name"], arg["op"]
+        if op not in world(name).OPS:
+            raise ScenarioError(f"Operación desconocida en {name}: {op!r}")
+
+        def world_op(env):
+            world(name).OPS[op](env)
+        return world_op
+    if kind == "stream":
+        # sorteos de las acciones internas en su propio flujo (ver rng_streams)
+        name, body = arg["name"], compile_actions(arg.get("do", []), model)
+
+        def stream(env):
+            if env.source is None:
+                return body(env)
+            outer = env.rng
+            env.rng = env.source.stream(name)
+            try:
+                return body(env)
+            finally:
+                env.rng = outer
+        return stream
+    raise ScenarioError(f"Acción desconocida: {kind!r}")
+
+
+def _compile_grid(spec, model=None):
+    # genera {fila: {columna: {campo: valor}}}; filas y columnas empiezan en 1
+    target = compile_target(spec["target"], model)
+    rows, cols = int(spec["rows"]), int(spec["cols"])
+    row_key, col_key = spec.get("row_key", "{row}"), spec.get("col_key", "{col}")
+    cells = [(name, compile_expr(e, model)) for name, e in spec["cells"].items()]
+
+    def grid(env):
+        result = {}
+        for row in range(1, rows + 1):
+            env.vars["row"] = row
+            line = {}
+            for col in range(1, cols + 1):
+                env.vars["col"] = col
+                line[col_key.format(row=row, col=col)] = {name: expr(env) for name, expr in cells}
+            result[row_key.format(row=row, col=0)] = line
+        target(env, result)
+    return grid
+
+
+# ---------------------------
+# Escenario cargado desde datos
+# ---------------------------
+class Scenario:
+    def __init__(self, scenario_id, spec):
+        self.id = scenario_id
+        self.spec = spec
+        self.order = spec.get("order", 0)
+        self.title = spec.get("title", scenario_id)
+        self.card = spec.get("card", {"title": self.title, "difficulty": "", "description": ""})
+        self.screen = spec.get("screen", {})
+        self.ambience = spec.get("ambience")
+        self.sounds = ([self.ambience] if self.ambience else []) + list(spec.get("sounds", []))
+        self.intro = spec.get("intro", "")
+        self.initial_state = spec.get("state", {})
+        # clase con __slots__ para el estado de las partidas (ver state_model)
+        self.model = compile_model(scenario_id, spec)
+        self.parser = CommandParser(spec.get("commands", []), spec.get("slots"))
+        # comandos de ejemplo por intención (para jugadores simulados)
+        self.examples = {
+            entry["intent"]: entry.get("examples") or [p.rstrip("*") for p in entry["phrases"]]
+            for entry in spec.get("commands", [])
+        }
+        self.setup = compile_actions(spec.get("setup", []), self.model)
+        # "accept": {"solver", "reject_if", "max_tries"}: se regenera el mapa si el
+        # reject_if se cumple con la clasificación del solver
+        accept = spec.get("accept")
+        self.accept_rule = None
+        if accept:
+            reject_if, name = compile_expr(accept["reject_if"]), accept["solver"]
+            solver(name)
+            self.accept_rule = lambda info: reject_if(_Env(info, None))
+            self.classify = lambda state: solver(name).classify(state)
+            self.max_tries = int(accept.get("max_tries", 20))
+        self.fallback = compile_actions(spec.get("fallback", []), self.model)
+        # tabla de transiciones: intención -> acciones compiladas
+        self.table = {intent: compile_actions(actions, self.model) for intent, actions in spec.get("rules", {}).items()}
+        unknown = set(self.table) - set(self.parser.intents)
+        if unknown:
+            raise ScenarioError(f"{scenario_id}: reglas sin comando: {sorted(unknown)}")
+
+    def new_state(self, rng=random, check=True):
+        for _ in range(self.max_tries if check and self.accept_rule else 1):
+            state = json.loads(json.dumps(self.initial_state))
+            env = _env(state, rng, "setup")
+            self.setup(env)
+            if not check or self.accepts(state):
+                break
+        return state
+
+    def accepts(self, state):
+        return self.accept_rule is None or not self.accept_rule(self.classify(state))
+
+    def intro_text(self, state):
+        return self.intro.format_map(_FormatEnv(_Env(state, random)))
+
+    def run(self, cmd, state, rng=random):
+        # aplica un comando al estado (lo modifica en el lugar) y devuelve el Result
+        parsed = self.parser.parse(cmd)
+        # con un SessionRng cada intención sortea en su propio flujo
+        env = _env(state, rng, parsed.name or "fallback", dict(parsed.slots))
+        actions = self.table.get(parsed.name, self.fallback)
+        end = actions(env)
+        if end is None:
+            return Result(env.lines, None, None, parsed.name)
+        return Result(env.lines, end[0], end[1], parsed.name)
+
+
+def _env(state, rng, stream, vars_=None):
+    if hasattr(rng, "stream"):
+        return _Env(state, rng.stream(stream), vars_, rng)
+    return _Env(state, rng, vars_)
+
+
+def load_scenario(path):
+    scenario_id = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    return Scenario(scenario_id, spec)
+
+
+def load_scenarios(directory=SCENARIOS_DIR):
+    # todos los scenarios/*.json con reglas, ordenados por "order"
+    scenarios = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        if "rules" not in spec:
+            continue   # p.ej. corpus.json
+        scenarios.append(Scenario(os.path.splitext(name)[0], spec))
+    scenarios.sort(key=lambda s: (s.order, s.id))
+    return {s.id: s for s in scenarios}
@@ -0,0 +1,201 @@
+# scheduler.py
+# Un solo registro de temporizadores para la app. Tiene la misma interfaz que
+# root.after / root.after_cancel, pero cada temporizador queda anotado con su
+# scope (la pantalla en la que se programó) y clear() los cancela todos con
+# cancel_scope(). Los vencimientos se redondean a ticks de tick_ms y Tk solo
+# tiene un "after" armado, para el tick más cercano: los temporizadores que
+# caen en el mismo tick corren juntos en un único callback.
+#
+# pending() / stats() sirven para detectar fugas (temporizadores que quedan
+# vivos después de salir de una pantalla). Lo que programa Tk por su cuenta (el
+# bucle de asyncio de AsyncBridge, el monitor de retraso, que mide justamente el
+# "after" crudo de Tk) se anota con watch() y también sale en stats().
+import heapq
+import itertools
+import math
+import time
+
+from instrumentation import metrics
+
+TICK_MS = 16     # mismo frame que la máquina de escribir
+_CURRENT = object()
+
+
+class _Timer:
+    __slots__ = ("id", "tick", "fn", "args", "scope")
+
+    def __init__(self, timer_id, tick, fn, args, scope):
+        self.id = timer_id
+        self.tick = tick
+        self.fn = fn
+        self.args = args
+        self.scope = scope
+
+
+class Scheduler:
+    def __init__(self, root, tick_ms=TICK_MS, current_scope=None, clock=time.perf_counter):
+        self.root = root
+        self.tick_ms = tick_ms
+        self.current_scope = current_scope   # callable: scope por defecto (pantalla actual)
+        self.clock = clock                   # reemplazable en pruebas
+        self._timers = {}                    # id -> _Timer (solo los vivos)
+        self._heap = []                      # (tick, id); los cancelados se saltan al salir
+        self._scopes = {}                    # scope -> set de ids
+        self._ids = itertools.count(1)
+        self._after_id = None
+        self._armed_tick = None
+        self._watched = {}                   # nombre -> callable con lo pendiente afuera
+        self.fired = 0
+        self.merged = 0
+        self.cancelled = 0
+
+    def _now_ms(self):
+        return self.clock() * 1000
+
+    # --- interfaz de Tk ---
+    def after(self, ms, fn, *args, scope=_CURRENT):
+        if scope is _CURRENT:
+            scope = self.current_scope() if self.current_scope else None
+        timer = _Timer(next(self._ids), math.ceil((self._now_ms() + ms) / self.tick_ms), fn, args, scope)
+        self._timers[timer.id] = timer
+        self._scopes.setdefault(scope, set()).add(timer.id)
+        heapq.heappush(self._heap, (timer.tick, timer.id))
+        self._arm()
+        return timer.id
+
+    def after_cancel(self, timer_id):
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return
+        self._forget(timer)
+        self.cancelled += 1
+        self._compact()
+
+    def cancel_scope(self, scope):
+        ids = self._scopes.pop(scope, None)
+        if not ids:
+            return 0
+        for timer_id in ids:
+            self._timers.pop(timer_id, None)
+        self.cancelled += len(ids)
+        metrics.count("timers.cancelled", len(ids))
+        self._compact()
+        return len(ids)
+
+    def cancel_all(self):
+        n = len(self._timers)
+        self._timers.clear()
+        self._scopes.clear()
+        self._heap = []
+        self.cancelled += n
+        self._disarm()
+        return n
+
+    def scoped(self, scope=None):
+        # root.after / after_cancel con scope fijo (None = de la app, clear() no
+        # lo cancela), para clases que reciben un "root" donde programar
+        return _Scoped(self, scope)
+
+    def _forget(self, timer):
+        ids = self._scopes.get(timer.scope)
+        if ids is not None:
+            ids.discard(timer.id)
+            if not ids:
+                del self._scopes[timer.scope]
+
+    # --- consultas (fugas) ---
+    def pending(self, scope=_CURRENT):
+        if scope is _CURRENT:
+            return len(self._timers)
+        return len(self._scopes.get(scope, ()))
+
+    def watch(self, name, pending):
+        # pending() -> cuántos temporizadores o tareas tiene vivos algo que no
+        # programa con este Scheduler
+        self._watched[name] = pending
+
+    def stats(self):
+        return {
+            "pending": len(self._timers),
+            "by_scope": {getattr(s, "name", s) or "app": len(ids) for s, ids in self._scopes.items()},
+            "fired": self.fired,
+            "merged": self.merged,
+            "cancelled": self.cancelled,
+            "external": {name: pending() for name, pending in self._watched.items()},
+        }
+
+    # --- un solo after de Tk ---
+    def _compact(self):
+        # quita cancelados del frente y, si sobran muchos, reconstruye el heap
+        heap = self._heap
+        while heap and heap[0][1] not in self._timers:
+            heapq.heappop(heap)
+        if len(heap) > 2 * len(self._timers) + 64:
+            self._heap = [(t.tick, t.id) for t in self._timers.values()]
+            heapq.heapify(self._heap)
+        if not self._timers:
+            self._disarm()
+
+    def _disarm(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._after_id = None
+        self._armed_tick = None
+
+    def _arm(self):
+        if not self._heap:
+            return
+        tick = self._heap[0][0]
+        if self._after_id is not None:
+            if self._armed_tick <= tick:
+                return
+            self._disarm()
+        delay = max(0, math.ceil(tick * self.tick_ms - self._now_ms()))
+        self._armed_tick = tick
+        self._after_id = self.root.after(delay, self._fire)
+
+    def _fire(self):
+        self._after_id = None
+        self._armed_tick = None
+        now_tick = math.floor(self._now_ms() / self.tick_ms + 1e-6)
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now_tick:
+            timer = self._timers.get(heapq.heappop(heap)[1])
+            if timer is not None:
+                due.append(timer)
+        ran = 0
+        with metrics.timed("timers.tick"):
+            for timer in due:
+                # un callback anterior del mismo tick pudo cancelarlo (p.ej. cambió de pantalla)
+                if self._timers.pop(timer.id, None) is None:
+                    continue
+                self._forget(timer)
+                ran += 1
+                try:
+                    timer.fn(*timer.args)
+                except Exception as exc:
+                    self.root.report_callback_exception(type(exc), exc, exc.__traceback__)
+        if ran:
+            self.fired += ran
+            self.merged += ran - 1
+            metrics.count("timers.fired", ran)
+        self._compact()
+        self._arm()
+
+
+class _Scoped:
+    __slots__ = ("scheduler", "scope")
+
+    def __init__(self, scheduler, scope):
+        self.scheduler = scheduler
+        self.scope = scope
+
+    def after(self, ms, fn, *args):
+        return self.scheduler.after(ms, fn, *args, scope=self.scope)
+
+    def after_cancel(self, timer_id):
+        self.scheduler.after_cancel(timer_id)
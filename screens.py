@@ -0,0 +1,56 @@
+# screens.py
+import time
+import tkinter as tk
+
+from instrumentation import metrics
+
+
+# ---------------------------
+# Pantallas reutilizables
+# ---------------------------
+class Screen:
+    # una pantalla construida una sola vez; sus widgets se guardan como atributos
+    def __init__(self, name, frame):
+        self.name = name
+        self.frame = frame
+        self.on_command = None   # manejador actual (escenarios)
+
+
+class ScreenPool:
+    # Cada pantalla se construye la primera vez que se muestra y luego solo se
+    # oculta (pack_forget) y se vuelve a mostrar. Con pooled=False se destruye
+    # al salir, como antes; sirve para comparar en benchmarks/transitions.py.
+    def __init__(self, parent, pooled=True):
+        self.parent = parent
+        self.pooled = pooled
+        self.screens = {}
+        self.current = None
+        self.builds = 0
+        self.last_transition_ms = 0.0
+
+    def hide_current(self):
+        screen, self.current = self.current, None
+        if screen is None:
+            return
+        if self.pooled:
+            screen.frame.pack_forget()
+        else:
+            screen.frame.destroy()
+            self.screens.pop(screen.name, None)
+
+    def show(self, name, build, bg="#111111"):
+        t0 = time.perf_counter()
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = Screen(name, tk.Frame(self.parent, bg=bg))
+            with metrics.timed("screen.build"):
+                build(screen)
+            self.screens[name] = screen
+            self.builds += 1
+        if self.current is not screen:
+            self.hide_current()
+            screen.frame.pack(fill="both", expand=True)
+            self.current = screen
+        self.last_transition_ms = (time.perf_counter() - t0) * 1000
+        metrics.record("screen.show", self.last_transition_ms)
+        return screen
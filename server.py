@@ -0,0 +1,332 @@
+# server.py
+# Servidor sin interfaz: muchas partidas en un solo proceso asyncio (kioscos).
+# Protocolo: una línea JSON por mensaje sobre TCP local (o socket Unix).
+#
+#   {"op": "hello", "player": "Ana", "new": false}  -> perfil, escena actual, escenarios
+#   {"op": "profiles"}                              -> perfiles guardados
+#   {"op": "start", "scenario": "scenario2"}        -> intro de la partida (nueva o guardada)
+#   {"op": "cmd", "text": "bajar"}                  -> líneas, desenlace, turnos
+#   {"op": "leaderboard", "scenario": "scenario2", "after": ["Ana", 12, 80500]}
+#                                                   -> una página de la clasificación
+#   {"op": "history", "before": 1234}               -> una página del historial del jugador
+#   {"op": "bye"}                                   -> guarda, suelta el perfil y cierra
+#
+# Cada respuesta lleva "ok"; si es false, "error" dice por qué. Las reglas son
+# las de game_core (las mismas que usa la app de Tk) y los guardados van a
+# saves/ con el mismo formato e índice: un perfil se puede jugar en la app o en
+# el servidor. Los guardados se agrupan: cada save_interval segundos se
+# codifican las sesiones modificadas y se escriben juntas en el pool de hilos.
+# Las partidas terminadas van a saves/stats.db (run_stats) como en la app.
+#
+#   python server.py --port 8765
+#   python server.py --unix /tmp/the-last-code.sock
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+
+from game_core import end_run, resume_session, scenarios, store_progress
+from instrumentation import metrics
+from persistence import atomic_write_bytes, encode_state, journal_path, read_state, remove_file
+from profiles import PROFILES_DIR, ProfileStore
+from run_stats import PAGE_SIZE, STATS_FILE, RunStats, run_record
+
+MAX_LINE = 64 * 1024
+MAX_PAGE = 100
+# operaciones del protocolo; cualquier otra cuenta en las métricas como "invalid"
+OPS = ("hello", "profiles", "start", "cmd", "leaderboard", "history", "bye")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ClientSession:
+    # una conexión: jugador, su guardado en memoria y la partida en curso
+    __slots__ = ("id", "player", "save", "game", "dirty", "commands")
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.player = None
+        self.save = None
+        self.game = None
+        self.dirty = False
+        self.commands = 0
+
+
+class GameServer:
+    def __init__(self, profiles_dir=PROFILES_DIR, save_interval=0.5):
+        self.profiles = ProfileStore(profiles_dir)
+        self.runs = RunStats(os.path.join(profiles_dir, STATS_FILE))
+        self.save_interval = save_interval
+        self.scenarios = scenarios()
+        self.sessions = {}          # id -> ClientSession
+        self.players = {}           # nombre -> ClientSession (un perfil, una conexión)
+        self._ids = itertools.count(1)
+        self._save_lock = None
+        self._saver = None
+        self._servers = []
+
+    # --- arranque ---
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        self._save_lock = asyncio.Lock()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+        self._servers.append(server)
+        self._saver = asyncio.get_running_loop().create_task(self._save_loop())
+        return server
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        if self._saver is not None:
+            self._saver.cancel()
+        for session in list(self.sessions.values()):
+            await self._logout(session)
+        self.runs.close()
+
+    # --- conexión ---
+    async def handle(self, reader, writer):
+        session = ClientSession(next(self._ids))
+        self.sessions[session.id] = session
+        metrics.count("server.connections")
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break   # línea demasiado larga o conexión cortada
+                if not line:
+                    break
+                t0 = time.perf_counter()
+                msg = None
+                try:
+                    msg = json.loads(line)
+                    if not isinstance(msg, dict):
+                        raise ProtocolError("se esperaba un objeto JSON")
+                    reply = await self.dispatch(session, msg)
+                except (ValueError, ProtocolError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+                # el nombre de la métrica no sale tal cual del cliente
+                op = msg.get("op") if isinstance(msg, dict) else None
+                metrics.record(f"server.{op if op in OPS else 'invalid'}", (time.perf_counter() - t0) * 1000)
+                if reply.get("bye"):
+                    break
+        finally:
+            await self._logout(session)
+            self.sessions.pop(session.id, None)
+            writer.close()
+
+    async def dispatch(self, session, msg):
+        op = msg.get("op")
+        if op == "hello":
+            return await self._hello(session, msg)
+        if op == "profiles":
+            self.profiles.refresh()
+            return {"ok": True, "profiles": {name: self.profiles.get(name) for name in self.profiles.names()}}
+        if op == "bye":
+            await self._logout(session)
+            return {"ok": True, "bye": True}
+        if session.player is None:
+            raise ProtocolError("primero hello")
+        if op == "start":
+            return self._start(session, msg)
+        if op == "cmd":
+            return self._command(session, msg)
+        if op in ("leaderboard", "history"):
+            return await self._page(session, op, msg)
+        raise ProtocolError(f"operación desconocida: {op!r}")
+
+    async def _hello(self, session, msg):
+        name = str(msg.get("player") or "").strip()
+        if not name:
+            raise ProtocolError("falta el nombre del jugador")
+        if session.player == name:
+            if msg.get("new"):
+                # nueva partida con el mismo perfil: se reinicia solo su guardado
+                session.save, session.game = {"player_name": name}, None
+                session.dirty = True
+            return self._profile_reply(session)
+        await self._logout(session)
+        if name in self.players or not self.profiles.claim(name):
+            return {"ok": False, "error": "perfil en uso"}
+        self.players[name] = session   # antes de leer: otra conexión ya no puede tomarlo
+        if msg.get("new"):
+            save = {}
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                save = await loop.run_in_executor(None, read_state, self.profiles.path(name))
+            except Exception:
+                del self.players[name]
+                self.profiles.release(name)
+                raise ProtocolError("no se pudo leer el perfil") from None
+        save["player_name"] = name
+        session.player, session.save, session.game = name, save, None
+        session.dirty = True
+        return self._profile_reply(session)
+
+    def _profile_reply(self, session):
+        return {
+            "ok": True,
+            "session": session.id,
+            "player": session.player,
+            "current_scene": session.save.get("current_scene"),
+            "scenarios": [{"id": s.id, "title": s.title, "card": s.card} for s in self.scenarios.values()],
+        }
+
+    def _start(self, session, msg):
+        scenario_id = msg.get("scenario")
+        scenario = self.scenarios.get(scenario_id) if isinstance(scenario_id, str) else None
+        if scenario is None:
+            raise ProtocolError(f"escenario desconocido: {msg.get('scenario')!r}")
+        session.game = resume_session(session.save, scenario)
+        session.dirty = True
+        return {"ok": True, "scenario": scenario.id, "title": scenario.title, "intro": session.game.intro(),
+                "turns": session.game.turns}
+
+    def _command(self, session, msg):
+        game = session.game
+        if game is None:
+            raise ProtocolError("no hay partida: primero start")
+        step = game.send(str(msg.get("text", "")))
+        session.commands += 1
+        metrics.count(f"command.{game.intent or 'unknown'}")
+        if game.finished:
+            # como la app: el resultado se muestra y el guardado vuelve a la selección
+            self.runs.record(run_record(session.player, game))
+            end_run(session.save)
+            session.game = None
+        else:
+            store_progress(session.save, game)
+        session.dirty = True
+        return {"ok": True, "lines": step.lines, "outcome": step.outcome, "reason": step.reason,
+                "intent": game.intent, "turns": game.turns}
+
+    async def _page(self, session, op, msg):
+        # las consultas van al pool de hilos: con cursor son una búsqueda en el índice
+        limit = msg.get("limit", PAGE_SIZE)
+        if type(limit) is not int or not 0 < limit <= MAX_PAGE:
+            raise ProtocolError(f"limit debe ser un entero entre 1 y {MAX_PAGE}")
+        loop = asyncio.get_running_loop()
+        if op == "leaderboard":
+            scenario = msg.get("scenario")
+            if not isinstance(scenario, str) or scenario not in self.scenarios:
+                raise ProtocolError(f"escenario desconocido: {scenario!r}")
+            after = msg.get("after")
+            if after is not None:
+                # la última fila vista: [jugador, turnos, ms]
+                if not (isinstance(after, list) and len(after) == 3 and isinstance(after[0], str)
+                        and all(type(v) is int for v in after[1:])):
+                    raise ProtocolError("after debe ser [jugador, turnos, ms]")
+                after = tuple(after)
+            rows = await loop.run_in_executor(None, self.runs.leaderboard, scenario, after, limit)
+            totals = await loop.run_in_executor(None, self.runs.totals, scenario) if after is None else {}
+            return {"ok": True, "rows": rows, "totals": [[o, r, n] for (o, r), n in totals.items()]}
+        before = msg.get("before")
+        if before is not None and type(before) is not int:
+            raise ProtocolError("before debe ser el id de una partida")
+        rows = await loop.run_in_executor(None, self.runs.history, session.player, before, limit)
+        return {"ok": True, "rows": rows}
+
+    async def _logout(self, session):
+        if session.player is None:
+            return
+        await self._save([session])
+        self.players.pop(session.player, None)
+        self.profiles.release(session.player)
+        session.player = session.save = session.game = None
+
+    # --- guardado agrupado ---
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            dirty = [s for s in self.sessions.values() if s.dirty and s.player is not None]
+            if dirty:
+                await self._save(dirty)
+
+    async def _save(self, sessions):
+        # se codifica en el hilo del loop (el estado no cambia mientras tanto) y el
+        # disco (fotos + una sola escritura del índice) va al pool de hilos
+        batch, index = [], {}
+        for s in sessions:
+            if not s.dirty or s.player is None:
+                continue
+            batch.append((self.profiles.path(s.player), encode_state(s.save)))
+            index[s.player] = {"current_scene": s.save.get("current_scene")}
+            s.dirty = False
+        if not batch:
+            return
+        async with self._save_lock:
+            t0 = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(None, self._write_batch, batch, index)
+            metrics.record("server.save_batch", (time.perf_counter() - t0) * 1000)
+            metrics.count("server.saves", len(batch))
+
+    def _write_batch(self, batch, index):
+        for path, payload in batch:
+            # como write_state: foto completa y fuera el diario que haya dejado la app
+            atomic_write_bytes(path, payload)
+            remove_file(journal_path(path))
+        self.profiles.touch_many(index)
+
+    def stats(self):
+        return {
+            "sessions": len(self.sessions),
+            "players": len(self.players),
+            "playing": sum(1 for s in self.sessions.values() if s.game is not None),
+        }
+
+
+async def serve(args):
+    server = GameServer(args.saves, save_interval=args.save_interval)
+    listener = await server.start(args.host, args.port, args.unix)
+    if args.unix:
+        where = args.unix
+    else:
+        host, port = listener.sockets[0].getsockname()[:2]
+        where = f"{host}:{port}"
+    # primera línea en stdout: dónde escucha (la usa benchmarks/loadgen.py con --port 0)
+    print(f"listening {where}", flush=True)
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, AttributeError):   # Windows
+        pass
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+        if args.metrics_out:
+            metrics.export_json(args.metrics_out, extra={"server": server.stats()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de partidas sin interfaz")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 = puerto libre cualquiera")
+    parser.add_argument("--unix", metavar="PATH", default=None, help="socket Unix en vez de TCP")
+    parser.add_argument("--saves", default=PROFILES_DIR, help="directorio de perfiles")
+    parser.add_argument("--save-interval", type=float, default=0.5, help="segundos entre guardados agrupados")
+    parser.add_argument("--metrics-out", metavar="FILE", default=None, help="métricas JSON al cerrar")
+    args = parser.parse_args(argv)
+    if args.unix and os.path.exists(args.unix):
+        os.remove(args.unix)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# simulate.py
+# Simulador Monte Carlo para balancear los escenarios: juega muchas partidas sin
+# interfaz (game_core) repartidas en un pool de procesos y reporta tasa de
+# victorias, causas de derrota y turnos hasta terminar.
+#
+#   python simulate.py scenario2 scenario3 --games 1000000
+#   python simulate.py scenario3 --policy scripted --json
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from command_parser import SCENARIOS_DIR
+import hospital
+from game_core import GameSession, random_command
+from scenario_engine import load_scenarios
+
+# partidas guionadas: se juegan en orden y el último comando se repite hasta terminar
+SCRIPTS = {
+    "scenario1": ["checar debajo de la cama", "abrir cajón", "usar destornillador"],
+    "scenario2": ["bajar", "bajar", "salir"],
+    "scenario3": ["tomar linterna", "avanzar"],
+}
+
+CHUNK = 2000
+
+_scenarios = {}
+
+
+def _scenario(directory, scenario_id):
+    # cada proceso compila los escenarios una sola vez
+    if directory not in _scenarios:
+        _scenarios[directory] = load_scenarios(directory)
+    return _scenarios[directory][scenario_id]
+
+
+def _next_command(policy, script, session, rng):
+    if policy == "random":
+        return random_command(session.scenario, rng)
+    return script[min(session.turns, len(script) - 1)]
+
+
+def run_chunk(job):
+    # una tanda de partidas con su propio RNG (semilla derivada de la tanda)
+    directory, scenario_id, policy, script, games, max_turns, seed, chunk, vectorized = job
+    scenario = _scenario(directory, scenario_id)
+    rng = random.Random(f"{seed}:{scenario_id}:{chunk}")
+    layouts = None
+    if vectorized and hospital.HAVE_NUMPY and hospital.grid_spec(scenario):
+        # todos los hospitales de la tanda de una vez (NumPy, misma semilla derivada)
+        layouts = hospital.generate(scenario, games, rng.getrandbits(64))
+    outcomes, causes, turns = Counter(), Counter(), {"win": Counter(), "lose": Counter(), "timeout": Counter()}
+    for i in range(games):
+        state = layouts.state(i) if layouts else None
+        if state is not None and not scenario.accepts(state):
+            state = None   # rechazado por el solver: el motor genera otro
+        session = GameSession(scenario, state, rng=rng)
+        while not session.finished and session.turns < max_turns:
+            session.send(_next_command(policy, script, session, rng))
+        outcome = session.outcome or "timeout"
+        outcomes[outcome] += 1
+        turns[outcome][session.turns] += 1
+        if outcome == "lose":
+            causes[f"{session.reason} ({session.intent})"] += 1
+    return outcomes, causes, turns
+
+
+def _percentile(hist, q):
+    total = sum(hist.values())
+    if not total:
+        return None
+    limit = q * total
+    seen = 0
+    for value in sorted(hist):
+        seen += hist[value]
+        if seen >= limit:
+            return value
+    return max(hist)
+
+
+def _summary(hist):
+    total = sum(hist.values())
+    if not total:
+        return None
+    return {
+        "count": total,
+        "mean": round(sum(v * n for v, n in hist.items()) / total, 2),
+        "p50": _percentile(hist, 0.50),
+        "p90": _percentile(hist, 0.90),
+        "p99": _percentile(hist, 0.99),
+        "max": max(hist),
+    }
+
+
+def simulate(scenario_id, games, policy="random", max_turns=200, seed=0, workers=None,
+             directory=SCENARIOS_DIR, script=None, vectorized=True):
+    script = script or SCRIPTS.get(scenario_id, [])
+    if policy == "scripted" and not script:
+        raise ValueError(f"No hay guion para {scenario_id}")
+    jobs = []
+    left, chunk = games, 0
+    while left > 0:
+        n = min(CHUNK, left)
+        jobs.append((directory, scenario_id, policy, script, n, max_turns, seed, chunk, vectorized))
+        left -= n
+        chunk += 1
+    outcomes, causes = Counter(), Counter()
+    turns = {"win": Counter(), "lose": Counter(), "timeout": Counter()}
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = map(run_chunk, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(run_chunk, jobs)
+    try:
+        for o, c, t in results:
+            outcomes.update(o)
+            causes.update(c)
+            for k in turns:
+                turns[k].update(t[k])
+    finally:
+        if pool:
+            pool.shutdown()
+    elapsed = time.perf_counter() - t0
+    return {
+        "scenario": scenario_id,
+        "policy": policy,
+        "games": games,
+        "seed": seed,
+        "seconds": round(elapsed, 3),
+        "win_rate": round(outcomes["win"] / games, 4) if games else 0.0,
+        "outcomes": dict(outcomes),
+        "death_causes": dict(causes.most_common()),
+        "turns": {k: _summary(v) for k, v in turns.items() if v},
+    }
+
+
+def print_report(report):
+    print(f"== {report['scenario']} ({report['policy']}, {report['games']} partidas, {report['seconds']} s)")
+    print(f"   victorias: {report['win_rate'] * 100:.2f}%   {report['outcomes']}")
+    for cause, n in report["death_causes"].items():
+        print(f"   derrota {cause}: {n} ({n / report['games'] * 100:.2f}%)")
+    for outcome, s in report["turns"].items():
+        print(f"   turnos {outcome}: media {s['mean']}  p50 {s['p50']}  p90 {s['p90']}  p99 {s['p99']}  max {s['max']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador de balance de escenarios")
+    parser.add_argument("scenarios", nargs="*", default=["scenario2", "scenario3"])
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--policy", choices=["random", "scripted"], default="random")
+    parser.add_argument("--max-turns", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="procesos (por defecto: núcleos)")
+    parser.add_argument("--scenarios-dir", default=SCENARIOS_DIR, help="probar cambios en copias de los JSON")
+    parser.add_argument("--no-numpy", action="store_true", help="generar cada hospital con el motor (más lento)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+    directory = os.path.abspath(args.scenarios_dir)
+    unknown = [s for s in args.scenarios if s not in load_scenarios(directory)]
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(unknown)}")
+    reports = []
+    for scenario_id in args.scenarios:
+        reports.append(simulate(scenario_id, args.games, args.policy, args.max_turns, args.seed,
+                                args.workers, directory, vectorized=not args.no_numpy))
+    if args.json:
+        print(json.dumps(reports, indent=2, ensure_ascii=False))
+    else:
+        for report in reports:
+            print_report(report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
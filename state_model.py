@@ -0,0 +1,533 @@
+# state_model.py
+# Estado tipado de un escenario. El modelo sale de los datos del escenario:
+#  - banderas: valores bool de "state" y nombres a los que alguna regla les hace
+#    "set" con true/false (p.ej. has_screwdriver) -> bits de un solo entero
+#  - enteros: valores int de "state" -> un slot cada uno
+#  - rejillas: destinos de la acción "grid" del setup (los pisos del hospital) ->
+#    un bytearray filas x columnas, un bit por campo de la celda
+#  - lo demás (p.ej. el bosque de forest.py) queda en un dict "extra"
+# Por cada escenario se genera una clase con __slots__. Se lee y escribe como un
+# dict (get, [], in), así que el motor, los solvers y forest.py no cambian; la
+# rejilla devuelve vistas de fila y celda con la misma cara que los dicts de antes.
+#
+# to_save()/from_save() son el códec del guardado (struct + bits de la rejilla; la
+# cabecera del modelo se escribe una vez por archivo y cada sección lleva su huella);
+# snapshot()/restore() y diff() dan deshacer y los deltas del diario sin recorrer
+# dicts anidados. to_dict() vuelve a la forma anterior (JSON, grabaciones).
+import copy
+import hashlib
+import json
+import operator
+import struct
+
+_DEFAULTS = {"flag": False, "int": 0}
+_HEADER = struct.Struct("<H")
+KEY_SIZE = 8   # huella de la cabecera del modelo al inicio de cada sección
+
+
+class StateView:
+    # marca para el motor y persistence: se accede como a un dict
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(k, self.get(k)) for k in self.keys()]
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+
+_MISSING = object()
+
+
+# ---------------------------
+# Rejilla (pisos x habitaciones)
+# ---------------------------
+class GridSpec:
+    # forma de la acción "grid": claves "{row}" / "R{col}" empezando en 1
+    __slots__ = ("rows", "cols", "row_key", "col_key", "row_keys", "col_keys", "row_index", "col_index",
+                 "fields", "bits")
+
+    def __init__(self, rows, cols, row_key, col_key, fields):
+        self.rows, self.cols = rows, cols
+        self.row_key, self.col_key = row_key, col_key
+        self.row_keys = [row_key.format(row=r, col=0) for r in range(1, rows + 1)]
+        self.col_keys = [col_key.format(row=0, col=c) for c in range(1, cols + 1)]
+        self.row_index = {k: i for i, k in enumerate(self.row_keys)}
+        self.col_index = {k: i for i, k in enumerate(self.col_keys)}
+        self.fields = list(fields)
+        if len(self.fields) > 8:
+            raise ValueError("una celda admite hasta 8 campos")
+        self.bits = {name: 1 << i for i, name in enumerate(self.fields)}
+
+    @property
+    def packed_size(self):
+        return (self.rows * self.cols * len(self.fields) + 7) // 8
+
+    def pack(self, cells):
+        # en el guardado cada celda ocupa tantos bits como campos tiene
+        k = len(self.fields)
+        if k == 8:
+            return bytes(cells)
+        out = bytearray(self.packed_size + 1)
+        for i, byte in enumerate(cells):
+            pos = i * k
+            value = byte << (pos & 7)
+            out[pos >> 3] |= value & 0xFF
+            out[(pos >> 3) + 1] |= value >> 8
+        return bytes(out[:-1])
+
+    def unpack(self, buf):
+        k = len(self.fields)
+        if k == 8:
+            return bytearray(buf)
+        buf = bytes(buf) + b"\0"
+        mask = (1 << k) - 1
+        cells = bytearray(self.rows * self.cols)
+        for i in range(len(cells)):
+            pos = i * k
+            j = pos >> 3
+            cells[i] = ((buf[j] | buf[j + 1] << 8) >> (pos & 7)) & mask
+        return cells
+
+
+class Grid(StateView):
+    __slots__ = ("spec", "cells")
+
+    def __init__(self, spec, cells=None):
+        self.spec = spec
+        self.cells = cells if cells is not None else bytearray(spec.rows * spec.cols)
+
+    @classmethod
+    def from_dict(cls, spec, rows):
+        # {"1": {"R1": {"occupied": bool, ...}, ...}, ...}; otra forma -> TypeError
+        if not isinstance(rows, dict) or len(rows) != spec.rows:
+            raise TypeError("la rejilla no tiene la forma del escenario")
+        grid = cls(spec)
+        cells = grid.cells
+        for r, row_key in enumerate(spec.row_keys):
+            line = rows.get(row_key)
+            if not isinstance(line, dict) or len(line) != spec.cols:
+                raise TypeError("la rejilla no tiene la forma del escenario")
+            for c, col_key in enumerate(spec.col_keys):
+                cell = line.get(col_key)
+                if not isinstance(cell, dict) or len(cell) != len(spec.fields):
+                    raise TypeError("la rejilla no tiene la forma del escenario")
+                byte = 0
+                for name, bit in spec.bits.items():
+                    value = cell.get(name)
+                    if type(value) is not bool:
+                        raise TypeError(f"{name} no es bool")
+                    if value:
+                        byte |= bit
+                cells[r * spec.cols + c] = byte
+        return grid
+
+    def get(self, key, default=None):
+        r = self.spec.row_index.get(key if isinstance(key, str) else str(key))
+        return default if r is None else _Row(self, r)
+
+    def keys(self):
+        return list(self.spec.row_keys)
+
+    def copy(self):
+        return Grid(self.spec, bytearray(self.cells))
+
+    def to_dict(self):
+        spec, cells = self.spec, self.cells
+        return {
+            row_key: {
+                col_key: {name: bool(cells[r * spec.cols + c] & bit) for name, bit in spec.bits.items()}
+                for c, col_key in enumerate(spec.col_keys)
+            }
+            for r, row_key in enumerate(spec.row_keys)
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, Grid) and self.spec is other.spec and self.cells == other.cells
+
+
+class _Row(StateView):
+    __slots__ = ("grid", "row")
+
+    def __init__(self, grid, row):
+        self.grid = grid
+        self.row = row
+
+    def get(self, key, default=None):
+        c = self.grid.spec.col_index.get(key)
+        return default if c is None else _Cell(self.grid, self.row * self.grid.spec.cols + c)
+
+    def keys(self):
+        return list(self.grid.spec.col_keys)
+
+    def copy(self):
+        return {k: cell.to_dict() for k, cell in self.items()}
+
+
+class _Cell(StateView):
+    __slots__ = ("grid", "index")
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+
+    def get(self, key, default=None):
+        bit = self.grid.spec.bits.get(key)
+        return default if bit is None else bool(self.grid.cells[self.index] & bit)
+
+    def __setitem__(self, key, value):
+        bit = self.grid.spec.bits.get(key)
+        if bit is None or type(value) is not bool:
+            raise TypeError(f"campo de celda inválido: {key}={value!r}")
+        if value:
+            self.grid.cells[self.index] |= bit
+        else:
+            self.grid.cells[self.index] &= ~bit
+
+    def keys(self):
+        return list(self.grid.spec.fields)
+
+    def copy(self):
+        return self.to_dict()
+
+    def to_dict(self):
+        return {k: self.get(k) for k in self.grid.spec.fields}
+
+
+# ---------------------------
+# Estado de un escenario
+# ---------------------------
+class SceneState(StateView):
+    # las subclases (una por modelo) agregan un slot por entero y por rejilla
+    __slots__ = ("_flags", "_extra")
+    model = None
+    _readers = {}   # nombre -> lectura directa (model.readers; get() es la ruta caliente)
+
+    def __init__(self):
+        model = self.model
+        self._flags = 0
+        self._extra = {}
+        for name in model.ints:
+            setattr(self, name, 0)
+        for name, spec in model.grids:
+            setattr(self, name, Grid(spec))
+
+    # --- como un dict ---
+    def get(self, key, default=None):
+        read = self._readers.get(key)
+        if read is None:
+            return self._extra.get(key, default)
+        return read(self)
+
+    def __setitem__(self, key, value):
+        write = self.model.writers.get(key)
+        if write is not None:
+            write(self, value)
+        elif key in self.model.grid_specs:
+            setattr(self, key, Grid.from_dict(self.model.grid_specs[key], value))
+        else:
+            self._extra[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self.get(key)
+
+    def pop(self, key, default=None):
+        kind = self.model.kinds.get(key)
+        if kind is None:
+            return self._extra.pop(key, default)
+        value = self.get(key)
+        if kind == "grid":
+            setattr(self, key, Grid(self.model.grid_specs[key]))
+        else:
+            self[key] = _DEFAULTS[kind]
+        return value
+
+    def keys(self):
+        return self.model.names + list(self._extra)
+
+    @property
+    def extra(self):
+        return self._extra
+
+    # --- copias, deshacer y deltas ---
+    def snapshot(self):
+        # foto inmutable; restore() vuelve a ella (deshacer)
+        return (self._flags,
+                tuple(getattr(self, name) for name in self.model.ints),
+                tuple(bytes(getattr(self, name).cells) for name, _ in self.model.grids),
+                copy.deepcopy(self._extra))
+
+    def restore(self, snap):
+        flags, ints, grids, extra = snap
+        self._flags = flags
+        for name, value in zip(self.model.ints, ints):
+            setattr(self, name, value)
+        for (name, spec), cells in zip(self.model.grids, grids):
+            setattr(self, name, Grid(spec, bytearray(cells)))
+        self._extra = copy.deepcopy(extra)
+
+    def copy(self):
+        new = object.__new__(type(self))
+        new._flags = self._flags
+        for name in self.model.ints:
+            setattr(new, name, getattr(self, name))
+        for name, _ in self.model.grids:
+            setattr(new, name, getattr(self, name).copy())
+        new._extra = copy.deepcopy(self._extra)
+        return new
+
+    def diff(self, old, prefix=()):
+        # operaciones [ruta, valor] del diario para pasar de old a self (mismo
+        # modelo); "extra" lo compara persistence.diff_state como cualquier dict
+        model, ops = self.model, []
+        changed = self._flags ^ old._flags
+        if changed:
+            for name, bit in model.flag_bits.items():
+                if changed & bit:
+                    ops.append([list(prefix) + [name], bool(self._flags & bit)])
+        for name in model.ints:
+            value = getattr(self, name)
+            if value != getattr(old, name):
+                ops.append([list(prefix) + [name], value])
+        for name, spec in model.grids:
+            new_cells, old_cells = getattr(self, name).cells, getattr(old, name).cells
+            if new_cells == old_cells:
+                continue
+            for i, (a, b) in enumerate(zip(new_cells, old_cells)):
+                if a == b:
+                    continue
+                r, c = divmod(i, spec.cols)
+                for field, bit in spec.bits.items():
+                    if (a ^ b) & bit:
+                        ops.append([list(prefix) + [name, spec.row_keys[r], spec.col_keys[c], field], bool(a & bit)])
+        return ops
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.snapshot() == other.snapshot()
+
+    # --- formas de guardado ---
+    def to_dict(self):
+        out = {}
+        for name in self.model.names:
+            value = self.get(name)
+            out[name] = value.to_dict() if isinstance(value, Grid) else value
+        out.update(copy.deepcopy(self._extra))
+        return out
+
+    def to_save(self):
+        # huella del modelo + banderas + enteros + celdas + extra en JSON; la
+        # cabecera del modelo va una sola vez por archivo (model_headers())
+        model = self.model
+        parts = [model.key, model.packer.pack(self._flags, *(getattr(self, name) for name in model.ints))]
+        for name, spec in model.grids:
+            parts.append(spec.pack(getattr(self, name).cells))
+        if self._extra:
+            parts.append(json.dumps(self._extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        return b"".join(parts)
+
+
+class StateModel:
+    def __init__(self, name, flags, ints, grids):
+        self.name = name
+        self.flags = list(flags)
+        self.ints = list(ints)
+        self.grids = [(g_name, spec) for g_name, spec in grids]
+        if len(self.flags) > 64:
+            raise ValueError("más de 64 banderas")
+        self.flag_bits = {n: 1 << i for i, n in enumerate(self.flags)}
+        self.grid_specs = dict(self.grids)
+        self.kinds = dict([(n, "flag") for n in self.flags] + [(n, "int") for n in self.ints]
+                          + [(n, "grid") for n, _ in self.grids])
+        self.names = self.flags + self.ints + [n for n, _ in self.grids]
+        self.packer = struct.Struct("<Q" + "q" * len(self.ints))
+        self.header = _header_bytes({
+            "flags": self.flags, "ints": self.ints,
+            "grids": [[n, s.rows, s.cols, s.row_key, s.col_key, s.fields] for n, s in self.grids],
+        })
+        self.key = hashlib.blake2b(self.header, digest_size=KEY_SIZE).digest()
+        # acceso directo por nombre: test de bit para banderas, atributo del slot
+        # para enteros y rejillas. El motor los enlaza al compilar las expresiones.
+        self.readers = {**{n: _flag_reader(bit) for n, bit in self.flag_bits.items()},
+                        **{n: operator.attrgetter(n) for n in self.ints},
+                        **{n: operator.attrgetter(n) for n, _ in self.grids}}
+        self.writers = {**{n: _flag_writer(n, bit) for n, bit in self.flag_bits.items()},
+                        **{n: _int_writer(n) for n in self.ints}}
+        self.cls = type(f"{name.title().replace('_', '')}State", (SceneState,), {
+            "__slots__": tuple(self.ints) + tuple(n for n, _ in self.grids),
+            "model": self,
+            "_readers": self.readers,
+        })
+
+    def from_dict(self, data):
+        # TypeError si algún campo no tiene el tipo del modelo
+        state = self.cls()
+        for key, value in data.items():
+            state[key] = value
+        return state
+
+    def load(self, data):
+        # lo que venga del guardado o de un generador -> estado tipado; si no
+        # encaja (guardado de otra versión de las reglas) queda como dict
+        if type(data) is self.cls:
+            return data
+        try:
+            return self.from_dict(data.to_dict() if isinstance(data, SceneState) else data)
+        except (TypeError, ValueError, OverflowError):
+            return data
+
+    def from_save(self, payload, offset, packed=True):
+        # packed=False: celdas de un byte (secciones con la cabecera incluida)
+        state = self.cls()
+        values = self.packer.unpack_from(payload, offset)
+        offset += self.packer.size
+        state._flags = values[0]
+        for name, value in zip(self.ints, values[1:]):
+            setattr(state, name, value)
+        for name, spec in self.grids:
+            if packed:
+                size = spec.packed_size
+                cells = spec.unpack(payload[offset:offset + size])
+            else:
+                size = spec.rows * spec.cols
+                cells = bytearray(payload[offset:offset + size])
+            setattr(state, name, Grid(spec, cells))
+            offset += size
+        if offset < len(payload):
+            state._extra = json.loads(bytes(payload[offset:]).decode("utf-8"))
+        return state
+
+
+def _header_bytes(spec):
+    # forma canónica: la huella del modelo se calcula sobre estos bytes
+    return json.dumps(spec, separators=(",", ":")).encode("utf-8")
+
+
+def _flag_reader(bit):
+    return lambda state: state._flags & bit != 0
+
+
+def _flag_writer(name, bit):
+    def write(state, value):
+        if type(value) is not bool:
+            raise TypeError(f"{name} es bandera, no {value!r}")
+        if value:
+            state._flags |= bit
+        else:
+            state._flags &= ~bit
+    return write
+
+
+def _int_writer(name):
+    def write(state, value):
+        if type(value) is not int:
+            raise TypeError(f"{name} es entero, no {value!r}")
+        setattr(state, name, value)
+    return write
+
+
+# modelos conocidos por huella: from_save devuelve la clase del escenario
+_MODELS = {}
+
+
+def register_header(header):
+    # cabecera leída de un guardado (bytes, o ya decodificada de la sección
+    # "models") -> modelo; si es de otra versión de las reglas, el modelo se
+    # reconstruye de la cabecera
+    if isinstance(header, dict):
+        spec, header = header, _header_bytes(header)
+    else:
+        header, spec = bytes(header), None
+    key = hashlib.blake2b(header, digest_size=KEY_SIZE).digest()
+    model = _MODELS.get(key)
+    if model is None:
+        spec = spec or json.loads(header.decode("utf-8"))
+        grids = [(g[0], GridSpec(*g[1:])) for g in spec["grids"]]
+        model = _MODELS[key] = StateModel("saved", spec["flags"], spec["ints"], grids)
+    return model
+
+
+def model_headers(keys):
+    # cabeceras para escribir junto a las secciones que usan esas huellas
+    return [_MODELS[bytes(key)].header for key in keys]
+
+
+def section_key(payload):
+    return bytes(payload[:KEY_SIZE])
+
+
+def from_save(payload):
+    # sección de to_save(); la cabecera de su modelo ya pasó por register_header()
+    model = _MODELS.get(section_key(payload))
+    if model is None:
+        raise ValueError("sección de estado sin cabecera de modelo")
+    return model.from_save(payload, KEY_SIZE)
+
+
+def from_inline_save(payload):
+    # formato anterior: la cabecera completa al inicio de cada sección
+    (size,) = _HEADER.unpack_from(payload, 0)
+    model = register_header(payload[2:2 + size])
+    return model.from_save(payload, 2 + size, packed=False)
+
+
+def as_dict(state):
+    return state.to_dict() if isinstance(state, SceneState) else state
+
+
+# ---------------------------
+# Modelo a partir del escenario
+# ---------------------------
+def _bool_sets(node, found):
+    # nombres simples a los que alguna acción hace {"set": {nombre: true/false}}
+    if isinstance(node, dict):
+        for kind, arg in node.items():
+            if kind == "set" and isinstance(arg, dict):
+                for target, value in arg.items():
+                    if target.isidentifier() and type(value) is bool:
+                        found.append(target)
+            _bool_sets(arg, found)
+    elif isinstance(node, list):
+        for item in node:
+            _bool_sets(item, found)
+
+
+def _slot_name(name):
+    return name.isidentifier() and not name.startswith("_") and not hasattr(SceneState, name)
+
+
+def compile_model(scenario_id, spec):
+    initial = spec.get("state", {})
+    flags = [k for k, v in initial.items() if type(v) is bool]
+    # enteros y rejillas son atributos: un nombre que choque con un método va a "extra"
+    ints = [k for k, v in initial.items() if type(v) is int and _slot_name(k)]
+    found = []
+    _bool_sets([spec.get("rules", {}), spec.get("setup", []), spec.get("fallback", [])], found)
+    for name in found:
+        if name not in initial and name not in flags:
+            flags.append(name)
+    grids = []
+    for action in spec.get("setup", []):
+        grid = action.get("grid") if isinstance(action, dict) else None
+        if grid and _slot_name(grid["target"]):
+            grids.append((grid["target"], GridSpec(int(grid["rows"]), int(grid["cols"]), grid.get("row_key", "{row}"),
+                                                   grid.get("col_key", "{col}"), list(grid["cells"]))))
+    model = StateModel(scenario_id, flags, ints, grids)
+    _MODELS[model.key] = model
+    return model
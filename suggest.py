@@ -0,0 +1,218 @@
+# suggest.py
+# Autocompletado de comandos bajo el Entry de los escenarios. Por escenario se
+# arma una sola vez un trie de caracteres con las frases sugeridas (clave
+# "suggest" de cada comando o, si no está, sus ejemplos); cada frase entra
+# también por cada palabra, así "cajon" encuentra "abrir cajón". Mayúsculas y
+# acentos no cuentan. Si el prefijo no da suficientes resultados se buscan
+# erratas con distancia de edición acotada, recorriendo el mismo trie.
+#
+# Lo que depende del estado va en "when" (expresión como las de las reglas, p.ej.
+# "not bed_checked"). Suggester guarda qué intenciones están activas en una
+# máscara de bits y update(state) solo vuelve a evaluar las condiciones cuyas
+# variables cambiaron desde la última vez.
+#
+#   python suggest.py scenario1 "abrir caj"
+import ast
+import sys
+import unicodedata
+
+from scenario_engine import ScenarioError, compile_expr, expr_env
+
+MAX_SUGGESTIONS = 4
+FUZZY_MIN = 3        # con menos caracteres no se buscan erratas
+_MISSING = object()
+
+
+def fold(text):
+    # minúsculas, sin acentos y con espacios simples: la clave del trie
+    text = unicodedata.normalize("NFD", text.lower())
+    return " ".join("".join(ch for ch in text if not unicodedata.combining(ch)).split())
+
+
+def max_edits(length):
+    return 0 if length < FUZZY_MIN else 1 if length <= 5 else 2
+
+
+class _Node:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []     # candidatos bajo este nodo, ya ordenados por prioridad
+
+
+def _names(src):
+    # variables del estado que lee una condición (las funciones no cuentan)
+    tree = ast.parse(src, mode="eval")
+    calls = {id(n.func) for n in ast.walk(tree) if isinstance(n, ast.Call)}
+    return {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and id(n) not in calls}
+
+
+# ---------------------------
+# Índice (uno por escenario)
+# ---------------------------
+class SuggestIndex:
+    def __init__(self, scenario):
+        self.scenario_id = scenario.id
+        self.texts = []        # id de candidato -> frase tal como se muestra
+        self.keys = []         # id de candidato -> frase normalizada
+        self.bits = []         # id de candidato -> bit de su intención
+        self.conditions = []   # (bit, condición compilada, variables que lee)
+        self.watch = {}        # variable -> bits de las condiciones que la leen
+        self.root = _Node()
+        entries = []
+        for rank, entry in enumerate(scenario.spec.get("commands", [])):
+            bit = 1 << rank
+            if "when" in entry:
+                names = _names(entry["when"])
+                self.conditions.append((bit, compile_expr(entry["when"], scenario.model), names))
+                for name in names:
+                    self.watch[name] = self.watch.get(name, 0) | bit
+            phrases = entry.get("suggest", scenario.examples.get(entry["intent"], []))
+            for text in phrases:
+                # una sugerencia que no lleva a su intención confundiría al jugador
+                parsed = scenario.parser.parse(text).name
+                if parsed != entry["intent"]:
+                    raise ScenarioError(f"{scenario.id}: sugerencia {text!r} -> {parsed} (esperado {entry['intent']})")
+                cand = len(self.texts)
+                self.texts.append(text)
+                self.keys.append(fold(text))
+                self.bits.append(bit)
+                words = self.keys[cand].split(" ")
+                offset = 0
+                for pos, word in enumerate(words):
+                    # desde el inicio gana a desde una palabra interna; luego el orden de la tabla
+                    entries.append((self.keys[cand][offset:], (pos > 0, rank, cand)))
+                    offset += len(word) + 1
+        for key, priority in entries:
+            node = self.root
+            node.ids.append(priority)
+            for ch in key:
+                node = node.children.setdefault(ch, _Node())
+                node.ids.append(priority)
+        self._sort(self.root)
+        self.all_bits = (1 << len(scenario.spec.get("commands", []))) - 1
+
+    def _sort(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            seen = set()
+            ordered = []
+            for priority in sorted(node.ids):
+                if priority[2] not in seen:
+                    seen.add(priority[2])
+                    ordered.append(priority[2])
+            node.ids = ordered
+            stack.extend(node.children.values())
+
+    def node(self, key):
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def fuzzy(self, key, limit):
+        # nodos cuyo camino está a <= limit ediciones de key (distancia contra un
+        # prefijo de la frase); se poda la rama cuando toda la fila pasa del límite
+        found = []
+        stack = [(self.root, list(range(len(key) + 1)))]
+        while stack:
+            node, row = stack.pop()
+            for ch, child in node.children.items():
+                new = [row[0] + 1]
+                for j in range(1, len(key) + 1):
+                    new.append(min(new[j - 1] + 1, row[j] + 1, row[j - 1] + (key[j - 1] != ch)))
+                if new[-1] <= limit:
+                    found.append((new[-1], child))
+                if min(new) <= limit:
+                    stack.append((child, new))
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+_indexes = {}
+
+
+def index_for(scenario):
+    # se arma una vez por escenario
+    index = _indexes.get(scenario.id)
+    if index is None:
+        index = _indexes[scenario.id] = SuggestIndex(scenario)
+    return index
+
+
+# ---------------------------
+# Sugerencias de una partida
+# ---------------------------
+class Suggester:
+    def __init__(self, index, state=None):
+        self.index = index
+        self.enabled = index.all_bits
+        self._seen = {}
+        if state is not None:
+            self.update(state)
+
+    def update(self, state):
+        # vuelve a evaluar solo las condiciones que leen variables que cambiaron
+        index = self.index
+        dirty = 0
+        for name, bits in index.watch.items():
+            value = state.get(name, _MISSING)
+            if name in self._seen and self._seen[name] == value:
+                continue
+            self._seen[name] = value
+            dirty |= bits
+        if not dirty:
+            return 0
+        env = expr_env(state)
+        for bit, cond, _ in index.conditions:
+            if dirty & bit:
+                if cond(env):
+                    self.enabled |= bit
+                else:
+                    self.enabled &= ~bit
+        return dirty
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        key = fold(text)
+        if not key:
+            return []
+        index = self.index
+        out, seen = [], set()
+
+        def take(ids):
+            for cand in ids:
+                if cand in seen or not self.enabled & index.bits[cand]:
+                    continue
+                seen.add(cand)
+                if index.keys[cand] != key:   # lo ya escrito no se sugiere
+                    out.append(index.texts[cand])
+                    if len(out) >= limit:
+                        return True
+            return False
+
+        node = index.node(key)
+        if node is not None and take(node.ids):
+            return out
+        edits = max_edits(len(key))
+        if edits:
+            for _, node in index.fuzzy(key, edits):
+                if take(node.ids):
+                    break
+        return out
+
+    def complete(self, text):
+        # Tab: la primera sugerencia (o el texto tal cual si no hay ninguna)
+        found = self.suggest(text, 1)
+        return found[0] if found else text
+
+
+if __name__ == "__main__":
+    from game_core import scenarios
+    scenario = scenarios()[sys.argv[1] if len(sys.argv) > 1 else "scenario1"]
+    suggester = Suggester(index_for(scenario), scenario.new_state(check=False))
+    for text in sys.argv[2:] or [line.strip() for line in sys.stdin]:
+        print(f"{text!r}: {suggester.suggest(text)}")
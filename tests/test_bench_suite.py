@@ -0,0 +1,42 @@
+# tests/test_bench_suite.py
+# La comparación contra una corrida anterior de benchmarks/suite.py (--baseline /
+# --threshold): qué cuenta como regresión y el código de salida.
+import importlib.util
+import json
+import os
+
+import pytest
+
+SUITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "suite.py")
+_spec = importlib.util.spec_from_file_location("bench_suite", SUITE)
+suite = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(suite)
+
+
+def test_compare_flags_only_slowdowns_over_threshold():
+    baseline = {"a": {"mean_ms": 1.0}, "b": {"mean_ms": 1.0}, "c": {"mean_ms": 1.0}}
+    results = {"a": {"mean_ms": 1.2}, "b": {"mean_ms": 1.3}, "c": {"mean_ms": 0.5}}
+    assert suite.compare(results, baseline, 0.25, 0.01) == [("b", 1.0, 1.3)]
+
+
+def test_compare_ignores_noise_and_unknown_names():
+    baseline = {"tiny": {"mean_ms": 0.001}, "gone": {"mean_ms": 1.0}}
+    results = {"tiny": {"mean_ms": 0.005}, "new": {"mean_ms": 9.0}, "skipped": {"skipped": True}}
+    assert suite.compare(results, baseline, 0.25, 0.01) == []
+
+
+def _baseline(path, mean_ms):
+    # una corrida anterior con todos los benchmarks de guardado en mean_ms
+    names = ["save.write_state.small", "save.read_state.small", "save.journal_delta.hospital"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"results": {name: {"mean_ms": mean_ms} for name in names}}, f)
+    return str(path)
+
+
+@pytest.mark.parametrize("mean_ms, code", [(1e-6, 1), (1e6, 0)])
+def test_main_exit_code_against_baseline(tmp_path, monkeypatch, capsys, mean_ms, code):
+    monkeypatch.chdir(tmp_path)   # main() cambia a un directorio temporal
+    baseline = _baseline(tmp_path / "baseline.json", mean_ms)
+    assert suite.main(["--only", "save", "--baseline", baseline, "--min-delta-ms", "0"]) == code
+    err = capsys.readouterr().err
+    assert ("REGRESIÓN" in err) == bool(code)
@@ -0,0 +1,125 @@
+# tests/test_client.py
+# GameClient comparte un socket entre el hilo de Tk y el pool de hilos: cada
+# petición debe recibir su propia respuesta aunque lleguen a la vez, y una
+# respuesta perdida (tiempo agotado, línea a medias) no puede quedar como la
+# de la petición siguiente.
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from client import GameClient, RemoteSaver, ServerError
+
+
+def echo_server(path):
+    # responde {"ok": true, "n": <n de la petición>} línea por línea
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn, conn.makefile("rwb") as f:
+            for line in f:
+                msg = json.loads(line)
+                f.write(json.dumps({"ok": True, "n": msg.get("n")}).encode() + b"\n")
+                f.flush()
+        listener.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_concurrent_requests_get_their_own_reply(tmp_path):
+    path = str(tmp_path / "s.sock")
+    echo_server(path)
+    client = GameClient(path)
+    mismatches = []
+
+    def worker(base):
+        for n in range(base, base + 200):
+            if client.request("ping", n=n)["n"] != n:
+                mismatches.append(n)
+
+    threads = [threading.Thread(target=worker, args=(k * 1000,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    client.close()
+    assert mismatches == []
+
+
+def scripted_server(path, script):
+    # por cada petición: (segundos de espera, bytes a escribir); luego cierra
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+
+    def serve():
+        conn, _ = listener.accept()
+        with conn, conn.makefile("rb") as f:
+            for delay, data in script:
+                if not f.readline():
+                    break
+                time.sleep(delay)
+                try:
+                    conn.sendall(data)
+                except OSError:   # el cliente ya se fue (tiempo agotado)
+                    break
+        listener.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+
+
+def test_timeout_marks_client_broken(tmp_path):
+    path = str(tmp_path / "s.sock")
+    scripted_server(path, [(0.5, b'{"ok": true, "n": 1}\n'), (0, b'{"ok": true, "n": 2}\n')])
+    client = GameClient(path, timeout=0.1)
+    with pytest.raises(OSError):
+        client.request("ping", n=1)
+    assert client.broken
+    # la respuesta atrasada de n=1 no llega como la de n=2
+    with pytest.raises(ServerError):
+        client.request("ping", n=2)
+    client.close()
+
+
+def test_partial_line_marks_client_broken(tmp_path):
+    path = str(tmp_path / "s.sock")
+    scripted_server(path, [(0, b'{"ok": tr')])
+    client = GameClient(path)
+    with pytest.raises(ServerError):
+        client.request("ping")
+    assert client.broken
+    client.close()
+
+
+def test_lazy_client_connects_on_first_request(tmp_path):
+    path = str(tmp_path / "s.sock")
+    client = GameClient(path, lazy=True)   # todavía no hay servidor
+    echo_server(path)
+    assert client.request("ping", n=7)["n"] == 7
+    client.close()
+
+
+class HelloCounter:
+    def __init__(self):
+        self.scene = "scenario2"
+        self.calls = 0
+
+    def hello(self, player, new=False):
+        self.calls += 1
+        return {"player": player, "current_scene": self.scene}
+
+
+def test_remote_saver_load_asks_the_server_again():
+    client = HelloCounter()
+    saver = RemoteSaver(client, client.hello("ana"))
+    assert saver.load()["current_scene"] == "scenario2"
+    client.scene = None   # la partida terminó en el servidor
+    assert saver.load()["current_scene"] is None
+    assert client.calls == 3
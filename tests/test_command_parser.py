@@ -0,0 +1,36 @@
+# tests/test_command_parser.py
+# El corpus de regresión (scenarios/corpus.json) como prueba: cada frase debe
+# seguir cayendo en su intención y, si no tiene clave "legacy", en la misma rama
+# que las reglas por subcadena de antes. Es lo mismo que command_parser.py --check.
+import json
+
+import pytest
+
+from command_parser import CORPUS_FILE, check_corpus, legacy_intent, parser_for, tokenize
+
+with open(CORPUS_FILE, "r", encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+CASES = [(scenario, case) for scenario, cases in CORPUS.items() for case in cases]
+
+
+@pytest.mark.parametrize("scenario, case", CASES, ids=[f"{s}:{c['input']}" for s, c in CASES])
+def test_corpus_intent(scenario, case):
+    assert parser_for(scenario).parse(case["input"]).name == case["intent"]
+
+
+@pytest.mark.parametrize("scenario, case", CASES, ids=[f"{s}:{c['input']}" for s, c in CASES])
+def test_corpus_matches_legacy_rules(scenario, case):
+    assert legacy_intent(scenario, case["input"]) == case.get("legacy", case["intent"])
+
+
+def test_check_corpus_is_clean():
+    assert check_corpus() == []
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("  Abrir CAJÓN, ¡ya!") == ["abrir", "cajón", "ya"]
+
+
+def test_unknown_command_has_no_intent():
+    assert parser_for("scenario1").parse("bailar salsa").name is None
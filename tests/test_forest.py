@@ -0,0 +1,49 @@
+# tests/test_forest.py
+# Bosque procedural del escenario 3: mismo mundo para la misma semilla y los
+# guardados de antes del mapa (sin "forest") sortean su semilla con la partida.
+from forest import CHUNK, generate_chunk, new_forest
+from game_core import GameSession
+from rng_streams import SessionRng
+
+LEGACY_STATE = {"pos": 2, "has_light": True, "water_bottles": 0, "escaped": False}
+
+
+def play(state, seed, commands):
+    session = GameSession("scenario3", dict(state), SessionRng(seed))
+    lines = [session.send(cmd).lines for cmd in commands]
+    return lines, session.state["forest"]
+
+
+def test_chunks_are_deterministic():
+    a, b = generate_chunk(7, 3, -2), generate_chunk(7, 3, -2)
+    assert a.tiles == b.tiles and a.caches == b.caches and a.crossing == b.crossing
+    assert len(a.tiles) == CHUNK * CHUNK
+
+
+def test_new_forest_starts_on_the_crossing():
+    forest = new_forest(7)
+    assert (forest["x"], forest["y"]) == generate_chunk(7, 0, 0).crossing
+
+
+def test_legacy_save_replays_with_the_session_seed():
+    commands = ["buscar", "avanzar", "ir este", "avanzar"]
+    first = play(LEGACY_STATE, 11, commands)
+    assert first == play(LEGACY_STATE, 11, commands)
+    assert first[1]["seed"] != play(LEGACY_STATE, 12, commands)[1]["seed"]
+
+
+def test_walk_text_is_singular_for_one_step():
+    lines, _ = play(LEGACY_STATE, 11, ["avanzar"] * 20)
+    walks = [line for step in lines for line in step if line.startswith("Caminas ")]
+    assert walks and not any(line.startswith("Caminas 1 pasos") for line in walks)
+
+
+def test_no_cabin_before_pos_5():
+    # con cabañas a la vista desde el principio, el guion ganaba antes de pos 5
+    for seed in range(200):
+        session = GameSession("scenario3", rng=SessionRng(seed))
+        session.send("tomar linterna")
+        while not session.finished and session.state["pos"] < 12:
+            session.send("avanzar")
+        if session.outcome == "win":
+            assert session.state["pos"] >= 5
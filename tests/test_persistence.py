@@ -0,0 +1,68 @@
+# tests/test_persistence.py
+# Guardado en segundo plano (SaveService): las ráfagas de mark_dirty() dentro de
+# delay ms deben salir como una sola línea del diario, con y sin temporizador.
+import pytest
+
+from persistence import SaveService, read_journal, read_state
+
+
+class FakeAfter:
+    # root.after sin Tk: los callbacks corren cuando el test llama a fire()
+    def __init__(self):
+        self.pending = []
+
+    def __call__(self, ms, fn):
+        self.pending.append(fn)
+
+    def fire(self):
+        pending, self.pending = self.pending, []
+        for fn in pending:
+            fn()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "perfil.tlc")
+
+
+def journal_lines(service):
+    service.write()
+    return list(read_journal(service.path))
+
+
+def test_burst_with_scheduler_is_one_append(path):
+    after = FakeAfter()
+    service = SaveService(path, delay=400, schedule=after)
+    state = service.load()
+    for floor in range(1, 6):
+        state["floor"] = floor
+        service.mark_dirty(state)
+    assert len(after.pending) == 1   # un solo temporizador por ráfaga
+    assert journal_lines(service) == []
+    after.fire()
+    lines = journal_lines(service)
+    assert len(lines) == 1
+    assert lines[0]["ops"] == [[["floor"], 5]]
+    service.close(state)
+
+
+def test_burst_without_scheduler_is_one_append(path):
+    service = SaveService(path, delay=60_000)
+    state = service.load()
+    for floor in range(1, 6):
+        state["floor"] = floor
+        service.mark_dirty(state)
+    assert len(journal_lines(service)) == 1
+    # lo que quedó dentro de la ventana sale al compactar
+    service.close(state)
+    assert read_state(path)["floor"] == 5
+
+
+def test_delay_zero_appends_every_change(path):
+    service = SaveService(path, delay=0)
+    state = service.load()
+    for floor in range(1, 4):
+        state["floor"] = floor
+        service.mark_dirty(state)
+    assert len(journal_lines(service)) == 3
+    service.close(state)
@@ -0,0 +1,59 @@
+# tests/test_server.py
+# Protocolo de server.py con entradas malformadas: la respuesta es un error y la
+# conexión sigue viva; las métricas no crean nombres a partir de lo que envía el
+# cliente.
+import asyncio
+import json
+
+import pytest
+
+from instrumentation import metrics
+from server import GameServer
+
+BAD = [
+    {"op": ["lista"]},
+    {"op": "x" * 40},
+    {"op": "start", "scenario": ["scenario1"]},
+    {"op": "leaderboard", "scenario": "scenario1", "limit": [1]},
+    {"op": "leaderboard", "scenario": "scenario1", "limit": 10_000},
+    {"op": "leaderboard", "scenario": "scenario1", "after": 5},
+    {"op": "leaderboard", "scenario": "scenario1", "after": ["Ana", "1", 2]},
+    {"op": "leaderboard", "scenario": {"a": 1}},
+    {"op": "history", "before": "7"},
+    {"op": "history", "limit": True},
+]
+
+
+def exchange(tmp_path, messages):
+    async def run():
+        server = GameServer(str(tmp_path), save_interval=60)
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        replies = []
+        try:
+            for msg in messages:
+                writer.write(json.dumps(msg).encode("utf-8") + b"\n")
+                await writer.drain()
+                replies.append(json.loads(await reader.readline()))
+        finally:
+            writer.close()
+            await server.close()
+        return replies
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("msg", BAD, ids=[json.dumps(m)[:40] for m in BAD])
+def test_malformed_message_is_an_error_reply(tmp_path, msg):
+    hello, reply, page = exchange(tmp_path, [{"op": "hello", "player": "Ana"}, msg,
+                                             {"op": "leaderboard", "scenario": "scenario1"}])
+    assert hello["ok"]
+    assert reply["ok"] is False and reply["error"]
+    assert page["ok"]   # la conexión sigue viva
+
+
+def test_unknown_ops_share_one_metric(tmp_path):
+    metrics.reset()
+    exchange(tmp_path, [{"op": f"inventado{n}"} for n in range(5)] + [{"op": "profiles"}])
+    names = {name for name in metrics.snapshot()["timers"] if name.startswith("server.")}
+    assert names == {"server.invalid", "server.profiles"}
@@ -0,0 +1,119 @@
+# tests/test_state_model.py
+# Estado tipado (state_model): códec del guardado, deltas del diario sobre el
+# estado tipado, deshacer con snapshot/restore y guardados con una cabecera de
+# modelo que esta versión no conoce.
+import struct
+
+import pytest
+
+import state_model
+from game_core import GameSession
+from persistence import apply_ops, decode_state, diff_state, encode_state
+from rng_streams import SessionRng
+from state_model import SceneState, compile_model, from_save
+
+COMMANDS = {
+    "scenario1": ["checar debajo de la cama", "mover cortinas", "abrir cajón"],
+    "scenario2": ["bajar", "entrar R1", "subir", "buscar"],
+    "scenario3": ["tomar linterna", "buscar", "ir este"],
+}
+
+
+def played(scenario_id, seed=1):
+    session = GameSession(scenario_id, rng=SessionRng(seed))
+    for cmd in COMMANDS[scenario_id]:
+        session.send(cmd)
+    return session.state
+
+
+@pytest.mark.parametrize("scenario_id", sorted(COMMANDS))
+def test_to_save_roundtrip(scenario_id):
+    state = played(scenario_id)
+    assert isinstance(state, SceneState)
+    loaded = from_save(state.to_save())
+    assert type(loaded) is type(state)
+    assert loaded == state
+    assert loaded.to_dict() == state.to_dict()
+
+
+def test_container_roundtrip_writes_each_header_once():
+    states = {sid: played(sid) for sid in COMMANDS}
+    blob = encode_state({"player_name": "ana", "scene_data": states})
+    for state in states.values():
+        assert blob.count(state.model.header) == 1
+    loaded = decode_state(blob)
+    assert loaded["player_name"] == "ana"
+    assert loaded["scene_data"] == states
+
+
+def test_diff_replays_on_typed_state():
+    before = played("scenario2")
+    after = before.copy()
+    after["has_key"] = not after["has_key"]
+    after["floor"] = after["floor"] % 12 + 1
+    cell = after["floors"]["7"]["R3"]
+    cell["occupied"] = not cell["occupied"]
+    after["visited"] = ["R3"]   # lo que no es del modelo va a "extra"
+    ops = diff_state({"s": before}, {"s": after})
+    assert [["s", "floors", "7", "R3", "occupied"], cell["occupied"]] in ops
+    replay = {"s": before.copy()}
+    apply_ops(replay, ops)
+    assert type(replay["s"]) is type(before)
+    assert replay["s"] == after
+    # las operaciones son absolutas: re-aplicarlas no cambia nada
+    apply_ops(replay, ops)
+    assert replay["s"] == after
+
+
+def test_snapshot_restore():
+    state = played("scenario3")
+    snap = state.snapshot()
+    expected = state.to_dict()
+    state["escaped"] = True
+    state["pos"] += 3
+    state.extra["nuevo"] = {"a": 1}
+    assert state.to_dict() != expected
+    state.restore(snap)
+    assert state.to_dict() == expected
+    # la foto no comparte el extra con el estado restaurado
+    state.extra.clear()
+    state.restore(snap)
+    assert state.to_dict() == expected
+
+
+def test_unknown_header_rebuilds_model(monkeypatch):
+    # reglas de otra versión: el guardado trae la cabecera y el modelo se rehace
+    spec = {
+        "state": {"lives": 3, "lit": False},
+        "setup": [{"grid": {"target": "board", "rows": 2, "cols": 3, "cells": {"mine": "chance(0.5)"}}}],
+    }
+    model = compile_model("otra_version", spec)
+    state = model.from_dict({"lives": 2, "lit": True, "board": {
+        "1": {"1": {"mine": True}, "2": {"mine": False}, "3": {"mine": True}},
+        "2": {"1": {"mine": False}, "2": {"mine": True}, "3": {"mine": False}},
+    }})
+    blob = encode_state({"scene_data": {"otra": state}})
+    monkeypatch.delitem(state_model._MODELS, model.key)
+    loaded = decode_state(blob)["scene_data"]["otra"]
+    assert type(loaded) is not type(state)
+    assert loaded.model.name == "saved"
+    assert loaded.to_dict() == state.to_dict()
+
+
+def test_inline_header_from_previous_format():
+    # formato anterior (códec 2): cabecera completa y un byte por celda
+    state = played("scenario2")
+    model = state.model
+    payload = (struct.pack("<H", len(model.header)) + model.header
+               + model.packer.pack(state._flags, *(getattr(state, n) for n in model.ints))
+               + bytes(state["floors"].cells))
+    loaded = state_model.from_inline_save(payload)
+    assert loaded.to_dict() == {k: v for k, v in state.to_dict().items() if k in model.names}
+
+
+def test_missing_header_is_an_error(monkeypatch):
+    state = played("scenario1")
+    payload = state.to_save()
+    monkeypatch.delitem(state_model._MODELS, state.model.key)
+    with pytest.raises(ValueError):
+        from_save(payload)
@@ -0,0 +1,65 @@
+# transcript.py
+import tkinter as tk
+from collections import deque
+
+MAX_LINES = 300     # líneas visibles en el widget antes de recortar las más viejas
+HISTORY = 5000      # entradas guardadas en el historial completo
+
+
+# ---------------------------
+# Transcripción acotada para los escenarios
+# ---------------------------
+class Transcript:
+    # tk.Text que nunca crece sin límite: al pasar de max_lines se borran las
+    # líneas más viejas en el mismo widget. El historial completo queda en un
+    # buffer circular (deque) que se puede exportar o restaurar.
+    def __init__(self, parent, max_lines=MAX_LINES, history=HISTORY, **text_options):
+        self.max_lines = max_lines
+        self.history = deque(maxlen=history)
+        self.text = tk.Text(parent, **text_options)
+
+    def pack(self, **kwargs):
+        self.text.pack(**kwargs)
+
+    def write(self, text):
+        self.history.append(text)
+        self._insert(text)
+        self.text.see("end")
+
+    def _insert(self, text):
+        self.text.insert("end", text + "\n\n")
+        # "end-1c" es el último carácter real; su línea es el total de líneas
+        lines = int(self.text.index("end-1c").split(".")[0])
+        excess = lines - self.max_lines
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+
+    def clear(self):
+        self.text.delete("1.0", "end")
+
+    def reset(self):
+        # widget e historial vacíos (p.ej. al volver a entrar a un escenario)
+        self.history.clear()
+        self.clear()
+
+    def export(self):
+        return list(self.history)
+
+    def export_text(self):
+        return "\n\n".join(self.history)
+
+    def restore(self, entries):
+        # reemplaza el historial y vuelve a pintar solo lo que cabe en pantalla
+        self.history.clear()
+        self.history.extend(entries)
+        self.clear()
+        shown = []
+        budget = self.max_lines
+        for entry in reversed(self.history):
+            budget -= entry.count("\n") + 2
+            if budget < 0:
+                break
+            shown.append(entry)
+        for entry in reversed(shown):
+            self._insert(entry)
+        self.text.see("end")